@@ -2,37 +2,51 @@
 import pandas as pd
 import numpy as np
 import os
+from fnmatch import fnmatch
 
-def read_excel_files(directory_path):
+def select_subjects(filenames, include=None, exclude=None):
+    """
+    파일명 리스트를 피실험자 이름(확장자 제외) 기준으로 거름
+    - include: 이름 또는 glob 패턴 리스트 (예: ['S01', 'S1*'], None이면 전체)
+    - exclude: 제외할 이름 또는 glob 패턴 리스트 (include보다 우선)
+    """
+    selected = []
+    for filename in filenames:
+        subject = os.path.splitext(filename)[0]
+        if include and not any(fnmatch(subject, pattern) for pattern in include):
+            continue
+        if exclude and any(fnmatch(subject, pattern) for pattern in exclude):
+            continue
+        selected.append(filename)
+    return selected
+
+def read_excel_files(directory_path, multirate=False, time_policy='repair', dtype=None,
+                     include=None, exclude=None):
     """
     지정된 디렉토리 내의 모든 엑셀 파일을 읽고 기본 전처리를 수행
     - 첫 번째 row를 header로 사용
     - 중복된 X [s] 열 제거
     - GYRO, EMG. IMU 데이터 구분 
+    - multirate=True: 센서 그룹별 고유 시간축 유지 (extract_sensor_groups 참고)
+    - time_policy: 시간축 검사/복구 방식 (check_time_grid 참고)
+    - dtype: 센서 채널 자료형 (예: np.float32, None이면 float64 유지, cast_signals 참고)
+    - include, exclude: 읽을 피실험자 필터 (select_subjects 참고)
 
     Returns:
         dict: {파일명: 처리된 데이터프레임} 형태의 딕셔너리
+              (multirate=True이면 {파일명: {'GYRO': df, 'ACC': df, 'EMG': df}})
     """
     excel_files = {}
     
     # 디렉토리 내의 모든 파일 순회
-    for filename in os.listdir(directory_path):
+    for filename in select_subjects(sorted(os.listdir(directory_path)), include, exclude):
         if filename.endswith(('.xlsx')):
             file_path = os.path.join(directory_path, filename)
             
             try:
-                # 엑셀 파일 읽기
-                df = pd.read_excel(file_path)
-                
-                # 시간 관련 컬럼 처리
-                time_columns = [col for col in df.columns if 'X [s]' in col]
-
-                # 첫 번째 X [s] 열만 유지하고 나머지는 제거
-                columns_to_drop = time_columns[1:]
-                df = df.drop(columns=columns_to_drop)
-                
                 # 처리된 데이터프레임을 딕셔너리에 저장
-                excel_files[filename] = df
+                excel_files[filename] = read_excel_file(file_path, multirate=multirate, time_policy=time_policy,
+                                                        dtype=dtype)
                 
             except Exception as e:
                 print(f"Error processing {filename}: {str(e)}")
@@ -40,6 +54,249 @@ def read_excel_files(directory_path):
     
     return excel_files
 
+def read_excel_file(file_path, multirate=False, time_policy='repair', dtype=None):
+    """
+    엑셀 파일 하나를 읽고 기본 전처리 수행 (read_excel_files 참고)
+    - 시간축 검사 결과는 데이터프레임의 attrs['time_grid']에 저장 (time_grid_issues로 모음)
+    """
+    # 엑셀 파일 읽기
+    df = pd.read_excel(file_path)
+    if multirate:
+        groups = extract_sensor_groups(df)
+        if time_policy is not None:
+            groups = {group: check_time_grid(frame, policy=time_policy, label=group)
+                      for group, frame in groups.items()}
+        if dtype is not None:
+            groups = {group: cast_signals(frame, dtype) for group, frame in groups.items()}
+        return groups
+    
+    # 시간 관련 컬럼 처리
+    time_columns = [col for col in df.columns if 'X [s]' in col]
+
+    # 첫 번째 X [s] 열이 더 짧은 센서의 것이면 끝부분이 NaN이므로 같은 행의 다른 시간 열 값으로 채움
+    # (단일 주파수 기록은 모든 시간 열이 같은 시간축, 모든 시간 열이 NaN인 행만 check_time_grid에서 제거됨)
+    if len(time_columns) > 1 and df[time_columns[0]].isna().any():
+        df[time_columns[0]] = df[time_columns].bfill(axis=1).iloc[:, 0]
+
+    # 첫 번째 X [s] 열만 유지하고 나머지는 제거
+    columns_to_drop = time_columns[1:]
+    df = df.drop(columns=columns_to_drop)
+    if time_policy is not None:
+        df = check_time_grid(df, policy=time_policy)
+    if dtype is not None:
+        df = cast_signals(df, dtype)
+    return df
+
+def cast_signals(df, dtype=np.float32):
+    """
+    시간 열('X [s]')을 제외한 센서 채널 자료형 변경 (float32 모드: 메모리/대역폭 절반)
+    - 시간 열은 긴 기록에서도 샘플 간격 정밀도를 유지하도록 float64 유지
+    - attrs(time_grid 검사 결과)는 그대로 보존
+    """
+    channels = [col for col in df.columns if 'X [s]' not in col]
+    result = df.astype({col: dtype for col in channels})
+    result.attrs = dict(df.attrs)
+    return result
+
+# 센서 그룹 구분 (ACC_extract, GYRO_extract, EMG_extract와 같은 기준)
+SENSOR_GROUPS = {
+    'GYRO': lambda col: 'GYRO.Z' in col and '[°/s]' in col,
+    'ACC': lambda col: 'ACC.Z' in col and '[g]' in col,
+    'EMG': lambda col: 'EMG' in col
+}
+
+def extract_sensor_groups(raw_df):
+    """
+    X [s] 열을 지우기 전의 원본 데이터프레임을 센서 그룹별 고유 샘플링 주파수로 분리
+    - Delsys 내보내기 형식: 각 센서 열 바로 앞에 그 센서의 X [s] 열이 있음
+    - 샘플링 주파수가 낮은 센서 열 끝의 NaN 패딩은 제거 (EMG 행 수로 늘리지 않음)
+    
+    Returns:
+    - groups: {'GYRO': df, 'ACC': df, 'EMG': df}
+      각 df는 GYRO_extract 등과 같은 'X [s]' + 채널 형태이며 길이는 그룹마다 다름
+    """
+    members = {group: [] for group in SENSOR_GROUPS}
+    time_column = None
+    for col in raw_df.columns:
+        if 'X [s]' in col:
+            time_column = col
+            continue
+        for group, is_member in SENSOR_GROUPS.items():
+            if is_member(col):
+                members[group].append((time_column, col))
+                break
+    
+    groups = {}
+    for group, pairs in members.items():
+        if not pairs:
+            raise ValueError(f"No {group} columns found")
+        time_values = raw_df[pairs[0][0]]
+        n_samples = int(time_values.notna().sum())
+        
+        # 같은 그룹 안의 채널은 같은 시간축을 공유해야 함
+        for other_time, col in pairs[1:]:
+            if not np.allclose(raw_df[other_time].values[:n_samples], time_values.values[:n_samples],
+                               equal_nan=True):
+                print(f"Warning: {col} does not share the {group} time base")
+        
+        frame = raw_df[[col for _, col in pairs]].iloc[:n_samples].reset_index(drop=True)
+        frame.insert(0, 'X [s]', time_values.values[:n_samples])
+        groups[group] = frame
+    
+    return groups
+
+def map_indices_by_time(indices, source_time, target_time):
+    """
+    source 시간축의 샘플 인덱스를 target 시간축에서 시각이 가장 가까운 샘플 인덱스로 변환
+    (예: GYRO에서 찾은 사이클 경계 -> EMG 샘플 인덱스)
+    """
+    source_time = np.asarray(source_time, dtype=float)
+    target_time = np.asarray(target_time, dtype=float)
+    times = source_time[np.asarray(indices, dtype=int)]
+    
+    pos = np.clip(np.searchsorted(target_time, times), 1, len(target_time) - 1)
+    closer_to_left = (times - target_time[pos - 1]) <= (target_time[pos] - times)
+    return pos - closer_to_left
+
+# 시간축 검사 기준
+GAP_FACTOR = 1.5      # 샘플 간격이 중앙 간격의 이 배수를 넘으면 샘플 누락(gap)
+MAX_FILL_SECONDS = 0.25  # 이보다 긴 구간을 보간으로 채우면 'long'으로 표시
+TIME_GRID_COLUMNS = ['group', 'issue', 'channel', 'start_time', 'end_time', 'n_samples', 'long', 'action']
+
+def _runs(mask):
+    """
+    bool 행렬 (샘플, 채널)의 True 연속 구간을 모든 채널에서 한 번에 찾음
+    Returns: (채널 번호, 시작 행, 끝 행(포함)) 배열
+    """
+    padded = np.zeros((mask.shape[0] + 2, mask.shape[1]), dtype=np.int8)
+    padded[1:-1] = mask
+    edges = np.diff(padded, axis=0)
+    start_rows, start_cols = np.nonzero(edges == 1)
+    end_rows, end_cols = np.nonzero(edges == -1)
+    # nonzero는 행 우선 순서이므로 채널별로 정렬해 시작/끝을 짝지음
+    start_order = np.lexsort((start_rows, start_cols))
+    end_order = np.lexsort((end_rows, end_cols))
+    return start_cols[start_order], start_rows[start_order], end_rows[end_order] - 1
+
+def check_time_grid(df, policy='repair', gap_factor=GAP_FACTOR, max_fill=MAX_FILL_SECONDS, label='all'):
+    """
+    'X [s]' + 채널 형태의 데이터프레임에서 시간축 이상을 검사하고 정책에 따라 복구
+    (이후 단계는 모두 샘플 인덱스를 균일한 시간으로 가정)
+    
+    검사 항목 (모든 채널을 한 번의 배열 연산으로 검사):
+    - time_nan: 시간값이 NaN인 행
+    - non_monotonic: 시간이 감소하거나 중복된 샘플
+    - gap: 샘플 간격이 중앙 간격 x gap_factor 초과 (무선 전송 누락)
+    - nan_run: 채널별 NaN 연속 구간
+    - padding: 파일 끝까지 이어지는 NaN (샘플링 주파수가 낮은 센서의 내보내기 패딩, 보간하지 않고 유지)
+    
+    Parameters:
+    - df: GYRO_extract/extract_sensor_groups 형태의 데이터프레임 (첫 열 'X [s]')
+    - policy: 'repair' (정렬/중복 제거 후 누락 구간은 중앙 간격의 균일 시간축으로 다시 만들고
+              NaN과 누락 샘플은 선형 보간), 'flag' (검사만), 'error' (이상이 있으면 ValueError)
+    - gap_factor: 누락 판단 배수
+    - max_fill: 이 시간보다 긴 구간을 보간한 경우 long=True로 표시
+    - label: 결과 표의 group 열 값 (다중 주파수 기록의 센서 그룹 이름)
+    
+    Returns:
+    - df: 복구된 데이터프레임 (이상이 없거나 policy='flag'이면 입력과 같은 값의 얕은 복사본, 입력은 수정하지 않음)
+      attrs['time_grid']에 이상 목록(dict 리스트, 열 = TIME_GRID_COLUMNS) 저장
+    """
+    if policy not in ['repair', 'flag', 'error']:
+        raise ValueError(f"Unknown time grid policy: {policy}")
+    time_column = df.columns[0]
+    channels = list(df.columns[1:])
+    time_values = df[time_column].to_numpy(dtype=float)
+    data = df[channels].to_numpy(dtype=float)
+    issues = []
+    
+    def add(issue, channel, start_time, end_time, n_samples):
+        issues.append({'group': label, 'issue': issue, 'channel': channel,
+                       'start_time': float(start_time), 'end_time': float(end_time),
+                       'n_samples': int(n_samples), 'long': bool(end_time - start_time > max_fill),
+                       'action': 'interpolated' if policy == 'repair' else 'flagged'})
+    
+    # 시간값 NaN 행 (엑셀 끝의 빈 행 포함)
+    time_ok = ~np.isnan(time_values)
+    if not time_ok.all():
+        valid_times = time_values[time_ok]
+        add('time_nan', time_column, valid_times[0] if len(valid_times) else np.nan,
+            valid_times[-1] if len(valid_times) else np.nan, (~time_ok).sum())
+        issues[-1].update(long=False, action='dropped' if policy == 'repair' else 'flagged')
+        time_values, data = time_values[time_ok], data[time_ok]
+    
+    # 감소/중복 시간
+    steps = np.diff(time_values)
+    non_monotonic = steps <= 0
+    if non_monotonic.any():
+        bad = np.flatnonzero(non_monotonic) + 1
+        add('non_monotonic', time_column, time_values[bad].min(), time_values[bad].max(), len(bad))
+        issues[-1]['action'] = 'sorted' if policy == 'repair' else 'flagged'
+        order = np.argsort(time_values, kind='stable')
+        time_values, data = time_values[order], data[order]
+        keep = np.concatenate([[True], np.diff(time_values) > 0])
+        time_values, data = time_values[keep], data[keep]
+        steps = np.diff(time_values)
+    
+    # 샘플 누락
+    dt = np.median(steps) if len(steps) else 0.0
+    gap_rows = np.flatnonzero(steps > gap_factor * dt) if dt > 0 else np.empty(0, dtype=int)
+    for row in gap_rows:
+        add('gap', time_column, time_values[row], time_values[row + 1],
+            round(steps[row] / dt) - 1)
+    
+    # 채널별 NaN 연속 구간
+    nan_mask = np.isnan(data)
+    if nan_mask.any():
+        cols, starts, ends = _runs(nan_mask)
+        for col, start, end in zip(cols, starts, ends):
+            padding = end == len(time_values) - 1
+            add('padding' if padding else 'nan_run', channels[col],
+                time_values[start], time_values[end], end - start + 1)
+            if padding:
+                issues[-1].update(long=False, action='kept')
+    
+    problems = [issue['issue'] for issue in issues if issue['issue'] != 'padding']
+    if problems:
+        counts = pd.Series(problems).value_counts().to_dict()
+        print(f"Time grid check ({label}): {counts}")
+        if policy == 'error':
+            raise ValueError(f"Irregular time grid ({label}): {counts}")
+    
+    if policy != 'repair' or not problems:
+        df = df.copy(deep=False)
+        df.attrs['time_grid'] = issues
+        return df
+    
+    # 누락/순서 문제가 있으면 중앙 간격의 균일 시간축으로, 아니면 원래 시간축에서 NaN만 보간
+    if len(gap_rows) or non_monotonic.any():
+        grid = time_values[0] + dt * np.arange(int(round((time_values[-1] - time_values[0]) / dt)) + 1)
+    else:
+        grid = time_values
+    # 채널의 첫/마지막 유효 샘플 밖(패딩)은 NaN으로 유지
+    repaired = np.full((len(grid), len(channels)), np.nan)
+    for c in range(len(channels)):
+        valid = ~nan_mask[:, c]
+        if valid.any():
+            repaired[:, c] = np.interp(grid, time_values[valid], data[valid, c], left=np.nan, right=np.nan)
+    
+    result = pd.DataFrame(repaired, columns=channels)
+    result.insert(0, time_column, grid)
+    result.attrs['time_grid'] = issues
+    return result
+
+def time_grid_issues(excel_data):
+    """
+    read_excel_files 결과의 시간축 검사 결과를 하나의 표로 모음
+    Returns: 열 = file + TIME_GRID_COLUMNS
+    """
+    rows = []
+    for filename, data in excel_data.items():
+        frames = data.values() if isinstance(data, dict) else [data]
+        for frame in frames:
+            rows.extend({'file': filename, **issue} for issue in frame.attrs.get('time_grid', []))
+    return pd.DataFrame(rows, columns=['file'] + TIME_GRID_COLUMNS)
+
 #extract ACC : R_IMU ACC, L_IMU ACC
 def ACC_extract(df):
     acc_columns = ['X [s]'] + [col for col in df.columns if 'ACC.Z' in col and '[g]' in col]
@@ -55,8 +312,107 @@ def EMG_extract(df):
     emg_columns = ['X [s]'] + [col for col in df.columns if 'EMG' in col]
     return df[emg_columns]
 
+def _sosfiltfilt_chunked(sos, x, chunk_size=None, overlap=2000):
+    """
+    zero-phase SOS 필터를 axis=0(샘플 방향)으로 모든 채널에 한 번에 적용
+    - chunk_size가 지정되고 신호가 더 길면 overlap만큼 겹쳐서 나눠 처리 (메모리 절약)
+    - 겹친 구간은 버리므로 필터 응답이 overlap 안에서 충분히 감쇠하면 전체 처리와 같은 결과
+    """
+    from scipy.signal import sosfiltfilt
+    n = x.shape[0]
+    if chunk_size is None or n <= chunk_size:
+        return sosfiltfilt(sos, x, axis=0)
+    
+    out = np.empty_like(x)
+    for start in range(0, n, chunk_size):
+        end = min(start + chunk_size, n)
+        lo, hi = max(0, start - overlap), min(n, end + overlap)
+        out[start:end] = sosfiltfilt(sos, x[lo:hi], axis=0)[start - lo:end - lo]
+    return out
+
+#condition EMG : band-pass -> rectify -> envelope (모든 EMG 채널을 한 번에 처리)
+def EMG_condition(emg_data, band=(20, 450), envelope='lowpass', envelope_cutoff=10,
+                  rms_window=0.05, order=2, chunk_size=1_000_000):
+    """
+    EMG 신호 전처리 (원시 EMG를 사이클 정규화 전에 포락선으로 변환)
+    
+    Parameters:
+    - emg_data: EMG_extract 결과 ('X [s]' + EMG 열)
+    - band: band-pass 대역 (Hz), 상한은 나이퀴스트 주파수의 95%로 제한
+    - envelope: 'lowpass' (정류 후 low-pass) 또는 'rms' (이동 RMS)
+    - envelope_cutoff: 'lowpass' 포락선의 차단 주파수 (Hz)
+    - rms_window: 'rms' 포락선의 윈도우 길이 (초)
+    - order: Butterworth 필터 차수 (second-order sections로 적용)
+    - chunk_size: 긴 기록을 나눠 처리할 샘플 수 (None이면 한 번에 처리, 청크 사이는 2초씩 겹침)
+    
+    Returns:
+    - conditioned: emg_data와 같은 형태의 데이터프레임 (EMG 열만 포락선으로 교체)
+    """
+    from scipy.signal import butter
+    time_values = emg_data['X [s]'].values
+    emg_columns = [col for col in emg_data.columns if col != 'X [s]']
+    fs = 1.0 / np.nanmedian(np.diff(time_values))
+    nyquist = fs / 2
+    overlap = int(2 * fs)
+    
+    # (샘플, 채널) 행렬 하나로 모든 채널을 동시에 처리. NaN은 0으로 채우고 마지막에 복원
+    # 필터 계산은 float64로 하고 결과만 입력 자료형으로 되돌림 (float32 모드)
+    dtype = np.result_type(*emg_data[emg_columns].dtypes)
+    x = emg_data[emg_columns].to_numpy(dtype=float)
+    missing = np.isnan(x)
+    x = np.where(missing, 0.0, x)
+    
+    # 1) band-pass
+    low, high = band[0], min(band[1], 0.95 * nyquist)
+    sos = butter(order, [low, high], btype='bandpass', fs=fs, output='sos')
+    x = _sosfiltfilt_chunked(sos, x, chunk_size, overlap)
+    
+    # 2) 정류
+    x = np.abs(x)
+    
+    # 3) 포락선
+    if envelope == 'lowpass':
+        sos = butter(order, envelope_cutoff, btype='lowpass', fs=fs, output='sos')
+        x = _sosfiltfilt_chunked(sos, x, chunk_size, overlap)
+    elif envelope == 'rms':
+        window = max(1, int(round(rms_window * fs)))
+        squared = np.cumsum(np.vstack([np.zeros((1, x.shape[1])), x ** 2]), axis=0)
+        half = window // 2
+        lo = np.clip(np.arange(len(x)) - half, 0, len(x))
+        hi = np.clip(np.arange(len(x)) - half + window, 0, len(x))
+        x = np.sqrt((squared[hi] - squared[lo]) / (hi - lo)[:, None])
+    else:
+        raise ValueError(f"Unknown envelope type: {envelope}")
+    
+    x[missing] = np.nan
+    conditioned = emg_data.copy()
+    conditioned[emg_columns] = x.astype(dtype, copy=False)
+    return conditioned
+
+def split_legs(df):
+    """
+    다리별 센서 데이터 분리 (process_file의 Step 1과 같은 열 순서)
+    
+    Returns:
+    - time_data: 시간 데이터
+    - legs: {'right': {'IMU':..., 'ACC':..., 'BF':..., 'ST':...}, 'left': {...}}
+    """
+    gyro_data = GYRO_extract(df)
+    acc_data = ACC_extract(df)
+    emg_data = EMG_extract(df)
+    
+    time_data = gyro_data['X [s]']
+    legs = {
+        'right': {'IMU': gyro_data.iloc[:, 1], 'ACC': acc_data.iloc[:, 1],
+                  'BF': emg_data.iloc[:, 1], 'ST': emg_data.iloc[:, 2]},
+        'left': {'IMU': gyro_data.iloc[:, 2], 'ACC': acc_data.iloc[:, 2],
+                 'BF': emg_data.iloc[:, 3], 'ST': emg_data.iloc[:, 4]}
+    }
+    return time_data, legs
+
 if __name__ == "__main__":
-    directory_path = '/Users/kwonsoomin/python_sm/sprint_data' #파일경로 수정!!!!!
+    import sys
+    directory_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.getcwd(), 'sprint_data')
     excel_data = read_excel_files(directory_path)
     
     for filename, df in excel_data.items():
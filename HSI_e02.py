@@ -1,10 +1,12 @@
 # IMU phase detection
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 import os
 from HSI_e01 import read_excel_files, GYRO_extract
 
+# find_gait_cycles 기본 파라미터 (파이프라인/스윕/병렬 처리 공통)
+DETECTION_PARAMS = {'window_size': 50, 'min_distance': 20, 'peak_threshold': -200}
+
 def find_gait_cycles(time, gyro_data, side='Right', min_distance=20, window_size=50, peak_threshold=-200):
     """
     보행 사이클 찾기 함수
@@ -63,8 +65,11 @@ def find_gait_cycles(time, gyro_data, side='Right', min_distance=20, window_size
     return valleys, cycles
 
 def plot_gait_cycles(time_data, gyro_data, valleys, filename, side='Right', peak_threshold=-200):
-    """보행 사이클 시각화 함수"""
-    plt.plot(time_data, gyro_data, label=f'{side} Gyro', alpha=0.8)
+    """보행 사이클 시각화 함수 (추세선은 LTTB로 줄여 그림, 배치 저장용은 HSI_ediag.plot_cycle_diagnostics)"""
+    import matplotlib.pyplot as plt
+    from HSI_ediag import decimate_trace
+    trace = decimate_trace(time_data, gyro_data, keep=valleys)
+    plt.plot(np.asarray(time_data)[trace], np.asarray(gyro_data)[trace], label=f'{side} Gyro', alpha=0.8)
     plt.plot(time_data[valleys], gyro_data[valleys], 
              'rx', label='Gait Cycle (peak < -200°/s)', markersize=10)
     
@@ -82,7 +87,9 @@ def plot_gait_cycles(time_data, gyro_data, valleys, filename, side='Right', peak
 
 if __name__ == "__main__":
     # 파일 읽기
-    directory_path = '/Users/kwonsoomin/python_sm/sprint_data'
+    import sys
+    import matplotlib.pyplot as plt
+    directory_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.getcwd(), 'sprint_data')
     excel_data = read_excel_files(directory_path)
     
     for filename, df in excel_data.items():
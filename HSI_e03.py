@@ -28,9 +28,10 @@ def extract_peak_data(valleys, time_data, gyro_data, acc_data, emg_data):
     
     return peak_data
 
-def save_peak_data_to_excel(right_data, left_data, filename, output_dir=None):
+def save_peak_data_to_excel(right_data, left_data, filename, output_dir=None, raise_errors=False):
     """
     피크 데이터를 엑셀 파일로 저장
+    - raise_errors=True: 오류 메시지 출력 후 예외를 다시 발생 (HSI_ewriter가 실행 요약에 기록)
     """
     try:
         if output_dir is None:
@@ -59,10 +60,13 @@ def save_peak_data_to_excel(right_data, left_data, filename, output_dir=None):
         
     except Exception as e:
         print(f"Error saving to excel: {str(e)}")
+        if raise_errors:
+            raise
 
 if __name__ == "__main__":
     # 파일 읽기
-    directory_path = '/Users/kwonsoomin/python_sm/sprint_data'
+    import sys
+    directory_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.getcwd(), 'sprint_data')
     excel_data = read_excel_files(directory_path)
     
     for filename, df in excel_data.items():
@@ -2,11 +2,18 @@
 # 필요한 10개의 사이클 찾기
 
 from HSI_e01 import read_excel_files, ACC_extract, GYRO_extract, EMG_extract
-from HSI_e02 import find_gait_cycles
+from HSI_e02 import find_gait_cycles, DETECTION_PARAMS
+from HSI_espectral import spectral_trend
 import numpy as np
 import pandas as pd
 import os
 
+# 스프린트 구분/사이클 선택 기본 파라미터 (기본값은 각 함수의 기본값과 동일)
+INTERVAL_PARAMS = {'velocity_threshold': 150, 'min_rest_duration': 3}
+SELECTION_PARAMS = {'n_cycles': 10}
+# 사이클 검출부터 선택까지 전체 파라미터 (HSI_emain/HSI_esweep/HSI_eparallel/HSI_earchive 공통)
+DEFAULT_PARAMS = {**DETECTION_PARAMS, **INTERVAL_PARAMS, **SELECTION_PARAMS}
+
 def find_sprint_intervals(gyro_data, time_data, velocity_threshold=150, min_rest_duration=3):
     """
     휴식 구간을 기준으로 스프린트 인터벌을 구분
@@ -61,13 +68,17 @@ def find_cycles_in_sprint(valleys, interval_bounds):
     
     return categorized_cycles
 
-def select_middle_cycles(categorized_cycles, n_cycles=10):
+def select_middle_cycles(categorized_cycles, n_cycles=10, rejected=None):
     """
     각 카테고리 내에서 중간 n개의 사이클 선택
     
     Parameters:
     - categorized_cycles: 카테고리별로 분류된 사이클들
     - n_cycles: 선택할 사이클 개수
+    - rejected: 품질 검사에서 제외된 사이클 인덱스 (HSI_eqc.rejected_cycles)
+      주어지면 제외된 사이클이 없는 연속 n개 구간 중 중간에 가장 가까운 구간을 선택
+      (Step 5는 다음 선택 사이클을 사이클 끝으로 쓰므로 선택 구간은 연속이어야 함)
+      그런 구간이 없으면 제외된 사이클이 없는 가장 긴 연속 구간 (2개 이상)을 선택
     
     Returns:
     - selected: {카테고리: [선택된 사이클 인덱스]} 형태의 딕셔너리
@@ -88,6 +99,24 @@ def select_middle_cycles(categorized_cycles, n_cycles=10):
         elif end_idx > len(cycles):
             end_idx = len(cycles)
             start_idx = end_idx - n_cycles
+        
+        if rejected:
+            clean = ~np.isin(cycles, rejected)
+            window_starts = np.flatnonzero(np.convolve(clean, np.ones(n_cycles, dtype=int), 'valid') == n_cycles)
+            if len(window_starts):
+                start_idx = window_starts[np.argmin(np.abs(window_starts - start_idx))]
+                end_idx = start_idx + n_cycles
+            else:
+                # 통과한 사이클의 연속 구간 [시작, 끝) 중 가장 긴 구간 (같으면 중간에 가까운 구간)
+                edges = np.diff(np.concatenate([[0], clean.astype(int), [0]]))
+                run_starts, run_ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+                if len(run_starts) == 0 or (run_ends - run_starts).max() < 2:
+                    print(f"Sprint {category}: fewer than 2 consecutive cycles passed QC, skipping...")
+                    continue
+                lengths = run_ends - run_starts
+                best = np.lexsort((np.abs((run_starts + run_ends) // 2 - mid_point), -lengths))[0]
+                start_idx, end_idx = run_starts[best], run_ends[best]
+                print(f"Sprint {category}: only {end_idx - start_idx} consecutive cycles passed QC")
             
         selected[category] = cycles[start_idx:end_idx]
     
@@ -96,9 +125,14 @@ def select_middle_cycles(categorized_cycles, n_cycles=10):
 def save_interval_data_to_excel(right_selected, left_selected, time_data, 
                                 right_gyro, left_gyro, right_acc, left_acc,
                                 right_emg, left_emg, filename, 
-                                output_dir=None):
+                                output_dir=None, spectral=None, qc=None, raise_errors=False):
     """
     선택된 인터벌의 모든 센서 데이터를 엑셀 파일로 저장 (오른쪽/왼쪽 다리 별도 시트)
+    - spectral: {'right': 데이터프레임, 'left': 데이터프레임} (cycle_spectral_features 결과)
+      주어지면 사이클별 MDF/MNF 열과 스프린트별 추세 시트(*_Spectral_Trend)를 추가
+    - qc: {'right': 데이터프레임, 'left': 데이터프레임} (cycle_qc_features 결과)
+      주어지면 검출된 모든 사이클의 품질 특징과 판정을 *_QC 시트로 저장
+    - raise_errors=True: 오류 메시지 출력 후 예외를 다시 발생 (HSI_ewriter가 실행 요약에 기록)
     """
     try:
         if output_dir is None:
@@ -115,7 +149,8 @@ def save_interval_data_to_excel(right_selected, left_selected, time_data,
                     'IMU_Peak': right_gyro[cycle_idx],
                     'ACC': right_acc[cycle_idx],
                     'EMG_BF': right_emg['BF'].iloc[cycle_idx],
-                    'EMG_ST': right_emg['ST'].iloc[cycle_idx]
+                    'EMG_ST': right_emg['ST'].iloc[cycle_idx],
+                    **_spectral_row(spectral, 'right', cycle_idx)
                 })
         
         # 왼쪽 다리 데이터 준비
@@ -128,7 +163,8 @@ def save_interval_data_to_excel(right_selected, left_selected, time_data,
                     'IMU_Peak': left_gyro[cycle_idx],
                     'ACC': left_acc[cycle_idx],
                     'EMG_BF': left_emg['BF'].iloc[cycle_idx],
-                    'EMG_ST': left_emg['ST'].iloc[cycle_idx]
+                    'EMG_ST': left_emg['ST'].iloc[cycle_idx],
+                    **_spectral_row(spectral, 'left', cycle_idx)
                 })
         
         # DataFrame 생성
@@ -143,15 +179,35 @@ def save_interval_data_to_excel(right_selected, left_selected, time_data,
         with pd.ExcelWriter(output_filename, engine='openpyxl') as writer:
             right_df.to_excel(writer, sheet_name='Right_Leg', index=False)
             left_df.to_excel(writer, sheet_name='Left_Leg', index=False)
+            if spectral is not None:
+                spectral_trend(spectral['right'], right_selected).to_excel(
+                    writer, sheet_name='Right_Spectral_Trend', index=False)
+                spectral_trend(spectral['left'], left_selected).to_excel(
+                    writer, sheet_name='Left_Spectral_Trend', index=False)
+            if qc is not None:
+                qc['right'].to_excel(writer, sheet_name='Right_QC')
+                qc['left'].to_excel(writer, sheet_name='Left_QC')
         
         print(f"\nInterval data saved to: {output_filename}")
         
     except Exception as e:
         print(f"Error saving to excel: {str(e)}")
+        if raise_errors:
+            raise
+
+def _spectral_row(spectral, side, cycle_idx):
+    """사이클 시작 valley의 MDF/MNF 값 (spectral이 없으면 빈 딕셔너리)"""
+    if spectral is None:
+        return {}
+    features = spectral[side]
+    if cycle_idx in features.index:
+        return features.loc[cycle_idx].to_dict()
+    return {col: np.nan for col in features.columns}
 
 if __name__ == "__main__":
     # 파일 읽기
-    directory_path = '/Users/kwonsoomin/python_sm/sprint_data'
+    import sys
+    directory_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.getcwd(), 'sprint_data')
     excel_data = read_excel_files(directory_path)
     
     for filename, df in excel_data.items():
@@ -3,7 +3,6 @@ from HSI_e01 import read_excel_files, ACC_extract, GYRO_extract, EMG_extract
 from HSI_e02 import find_gait_cycles
 from HSI_e04 import find_sprint_intervals, find_cycles_in_sprint, select_middle_cycles
 import numpy as np
-from scipy.interpolate import interp1d
 import pandas as pd
 import os
 
@@ -20,6 +19,10 @@ def interpolate_cycle_data(time, data, cycle_indices, num_points=101):
     Returns:
     - interpolated_cycles: 보간된 데이터 리스트
     """
+    from scipy.interpolate import interp1d
+    # 스플라인 계산은 float64, 결과는 입력 자료형 (float32 모드면 float32 곡선)
+    dtype = np.asarray(data).dtype
+    dtype = dtype if np.issubdtype(dtype, np.floating) else np.float64
     interpolated_cycles = []
     
     for i in range(len(cycle_indices)):
@@ -49,14 +52,14 @@ def interpolate_cycle_data(time, data, cycle_indices, num_points=101):
         try:
             interpolator = interp1d(normalized_time, cycle_data, kind='cubic')
             interpolated_data = interpolator(target_time)
-            interpolated_cycles.append(interpolated_data)
+            interpolated_cycles.append(interpolated_data.astype(dtype, copy=False))
         except Exception as e:
             print(f"Warning: Failed to interpolate cycle {i+1}: {str(e)}")
             continue
     
     return interpolated_cycles
 
-def save_interpolated_data(interpolated_data, filename, output_dir=None):
+def save_interpolated_data(interpolated_data, filename, output_dir=None, raise_errors=False):
     """
     보간된 데이터를 엑셀 파일로 저장 (오른쪽과 왼쪽 다리 데이터를 별도의 파일로 저장)
     
@@ -64,6 +67,7 @@ def save_interpolated_data(interpolated_data, filename, output_dir=None):
     - interpolated_data: 보간된 데이터 딕셔너리
     - filename: 원본 파일 이름
     - output_dir: 저장할 디렉토리 (None인 경우 동적으로 생성)
+    - raise_errors: True이면 False를 반환하는 대신 예외를 다시 발생 (HSI_ewriter가 실행 요약에 기록)
     """
     try:
         if output_dir is None:
@@ -96,11 +100,14 @@ def save_interpolated_data(interpolated_data, filename, output_dir=None):
 
     except Exception as e:
         print(f"Error during interpolation: {str(e)}")
+        if raise_errors:
+            raise
         return False
 
 if __name__ == "__main__":
     # 파일 읽기
-    directory_path = '/Users/kwonsoomin/python_sm/sprint_data'
+    import sys
+    directory_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.getcwd(), 'sprint_data')
     excel_data = read_excel_files(directory_path)
     
     for filename, df in excel_data.items():
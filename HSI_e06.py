@@ -2,7 +2,9 @@ from HSI_e01 import read_excel_files
 import pandas as pd
 import numpy as np
 import os
-import matplotlib.pyplot as plt
+from HSI_eprofile import StageProfiler
+from HSI_espectral import summarize_spectral_groups
+from HSI_espm import spm_two_sample, spm_cluster_table
 
 def get_injury_side(data_dir):
     """
@@ -33,14 +35,57 @@ def get_injury_side(data_dir):
         if group == 'skip':
             continue
             
-        subject_data[subject] = {
-            'group': 'control' if group == 'c' else 'injury',
-            'side': 'right' if group in ['c', 'r'] else 'left'
-        }
+        subject_data[subject] = _group_entry(group)
     
     return subject_data
 
 
+def _group_entry(group):
+    """c/l/r 입력을 {'group': 상태, 'side': 데이터사용방향}으로 변환"""
+    return {
+        'group': 'control' if group == 'c' else 'injury',
+        'side': 'right' if group in ['c', 'r'] else 'left'
+    }
+
+
+def load_group_manifest(manifest_path):
+    """
+    그룹 매니페스트(CSV)로 피실험자 그룹 결정 (get_injury_side의 비대화형 버전)
+    - 열: subject, group (c/l/r/skip, get_injury_side 입력과 동일)
+    
+    Returns:
+        dict: {파일명: {'group': 상태, 'side': 데이터사용방향}}
+    """
+    manifest = pd.read_csv(manifest_path, dtype=str)
+    subject_data = {}
+    
+    for subject, group in zip(manifest['subject'], manifest['group'].str.strip().str.lower()):
+        if group not in ['c', 'l', 'r', 'skip']:
+            print(f"Unknown group '{group}' for {subject} in manifest, skipping...")
+            continue
+        if group == 'skip':
+            continue
+        subject_data[subject] = _group_entry(group)
+    
+    return subject_data
+
+
+def load_subject_curves(interpolated_dir, subject, side, sprint=1, dtype=None):
+    """
+    피실험자 한 명의 Step 5 보간 곡선 읽기
+    - dtype: 곡선 배열 자료형 (예: np.float32, None이면 float64)
+    
+    Returns:
+        dict: {'IMU': (사이클 수, 101) 배열, 'ACC': ..., 'BF': ..., 'ST': ...}
+    """
+    file_path = os.path.join(interpolated_dir, f"{subject}_{side}_interpolated.xlsx")
+    curves = {}
+    for key in ['IMU', 'ACC', 'BF', 'ST']:
+        data = pd.read_excel(file_path, sheet_name=f'{key}_sprint{sprint}', index_col=0)
+        curves[key] = data.values.T if dtype is None else data.values.T.astype(dtype)
+    return curves
+
+
 # ============ [단일 그룹 그래프 함수들] ============
 
 def plot_single_sensor(time_points, sensor_data, title, ylabel, output_path):
@@ -48,6 +93,7 @@ def plot_single_sensor(time_points, sensor_data, title, ylabel, output_path):
     단일 그룹(IMU/ACC)을 그리는 그래프
     sensor_data = {'mean': ..., 'std': ...}
     """
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(10, 6))
     plt.plot(time_points, sensor_data['mean'], 'r-', linewidth=2, label='Injury')
     plt.fill_between(time_points, 
@@ -69,6 +115,7 @@ def plot_single_emg(time_points, emg_data, group_name, output_path):
     단일 그룹 EMG(BF, ST) 그래프
     emg_data = {'BF': {'mean':..., 'std':...}, 'ST': {...}}
     """
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(10, 6))
     plt.plot(time_points, emg_data['BF']['mean'], 'r-', label='BF', linewidth=2)
     plt.fill_between(time_points, 
@@ -94,11 +141,23 @@ def plot_single_emg(time_points, emg_data, group_name, output_path):
 
 # ============ [비교 그래프 함수들] ============
 
-def plot_group_comparison(time_points, control_data, injury_data, title, ylabel, output_path):
+def shade_significant(time_points, significant, color='gray', label='p < 0.05 (SPM cluster)'):
+    """SPM 결과에서 유의한 구간을 세로 음영으로 표시"""
+    import matplotlib.pyplot as plt
+    significant = np.asarray(significant, dtype=bool)
+    edges = np.diff(np.concatenate([[0], significant.astype(int), [0]]))
+    for start, end in zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1) - 1):
+        plt.axvspan(time_points[start], time_points[end], color=color, alpha=0.15, label=label)
+        label = None  # 범례에는 한 번만 표시
+
+
+def plot_group_comparison(time_points, control_data, injury_data, title, ylabel, output_path, spm=None):
     """
     control_data와 injury_data를 비교하여 하나의 그래프에 표시합니다.
     만약 control_data가 None이면 injury_data만 표시합니다.
+    spm(spm_two_sample 결과)이 있으면 유의한 구간을 음영으로 표시합니다.
     """
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(10, 6))
     
     if control_data is not None:
@@ -121,6 +180,9 @@ def plot_group_comparison(time_points, control_data, injury_data, title, ylabel,
         plt.close()
         return
     
+    if spm is not None:
+        shade_significant(time_points, spm['significant'])
+    
     plt.title(title)
     plt.xlabel('Gait Cycle (%)')
     plt.ylabel(ylabel)
@@ -131,11 +193,13 @@ def plot_group_comparison(time_points, control_data, injury_data, title, ylabel,
     print(f"Saved comparison graph to: {output_path}")
 
 
-def plot_emg_group_comparison(time_points, control_data, injury_data, group_name, output_path):
+def plot_emg_group_comparison(time_points, control_data, injury_data, group_name, output_path, spm=None):
     """
     EMG 데이터를 control과 injury 그룹으로 비교하여 하나의 그래프로 생성합니다.
     control_data, injury_data는 {'BF': {'mean':..., 'std':...}, 'ST': {...}} 형태입니다.
+    spm = {'BF': spm_two_sample 결과, 'ST': ...} 이 있으면 근육별 유의 구간을 음영으로 표시합니다.
     """
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(10, 6))
     
     if control_data is not None:
@@ -170,6 +234,12 @@ def plot_emg_group_comparison(time_points, control_data, injury_data, group_name
         plt.close()
         return
     
+    if spm is not None:
+        for muscle, color in [('BF', 'orange'), ('ST', 'green')]:
+            if muscle in spm:
+                shade_significant(time_points, spm[muscle]['significant'], color=color,
+                                  label=f'{muscle} p < 0.05 (SPM cluster)')
+    
     plt.title(f'EMG - {group_name} Group Comparison')
     plt.xlabel('Gait Cycle (%)')
     plt.ylabel('EMG (μV)')
@@ -180,10 +250,39 @@ def plot_emg_group_comparison(time_points, control_data, injury_data, group_name
     print(f"Saved EMG comparison graph to: {output_path}")
 
 
-def save_stats_to_excel(results, output_dir):
+def plot_spectral_comparison(spectral_summary, output_path):
+    """
+    그룹별 스프린트에 따른 EMG 중앙 주파수(MDF) 변화 그래프 (BF, ST 각각 하나의 subplot)
+    spectral_summary = summarize_spectral_groups 결과
+    """
+    import matplotlib.pyplot as plt
+    colors = {'control': 'blue', 'injury': 'red'}
+    fig, axes = plt.subplots(1, 2, figsize=(12, 5), sharey=True)
+    
+    for ax, muscle in zip(axes, ['BF', 'ST']):
+        muscle_data = spectral_summary[spectral_summary['Muscle'] == muscle]
+        for group, group_data in muscle_data.groupby('Group'):
+            group_data = group_data.sort_values('Sprint')
+            ax.errorbar(group_data['Sprint'], group_data['MDF_Mean'], yerr=group_data['MDF_STD'],
+                        marker='o', capsize=4, color=colors.get(group), label=group.capitalize())
+        ax.set_title(f'EMG {muscle} - Median Frequency')
+        ax.set_xlabel('Sprint')
+        ax.grid(True, alpha=0.3)
+        ax.legend()
+    axes[0].set_ylabel('Median Frequency (Hz)')
+    
+    plt.tight_layout()
+    plt.savefig(output_path, dpi=300, bbox_inches='tight')
+    plt.close()
+    print(f"Saved spectral comparison graph to: {output_path}")
+
+
+def save_stats_to_excel(results, output_dir, spectral_summary=None, spm_results=None):
     """
     평균값과 표준편차를 하나의 엑셀 파일에 여러 시트로 저장 (control 그룹이 없으면 injury 데이터만 저장)
     만약 저장할 데이터가 없으면 기본 메시지가 담긴 시트를 생성합니다.
+    spectral_summary가 있으면 그룹/스프린트별 MDF, MNF를 'EMG_Spectral' 시트로 저장합니다.
+    spm_results가 있으면 각 시트에 SPM t 곡선/유의 여부 열을, 'SPM_Clusters' 시트에 클러스터 목록을 추가합니다.
     """
     os.makedirs(output_dir, exist_ok=True)
     time_points = np.linspace(0, 100, 101)
@@ -201,6 +300,9 @@ def save_stats_to_excel(results, output_dir):
             if results.get('injury') is not None and measurement in results['injury']:
                 data['Injury_Mean'] = results['injury'][measurement]['mean']
                 data['Injury_STD'] = results['injury'][measurement]['std']
+            if spm_results and measurement in spm_results:
+                data['SPM_t'] = spm_results[measurement]['t']
+                data['SPM_Significant'] = spm_results[measurement]['significant']
             
             if len(data) > 1:
                 df = pd.DataFrame(data)
@@ -218,6 +320,9 @@ def save_stats_to_excel(results, output_dir):
             if results.get('injury') is not None and muscle in results['injury']:
                 data['Injury_Mean'] = results['injury'][muscle]['mean']
                 data['Injury_STD'] = results['injury'][muscle]['std']
+            if spm_results and muscle in spm_results:
+                data['SPM_t'] = spm_results[muscle]['t']
+                data['SPM_Significant'] = spm_results[muscle]['significant']
             
             if len(data) > 1:
                 df = pd.DataFrame(data)
@@ -227,6 +332,16 @@ def save_stats_to_excel(results, output_dir):
             else:
                 print(f"No data for EMG {muscle} found. Skipping sheet creation.")
         
+        # EMG 주파수 지표 (MDF, MNF)
+        if spectral_summary is not None and not spectral_summary.empty:
+            spectral_summary.to_excel(writer, sheet_name='EMG_Spectral', index=False)
+            sheet_count += 1
+        
+        # SPM 클러스터 추론 결과
+        if spm_results:
+            spm_cluster_table(spm_results).to_excel(writer, sheet_name='SPM_Clusters', index=False)
+            sheet_count += 1
+        
         # 만약 생성된 시트가 하나도 없다면, 더미 시트를 생성하여 오류를 방지
         if sheet_count == 0:
             dummy_df = pd.DataFrame({"Message": ["No statistical data available."]})
@@ -236,8 +351,23 @@ def save_stats_to_excel(results, output_dir):
     print(f"Saved all statistics to: {output_path}")
 
 
-def analyze_injury_data(interpolated_dir, subject_data, output_dir):
-    """부상 데이터 분석 및 시각화 (조건부로 비교 그래프 호출)"""
+def analyze_injury_data(interpolated_dir, subject_data, output_dir, profiler=None, interval_dir=None,
+                        spm=True, n_permutations=10000, alpha=0.05, curve_cache=None, dtype=None,
+                        spectral_cache=None, spm_cache=None):
+    """
+    부상 데이터 분석 및 시각화 (조건부로 비교 그래프 호출)
+    - interval_dir: Step 4 결과 폴더가 주어지면 사이클별 EMG MDF/MNF도 그룹/스프린트별로 비교
+    - spm: 두 그룹이 모두 있으면 항목별 1D SPM 두 표본 t 검정 + 순열 클러스터 추론 (spm_two_sample)
+    - curve_cache: {(피실험자, side): load_subject_curves 결과} 딕셔너리
+      주어지면 캐시에 없는 피실험자만 파일에서 읽고 캐시에 추가 (반복 실행 시 재처리한 피실험자만 다시 읽음)
+    - dtype: 곡선을 쌓을 자료형 (np.float32이면 캐시/스택 메모리 절반, 평균/표준편차는 float64로 누적)
+    - spectral_cache: summarize_spectral_groups의 cache (Step 4 시트를 재처리한 피실험자만 다시 읽음)
+    - spm_cache: {곡선을 읽은 (피실험자, side, group)의 frozenset: SPM 결과} 딕셔너리
+      같은 피실험자 구성이면 순열 검정을 다시 하지 않음 (피실험자를 재처리하면 그 피실험자가 들어간 항목을 지워야 함)
+    """
+    if profiler is None:
+        profiler = StageProfiler()
+    profiler.start()
     os.makedirs(output_dir, exist_ok=True)
     stats = {
         'control': {'BF': [], 'ST': [], 'IMU': [], 'ACC': []},
@@ -245,32 +375,29 @@ def analyze_injury_data(interpolated_dir, subject_data, output_dir):
     }
     
     # 1) 데이터 수집 및 통계 계산
+    loaded = set()
     for subject, info in subject_data.items():
         try:
             filename = f"{subject}_{info['side']}_interpolated.xlsx"
-            file_path = os.path.join(interpolated_dir, filename)
-            
-            # IMU
-            imu_data = pd.read_excel(file_path, sheet_name='IMU_sprint1', index_col=0)
-            imu_data.index = imu_data.index.str.rstrip('%').astype(float)
-            stats[info['group']]['IMU'].extend(imu_data.values.T)
-            
-            # ACC
-            acc_data = pd.read_excel(file_path, sheet_name='ACC_sprint1', index_col=0)
-            acc_data.index = acc_data.index.str.rstrip('%').astype(float)
-            stats[info['group']]['ACC'].extend(acc_data.values.T)
+            cache_key = (subject, info['side'])
+            if curve_cache is not None and cache_key in curve_cache:
+                curves = curve_cache[cache_key]
+            else:
+                curves = load_subject_curves(interpolated_dir, subject, info['side'], dtype=dtype)
+                if curve_cache is not None:
+                    curve_cache[cache_key] = curves
             
-            # EMG (BF, ST)
-            for muscle in ['BF', 'ST']:
-                sheet_name = f'{muscle}_sprint1'
-                emg_data = pd.read_excel(file_path, sheet_name=sheet_name, index_col=0)
-                emg_data.index = emg_data.index.str.rstrip('%').astype(float)
-                stats[info['group']][muscle].extend(emg_data.values.T)
+            # IMU, ACC, EMG (BF, ST)
+            for key in ['IMU', 'ACC', 'BF', 'ST']:
+                stats[info['group']][key].extend(curves[key])
+            loaded.add((subject, info['side'], info['group']))
             
             print(f"Successfully processed: {filename}")
+            profiler.lap(subject, 'load_interpolated', cycles=len(curves['IMU']))
             
         except Exception as e:
             print(f"Error processing {subject}: {str(e)}")
+            profiler.lap(subject, 'load_interpolated')
             continue
     
     # 2) 평균과 표준편차 계산
@@ -284,13 +411,31 @@ def analyze_injury_data(interpolated_dir, subject_data, output_dir):
                 group_has_data = True
                 data = np.array(stats[group][key])
                 results[group][key] = {
-                    'mean': np.mean(data, axis=0),
-                    'std': np.std(data, axis=0)
+                    'mean': np.mean(data, axis=0, dtype=np.float64),
+                    'std': np.std(data, axis=0, dtype=np.float64)
                 }
     
         if not group_has_data:
             print(f"No data found for {group} group")
             results[group] = None
+    profiler.lap('(cohort)', 'group_statistics',
+                 cycles=sum(len(v) for group in stats.values() for v in group.values()))
+    
+    # 2-1) 그룹 간 SPM 검정 (두 그룹 모두 데이터가 있는 항목만)
+    spm_results = {}
+    spm_key = (frozenset(loaded), n_permutations, alpha)
+    if spm and spm_cache is not None and spm_key in spm_cache:
+        spm_results = spm_cache[spm_key]
+        print("Reusing SPM results (same subjects as the last refresh)")
+    elif spm:
+        for key in ['IMU', 'ACC', 'BF', 'ST']:
+            if stats['control'][key] and stats['injury'][key]:
+                spm_results[key] = spm_two_sample(np.array(stats['control'][key]),
+                                                  np.array(stats['injury'][key]),
+                                                  n_permutations=n_permutations, alpha=alpha)
+        profiler.lap('(cohort)', 'spm_permutation', cycles=len(spm_results) * n_permutations)
+        if spm_cache is not None:
+            spm_cache[spm_key] = spm_results
     
     # 3) 조건부 그래프 생성
     control_imu = results['control']['IMU'] if results['control'] and 'IMU' in results['control'] else None
@@ -311,7 +456,8 @@ def analyze_injury_data(interpolated_dir, subject_data, output_dir):
                               injury_imu,
                               "IMU Group Comparison",
                               "Angular Velocity (°/s)",
-                              os.path.join(output_dir, "IMU_comparison.png"))
+                              os.path.join(output_dir, "IMU_comparison.png"),
+                              spm=spm_results.get('IMU'))
     elif injury_imu:
         # Control이 없고 Injury만 존재 -> 단일 그래프
         plot_single_sensor(time_points,
@@ -327,7 +473,8 @@ def analyze_injury_data(interpolated_dir, subject_data, output_dir):
                               injury_acc,
                               "ACC Group Comparison",
                               "Acceleration (g)",
-                              os.path.join(output_dir, "ACC_comparison.png"))
+                              os.path.join(output_dir, "ACC_comparison.png"),
+                              spm=spm_results.get('ACC'))
     elif injury_acc:
         plot_single_sensor(time_points,
                            injury_acc,
@@ -344,7 +491,8 @@ def analyze_injury_data(interpolated_dir, subject_data, output_dir):
                                   control_emg_data,
                                   injury_emg_data,
                                   "EMG",
-                                  os.path.join(output_dir, "EMG_comparison.png"))
+                                  os.path.join(output_dir, "EMG_comparison.png"),
+                                  spm={m: spm_results[m] for m in ['BF', 'ST'] if m in spm_results})
     elif injury_bf and injury_st:
         # Control이 없거나 데이터 부족, Injury만 있음 -> 단일 그래프
         single_emg_data = {'BF': injury_bf, 'ST': injury_st}
@@ -353,14 +501,22 @@ def analyze_injury_data(interpolated_dir, subject_data, output_dir):
                         "Injury",
                         os.path.join(output_dir, "EMG_injury.png"))
     
+    # === EMG 주파수 지표 ===
+    spectral_summary = None
+    if interval_dir is not None:
+        spectral_summary = summarize_spectral_groups(interval_dir, subject_data, cache=spectral_cache)
+        if not spectral_summary.empty:
+            plot_spectral_comparison(spectral_summary, os.path.join(output_dir, "EMG_spectral_comparison.png"))
+    profiler.lap('(cohort)', 'plot')
+    
     # 4) 통계 데이터를 엑셀로 저장
-    save_stats_to_excel(results, output_dir)
+    save_stats_to_excel(results, output_dir, spectral_summary, spm_results)
+    profiler.lap('(cohort)', 'save_stats')
     
     return results
 
 
 if __name__ == "__main__":
-    data_dir = '/Users/kwonsoomin/python_sm/sprint_data'
     interpolated_dir = os.path.join(os.getcwd(), 'HSI_DataProcessing', '05_InterpolatedData')
     output_dir = os.path.join(os.getcwd(), 'HSI_DataProcessing', '06_InjuryAnalysis')
     
@@ -0,0 +1,394 @@
+# 원본 기록 압축 보관 (열 단위 청크 압축 + 스프린트/valley 인덱스, 스프린트 하나만 읽을 때 해당 청크만 해제)
+import os
+import json
+import zlib
+import argparse
+import numpy as np
+import pandas as pd
+from HSI_e01 import select_subjects, extract_sensor_groups
+from HSI_e02 import find_gait_cycles
+from HSI_e04 import find_sprint_intervals, DEFAULT_PARAMS
+
+FORMAT = 'hsi-raw-archive'
+VERSION = 1
+DATA_SUFFIX = '.chunks'
+INDEX_SUFFIX = '.json'
+# 청크 하나의 행 수 (2 kHz EMG 기준 약 2초, 스프린트 하나는 몇 개 청크)
+CHUNK_ROWS = 4096
+COMPRESS_LEVEL = 6
+# 소수 자릿수 검사 범위 (엑셀에 이 자릿수 이하로 기록된 청크는 정수 차분으로 무손실 저장)
+MAX_DECIMALS = 9
+# keep_bits 허용 범위 (float64 가수부 52비트 중 남길 비트 수, 52 이상이면 반올림할 것이 없음)
+KEEP_BITS_RANGE = (1, 51)
+# 센서 채널 저장 정밀도 ('float32'는 HSI_emain --float32 모드가 읽는 값과 같음, 시간 열은 항상 무손실)
+PRECISIONS = {'float64': np.float64, 'float32': np.float32}
+DATA_TYPES = ['IMU', 'ACC', 'BF', 'ST']
+
+
+def _shuffle(values):
+    """바이트 셔플: 같은 자리 바이트끼리 모아 지수/상위 바이트의 반복이 압축되도록 함"""
+    return np.ascontiguousarray(values.view(np.uint8).reshape(-1, values.itemsize).T).tobytes()
+
+
+def _unshuffle(buffer, dtype, n):
+    itemsize = np.dtype(dtype).itemsize
+    return np.ascontiguousarray(np.frombuffer(buffer, dtype=np.uint8).reshape(itemsize, n).T).view(dtype).ravel()
+
+
+def _bit_round(values, keep_bits):
+    """float64 가수부를 keep_bits 비트로 반올림 (손실 압축, NaN/inf는 그대로)"""
+    drop = 52 - keep_bits
+    bits = values.view(np.uint64).copy()
+    finite = np.isfinite(values)
+    half, mask = np.uint64(1 << (drop - 1)), ~np.uint64((1 << drop) - 1)
+    bits[finite] = (bits[finite] + half) & mask
+    return bits.view(np.float64)
+
+
+def _decimals(values):
+    """모든 값이 소수 k자리로 정확히 표현되는 가장 작은 k (NaN이 있거나 없으면 None)"""
+    if np.isnan(values).any() or np.abs(values).max(initial=0) >= 2 ** 52 / 10 ** MAX_DECIMALS:
+        return None
+    for k in range(MAX_DECIMALS + 1):
+        scaled = np.rint(values * 10 ** k)
+        if np.array_equal(scaled / 10 ** k, values):
+            return k
+    return None
+
+
+def encode_chunk(values, keep_bits=None, precision='float64'):
+    """
+    청크 하나 압축
+
+    - 소수 k자리로 정확히 복원되는 청크(시간 열 등): 10^k배 정수의 차분을 셔플 후 zlib ('decimal')
+    - 그 외: (keep_bits가 있으면 가수부 반올림 후) float64를 셔플 후 zlib ('float')
+    - precision='float32': 그 외 청크를 float32로 변환해 셔플 후 zlib ('float32', float64 대비 절반 이하)
+
+    Returns:
+    - (압축 바이트, 인코딩 이름, 소수 자릿수)
+    """
+    decimals = _decimals(values)
+    if decimals is not None:
+        scaled = np.rint(values * 10 ** decimals).astype(np.int64)
+        delta = np.diff(scaled, prepend=np.int64(0))
+        return zlib.compress(_shuffle(delta), COMPRESS_LEVEL), 'decimal', decimals
+    if keep_bits is not None:
+        values = _bit_round(values, keep_bits)
+    if precision == 'float32':
+        return zlib.compress(_shuffle(np.ascontiguousarray(values, dtype=np.float32)), COMPRESS_LEVEL), 'float32', None
+    return zlib.compress(_shuffle(np.ascontiguousarray(values, dtype=np.float64)), COMPRESS_LEVEL), 'float', None
+
+
+def decode_chunk(buffer, encoding, decimals, n):
+    """encode_chunk의 역변환"""
+    if encoding == 'decimal':
+        scaled = np.cumsum(_unshuffle(zlib.decompress(buffer), np.int64, n))
+        return scaled / 10 ** decimals
+    if encoding == 'float32':
+        return _unshuffle(zlib.decompress(buffer), np.float32, n).astype(np.float64)
+    return _unshuffle(zlib.decompress(buffer), np.float64, n)
+
+
+def leg_channels(columns):
+    """
+    원본 열 이름에서 다리/데이터 종류별 열과 그 열의 시간 열 찾기 (extract_sensor_groups와 같은 규칙)
+
+    Returns:
+    - channels: {'right': {'IMU': 열, 'ACC': 열, 'BF': 열, 'ST': 열}, 'left': {...}}
+    - time_columns: {열: 그 열 바로 앞의 X [s] 열}
+    """
+    groups = {'GYRO': [], 'ACC': [], 'EMG': []}
+    time_columns, time_column = {}, None
+    for col in columns:
+        if 'X [s]' in col:
+            time_column = col
+            continue
+        time_columns[col] = time_column
+        if 'GYRO.Z' in col and '[°/s]' in col:
+            groups['GYRO'].append(col)
+        elif 'ACC.Z' in col and '[g]' in col:
+            groups['ACC'].append(col)
+        elif 'EMG' in col:
+            groups['EMG'].append(col)
+    channels = {
+        'right': {'IMU': groups['GYRO'][0], 'ACC': groups['ACC'][0], 'BF': groups['EMG'][0], 'ST': groups['EMG'][1]},
+        'left': {'IMU': groups['GYRO'][1], 'ACC': groups['ACC'][1], 'BF': groups['EMG'][2], 'ST': groups['EMG'][3]}
+    }
+    return channels, time_columns
+
+
+def sprint_index(raw_df, params=None):
+    """
+    인덱스용 다리별 스프린트 구간과 valley (GYRO 시간축 기준 행 번호와 시각)
+    - 원본 행을 그대로 보관하므로 시간축 복구 없이 NaN만 선형으로 채워 검출
+
+    Returns:
+    - {'right': {'sprints': {번호: [시작 행, 끝 행, 시작 시각, 끝 시각]}, 'valleys': [행], 'valley_times': [시각]},
+       'left': {...}}
+    """
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    gyro = extract_sensor_groups(raw_df)['GYRO']
+    time_values = gyro['X [s]'].interpolate(limit_direction='both')
+    legs = {}
+    for side, position in [('right', 1), ('left', 2)]:
+        signal = gyro.iloc[:, position].interpolate(limit_direction='both')
+        valleys, _ = find_gait_cycles(time_values, signal, side.capitalize(), min_distance=params['min_distance'],
+                                      window_size=params['window_size'], peak_threshold=params['peak_threshold'])
+        intervals = find_sprint_intervals(signal.values, time_values.values,
+                                          velocity_threshold=params['velocity_threshold'],
+                                          min_rest_duration=params['min_rest_duration'])
+        last = len(time_values) - 1
+        legs[side] = {
+            'sprints': {str(sprint): [int(start), int(end), float(time_values.iloc[start]),
+                                      float(time_values.iloc[min(end, last)])]
+                        for sprint, (start, end) in intervals.items()},
+            'valleys': [int(v) for v in valleys],
+            'valley_times': [float(t) for t in time_values.values[np.asarray(valleys, dtype=int)]]
+        }
+    return legs
+
+
+def archive_recording(raw_df, output_base, source=None, chunk_rows=CHUNK_ROWS, keep_bits=None, params=None,
+                      precision='float64'):
+    """
+    원본 데이터프레임(pd.read_excel 결과, X [s] 열 포함) 하나를 보관 파일로 저장
+
+    - <output_base>.chunks: 열마다 chunk_rows행씩 나눈 압축 청크를 이어 붙인 파일
+    - <output_base>.json: 열/청크 위치, 청크별 시간 범위, 다리별 스프린트 구간과 valley (sidecar 인덱스)
+    - 내용이 같은 열(반복되는 X [s] 열)은 한 번만 저장
+    - keep_bits: None이면 무손실, 숫자이면 float 청크의 가수부를 그 비트 수로 반올림 (손실, 예: 20비트는 상대오차 1e-6)
+    - precision: 'float64'이면 무손실, 'float32'이면 센서 열을 float32로 저장 (--float32 파이프라인 입력과 같은 값)
+    - 전체 정밀도로 기록된 엑셀 기준 크기: 무손실 약 42%, float32 약 21%, keep_bits=20 약 19% (xlsx 대비)
+
+    Parameters:
+    - raw_df: 원본 데이터프레임
+    - output_base: 확장자를 뺀 저장 경로 (예: sprint_archive/S00)
+    - source: 원본 파일 이름 (인덱스에 기록)
+    - chunk_rows: 청크 행 수
+    - params: 스프린트/valley 검출 파라미터 (HSI_e04.DEFAULT_PARAMS 참고)
+    - precision: 센서 열 저장 정밀도 (PRECISIONS의 키)
+
+    Returns:
+    - index: 저장한 인덱스 딕셔너리
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision: {precision} (expected one of {list(PRECISIONS)})")
+    if keep_bits is not None and not KEEP_BITS_RANGE[0] <= keep_bits <= KEEP_BITS_RANGE[1]:
+        raise ValueError(f"keep_bits must be within {KEEP_BITS_RANGE[0]}-{KEEP_BITS_RANGE[1]}: {keep_bits}")
+    # 인덱스(스프린트/valley 검출)를 먼저 만들어 검출이 실패해도 인덱스 없는 .chunks 파일이 남지 않도록 함
+    channels, time_columns = leg_channels([str(c) for c in raw_df.columns])
+    legs = sprint_index(raw_df, params)
+    os.makedirs(os.path.dirname(os.path.abspath(output_base)), exist_ok=True)
+    n_rows = len(raw_df)
+    starts = np.arange(0, n_rows, chunk_rows)
+    columns, stored = [], {}
+    offset = 0
+    try:
+        with open(output_base + DATA_SUFFIX, 'wb') as f:
+            for name in raw_df.columns:
+                values = raw_df[name].to_numpy(dtype=np.float64)
+                entry = {'name': str(name)}
+                same = next((other for other, other_values in stored.items()
+                             if np.array_equal(values, other_values, equal_nan=True)), None)
+                if same is not None:
+                    entry['same_as'] = same
+                    columns.append(entry)
+                    continue
+                chunks = []
+                # 시간 열은 정밀도와 관계없이 무손실 (float32로는 긴 기록의 샘플 간격을 구분할 수 없음)
+                column_precision = 'float64' if 'X [s]' in str(name) else precision
+                for start in starts:
+                    block = values[start:start + chunk_rows]
+                    buffer, encoding, decimals = encode_chunk(block, keep_bits, column_precision)
+                    f.write(buffer)
+                    finite = block[~np.isnan(block)]
+                    chunks.append({'offset': offset, 'nbytes': len(buffer), 'encoding': encoding,
+                                   'decimals': decimals, 'min': float(finite.min()) if len(finite) else None,
+                                   'max': float(finite.max()) if len(finite) else None})
+                    offset += len(buffer)
+                entry['chunks'] = chunks
+                stored[str(name)] = values
+                columns.append(entry)
+
+        index = {
+            'format': FORMAT, 'version': VERSION, 'source': source, 'n_rows': n_rows, 'chunk_rows': chunk_rows,
+            'keep_bits': keep_bits, 'precision': precision, 'columns': columns, 'channels': channels,
+            'time_columns': time_columns, 'legs': legs
+        }
+        with open(output_base + INDEX_SUFFIX, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False)
+    except BaseException:
+        # 쓰다 만 파일은 지움 (인덱스 없는 .chunks나 깨진 .json이 남지 않도록)
+        for suffix in [DATA_SUFFIX, INDEX_SUFFIX]:
+            if os.path.exists(output_base + suffix):
+                os.remove(output_base + suffix)
+        raise
+    return index
+
+
+class RawArchive:
+    """
+    보관 파일 읽기 (청크 단위 임의 접근)
+
+    사용법:
+        archive = RawArchive('sprint_archive/S00')
+        segment = archive.read_sprint(3, 'left', 'BF')   # 해당 시간 범위의 청크만 해제
+        raw_df = archive.to_dataframe()                    # pd.read_excel 결과와 같은 전체 데이터프레임
+    """
+
+    def __init__(self, base_path):
+        base_path = base_path[:-len(INDEX_SUFFIX)] if base_path.endswith(INDEX_SUFFIX) else base_path
+        with open(base_path + INDEX_SUFFIX, encoding='utf-8') as f:
+            self.index = json.load(f)
+        if self.index.get('format') != FORMAT:
+            raise ValueError(f"Not an HSI raw archive: {base_path + INDEX_SUFFIX}")
+        self.data_path = base_path + DATA_SUFFIX
+        self.columns = {entry['name']: entry for entry in self.index['columns']}
+        self.chunks_read = 0
+
+    def _entry(self, name):
+        entry = self.columns[name]
+        return self.columns[entry['same_as']] if 'same_as' in entry else entry
+
+    def _chunk_rows(self, i):
+        start = i * self.index['chunk_rows']
+        return start, min(start + self.index['chunk_rows'], self.index['n_rows'])
+
+    def read_chunks(self, name, chunk_ids):
+        """열 하나의 지정 청크만 읽어 이어 붙임"""
+        chunks = self._entry(name)['chunks']
+        parts = []
+        with open(self.data_path, 'rb') as f:
+            for i in chunk_ids:
+                chunk = chunks[i]
+                f.seek(chunk['offset'])
+                start, end = self._chunk_rows(i)
+                parts.append(decode_chunk(f.read(chunk['nbytes']), chunk['encoding'], chunk['decimals'], end - start))
+        self.chunks_read += len(parts)
+        return np.concatenate(parts) if parts else np.empty(0)
+
+    def read_rows(self, name, start, end):
+        """열 하나의 [start, end) 행 (겹치는 청크만 해제)"""
+        chunk_rows = self.index['chunk_rows']
+        first, last = start // chunk_rows, (max(end, start + 1) - 1) // chunk_rows
+        values = self.read_chunks(name, range(first, last + 1))
+        return values[start - first * chunk_rows:end - first * chunk_rows]
+
+    def read_time_window(self, name, start_time, end_time):
+        """
+        열 하나에서 시각이 [start_time, end_time]인 샘플 (열의 시간 열 청크 범위로 겹치는 청크만 해제)
+
+        Returns:
+        - 데이터프레임 (열: 'X [s]', name)
+        """
+        time_name = self.index['time_columns'][name]
+        ranges = np.array([[np.nan if c['min'] is None else c['min'], np.nan if c['max'] is None else c['max']]
+                           for c in self._entry(time_name)['chunks']], dtype=float)
+        chunk_ids = np.flatnonzero((ranges[:, 1] >= start_time) & (ranges[:, 0] <= end_time))
+        time_values = self.read_chunks(time_name, chunk_ids)
+        values = self.read_chunks(name, chunk_ids)
+        inside = (time_values >= start_time) & (time_values <= end_time)
+        return pd.DataFrame({'X [s]': time_values[inside], name: values[inside]})
+
+    def sprints(self, side):
+        """다리별 스프린트 구간 {번호: (시작 시각, 끝 시각)}"""
+        return {int(sprint): (start_time, end_time)
+                for sprint, (_, _, start_time, end_time) in self.index['legs'][side]['sprints'].items()}
+
+    def valleys(self, side, sprint=None):
+        """다리별 valley 시각 배열 (sprint를 주면 그 스프린트 구간 안의 valley만)"""
+        times = np.asarray(self.index['legs'][side]['valley_times'], dtype=float)
+        if sprint is None:
+            return times
+        start_time, end_time = self.sprints(side)[sprint]
+        return times[np.searchsorted(times, start_time):np.searchsorted(times, end_time, side='right')]
+
+    def read_sprint(self, sprint, side, data_type, pad=0.0):
+        """
+        스프린트 하나의 다리/데이터 종류 채널 (예: read_sprint(3, 'left', 'BF'))
+
+        Parameters:
+        - sprint: 스프린트 번호 (find_sprint_intervals 기준, 해당 다리)
+        - side: 'right' 또는 'left'
+        - data_type: 'IMU', 'ACC', 'BF', 'ST'
+        - pad: 구간 앞뒤로 더 읽을 시간 (초)
+        """
+        start_time, end_time = self.sprints(side)[sprint]
+        return self.read_time_window(self.index['channels'][side][data_type], start_time - pad, end_time + pad)
+
+    def to_dataframe(self):
+        """전체 원본 데이터프레임 복원 (pd.read_excel 결과와 같은 열 순서/값)"""
+        n_chunks = -(-self.index['n_rows'] // self.index['chunk_rows'])
+        decoded = {}
+        for name, entry in self.columns.items():
+            source = entry.get('same_as', name)
+            if source not in decoded:
+                decoded[source] = self.read_chunks(source, range(n_chunks))
+        return pd.DataFrame({name: decoded[entry.get('same_as', name)] for name, entry in self.columns.items()})
+
+
+def archive_directory(data_dir, archive_dir, include=None, exclude=None, chunk_rows=CHUNK_ROWS, keep_bits=None,
+                      params=None, precision='float64'):
+    """
+    폴더의 원본 엑셀을 모두 보관 파일로 변환하고 크기 비교표 반환
+
+    Returns:
+    - 데이터프레임 (열: file, xlsx_bytes, archive_bytes, ratio)
+    """
+    rows = []
+    for filename in select_subjects(sorted(f for f in os.listdir(data_dir) if f.endswith('.xlsx')),
+                                    include, exclude):
+        file_path = os.path.join(data_dir, filename)
+        base = os.path.join(archive_dir, os.path.splitext(filename)[0])
+        try:
+            archive_recording(pd.read_excel(file_path), base, source=filename, chunk_rows=chunk_rows,
+                              keep_bits=keep_bits, params=params, precision=precision)
+        except Exception as e:
+            print(f"Error archiving {filename}: {str(e)}")
+            continue
+        archive_bytes = os.path.getsize(base + DATA_SUFFIX) + os.path.getsize(base + INDEX_SUFFIX)
+        rows.append({'file': filename, 'xlsx_bytes': os.path.getsize(file_path), 'archive_bytes': archive_bytes,
+                     'ratio': round(archive_bytes / os.path.getsize(file_path), 4)})
+        print(f"Archived {filename}: {rows[-1]['ratio']:.1%} of xlsx")
+    return pd.DataFrame(rows, columns=['file', 'xlsx_bytes', 'archive_bytes', 'ratio'])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Build or read chunked HSI raw-session archives')
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help='archive every .xlsx in a folder')
+    build.add_argument('data_dir')
+    build.add_argument('archive_dir')
+    build.add_argument('--include', nargs='+')
+    build.add_argument('--exclude', nargs='+')
+    build.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    build.add_argument('--keep-bits', type=int, help='lossy: mantissa bits kept for float chunks (default lossless)')
+    build.add_argument('--precision', choices=list(PRECISIONS), default='float64',
+                       help='sensor channel precision (float32 matches the pipeline --float32 mode)')
+    read = commands.add_parser('read', help='read one sprint of one channel')
+    read.add_argument('archive_dir')
+    read.add_argument('subject')
+    read.add_argument('sprint', type=int)
+    read.add_argument('side', choices=['right', 'left'])
+    read.add_argument('data_type', choices=DATA_TYPES)
+    read.add_argument('--pad', type=float, default=0.0)
+    read.add_argument('--output', help='CSV path (default: print a summary)')
+    args = parser.parse_args()
+    if args.command == 'build' and args.keep_bits is not None and \
+            not KEEP_BITS_RANGE[0] <= args.keep_bits <= KEEP_BITS_RANGE[1]:
+        parser.error(f"--keep-bits must be within {KEEP_BITS_RANGE[0]}-{KEEP_BITS_RANGE[1]}")
+
+    if args.command == 'build':
+        sizes = archive_directory(args.data_dir, args.archive_dir, args.include, args.exclude,
+                                  chunk_rows=args.chunk_rows, keep_bits=args.keep_bits, precision=args.precision)
+        print(sizes.to_string(index=False))
+    else:
+        archive = RawArchive(os.path.join(args.archive_dir, args.subject))
+        segment = archive.read_sprint(args.sprint, args.side, args.data_type, pad=args.pad)
+        print(f"{args.subject} sprint {args.sprint} {args.side} {args.data_type}: {len(segment)} samples "
+              f"({archive.chunks_read} chunk(s) decompressed)")
+        if args.output:
+            segment.to_csv(args.output, index=False)
+            print(f"Saved to: {args.output}")
+        else:
+            print(segment.describe().to_string())
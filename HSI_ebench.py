@@ -0,0 +1,258 @@
+# 단계별 함수 마이크로벤치마크 (합성 데이터 사용)
+import os
+import io
+import json
+import time
+import argparse
+import platform
+import subprocess
+import tempfile
+import contextlib
+import numpy as np
+import pandas as pd
+from HSI_e01 import ACC_extract, GYRO_extract, EMG_extract, split_legs, cast_signals
+from HSI_e02 import find_gait_cycles
+from HSI_e03 import extract_peak_data, save_peak_data_to_excel
+from HSI_e04 import (find_sprint_intervals, find_cycles_in_sprint,
+                     select_middle_cycles, save_interval_data_to_excel)
+from HSI_e05 import interpolate_cycle_data, save_interpolated_data
+from HSI_esynth import generate_sprint_recording
+
+# 신호 길이는 스프린트 횟수로 조절 (스프린트 1회 + 휴식 = 18초)
+DEFAULT_SPRINTS = [1, 3, 6, 12]
+
+# float32 모드 허용 오차 (precision_check)
+# - 검출/선택 결과(valley, 선택된 사이클)는 float64와 완전히 같아야 함
+# - 보간 곡선과 그룹 평균/표준편차: 최대 절대 오차 <= rtol x 채널 최대 크기
+#   (float32 유효 자릿수 약 7자리, 입력 반올림 오차 2^-24 ~ 6e-8에 보간/누적 여유를 둔 값)
+FLOAT32_RTOL = 1e-5
+
+
+def _timeit(func, repeats):
+    """func를 repeats번 실행하여 (최소, 평균) 소요 시간(초)과 마지막 반환값을 반환"""
+    times = []
+    result = None
+    for _ in range(repeats):
+        # 진행 메시지 출력이 측정을 방해하지 않도록 stdout을 버림
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = func()
+            times.append(time.perf_counter() - start)
+    return min(times), float(np.mean(times)), result
+
+
+def _version_info():
+    """결과 비교를 위한 코드/환경 버전 정보"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                                cwd=os.path.dirname(os.path.abspath(__file__)),
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = 'unknown'
+    return {
+        'commit': commit,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.platform()
+    }
+
+
+def run_benchmarks(sprint_counts=None, repeats=3, fs=1000.0, seed=0):
+    """
+    신호 길이별로 각 단계 함수의 실행 시간을 측정
+
+    Parameters:
+    - sprint_counts: 합성 데이터의 스프린트 횟수 리스트 (신호 길이 결정)
+    - repeats: 함수별 반복 측정 횟수 (최소값을 대표값으로 사용)
+    - fs: 합성 데이터 샘플링 주파수 (Hz)
+    - seed: 합성 데이터 난수 시드
+
+    Returns:
+    - results: [{'function', 'n_samples', 'n_sprints', 'best_s', 'mean_s', 'repeats'}] 리스트
+    """
+    if sprint_counts is None:
+        sprint_counts = DEFAULT_SPRINTS
+    results = []
+
+    for n_sprints in sprint_counts:
+        df = generate_sprint_recording(fs=fs, n_sprints=n_sprints, seed=seed)
+        gyro_data = GYRO_extract(df)
+        acc_data = ACC_extract(df)
+        emg_data = EMG_extract(df)
+        time_data = gyro_data['X [s]']
+        right_gyro, left_gyro = gyro_data.iloc[:, 1], gyro_data.iloc[:, 2]
+        right_acc, left_acc = acc_data.iloc[:, 1], acc_data.iloc[:, 2]
+        right_emg = {'BF': emg_data.iloc[:, 1], 'ST': emg_data.iloc[:, 2]}
+        left_emg = {'BF': emg_data.iloc[:, 3], 'ST': emg_data.iloc[:, 4]}
+        n_samples = len(time_data)
+        print(f"\n=== {n_sprints} sprint(s), {n_samples} samples ===")
+
+        def record(name, func):
+            best, mean, result = _timeit(func, repeats)
+            results.append({
+                'function': name,
+                'n_samples': n_samples,
+                'n_sprints': n_sprints,
+                'best_s': best,
+                'mean_s': mean,
+                'repeats': repeats
+            })
+            print(f"{name:<30s} best {best * 1000:10.2f} ms   mean {mean * 1000:10.2f} ms")
+            return result
+
+        right_valleys, _ = record('find_gait_cycles',
+                                  lambda: find_gait_cycles(time_data, right_gyro, 'Right'))
+        left_valleys, _ = find_gait_cycles(time_data, left_gyro, 'Left')
+
+        right_intervals = record('find_sprint_intervals',
+                                 lambda: find_sprint_intervals(right_gyro.values, time_data.values))
+        left_intervals = find_sprint_intervals(left_gyro.values, time_data.values)
+
+        right_categorized = record('find_cycles_in_sprint',
+                                   lambda: find_cycles_in_sprint(right_valleys, right_intervals))
+        left_categorized = find_cycles_in_sprint(left_valleys, left_intervals)
+
+        right_selected = record('select_middle_cycles',
+                                lambda: select_middle_cycles(right_categorized))
+        left_selected = select_middle_cycles(left_categorized)
+
+        def interpolate_all():
+            interpolated = {}
+            for side, selected, channels in [
+                    ('right', right_selected, {'IMU': right_gyro, 'ACC': right_acc, **right_emg}),
+                    ('left', left_selected, {'IMU': left_gyro, 'ACC': left_acc, **left_emg})]:
+                interpolated[side] = {
+                    data_type: {category: interpolate_cycle_data(time_data, data, cycles)
+                                for category, cycles in selected.items() if len(cycles) > 1}
+                    for data_type, data in channels.items()
+                }
+            return interpolated
+
+        record('interpolate_cycle_data', lambda: interpolate_cycle_data(
+            time_data, right_gyro, next(iter(right_selected.values()), [])))
+        interpolated = record('interpolate_cycle_data[all]', interpolate_all)
+
+        right_peak = extract_peak_data(right_valleys, time_data, right_gyro, right_acc, right_emg)
+        left_peak = extract_peak_data(left_valleys, time_data, left_gyro, left_acc, left_emg)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            record('save_peak_data_to_excel', lambda: save_peak_data_to_excel(
+                right_peak, left_peak, 'bench.xlsx', tmp_dir))
+            record('save_interval_data_to_excel', lambda: save_interval_data_to_excel(
+                right_selected, left_selected, time_data,
+                right_gyro, left_gyro, right_acc, left_acc,
+                right_emg, left_emg, 'bench.xlsx', tmp_dir))
+            record('save_interpolated_data', lambda: save_interpolated_data(
+                interpolated, 'bench.xlsx', tmp_dir))
+
+    return results
+
+
+def precision_check(n_sprints=3, fs=1000.0, seed=0, rtol=FLOAT32_RTOL):
+    """
+    float32 모드(main(float32=True))가 float64 결과와 허용 오차 안에서 같은지 확인 (합성 데이터)
+
+    - Step 2, 4 검출/선택 결과가 같은지 확인
+    - Step 5 보간 곡선과 곡선 평균/표준편차(Step 6와 같은 float64 누적)의 최대 오차를
+      채널 최대 크기 대비 비율로 계산하여 rtol과 비교
+
+    Returns:
+    - report: 행 = (side, data_type, 항목), 열 = max_abs_error, scale, relative_error, passed
+    """
+    df = generate_sprint_recording(fs=fs, n_sprints=n_sprints, seed=seed)
+    outputs = {}
+    for label, frame in [('float64', df), ('float32', cast_signals(df, np.float32))]:
+        time_data, legs = split_legs(frame)
+        outputs[label] = {}
+        for side, channels in legs.items():
+            valleys, _ = find_gait_cycles(time_data, channels['IMU'], side.capitalize())
+            intervals = find_sprint_intervals(channels['IMU'].values, time_data.values)
+            selected = select_middle_cycles(find_cycles_in_sprint(valleys, intervals))
+            curves = {data_type: np.vstack([curve for cycles in selected.values() if len(cycles) > 1
+                                            for curve in interpolate_cycle_data(time_data, data, cycles)])
+                      for data_type, data in channels.items()}
+            outputs[label][side] = {'valleys': list(valleys), 'selected': selected, 'curves': curves}
+
+    rows = []
+    for side, reference in outputs['float64'].items():
+        compact = outputs['float32'][side]
+        if reference['valleys'] != compact['valleys'] or reference['selected'] != compact['selected']:
+            rows.append({'side': side, 'data_type': 'IMU', 'item': 'cycle_selection',
+                         'max_abs_error': np.nan, 'scale': np.nan, 'relative_error': np.nan, 'passed': False})
+            continue
+        for data_type, curves in reference['curves'].items():
+            single = compact['curves'][data_type]
+            scale = float(np.max(np.abs(curves)))
+            for item, a, b in [('curves', curves, single),
+                               ('mean', curves.mean(axis=0), single.mean(axis=0, dtype=np.float64)),
+                               ('std', curves.std(axis=0), single.std(axis=0, dtype=np.float64))]:
+                error = float(np.max(np.abs(a - b)))
+                rows.append({'side': side, 'data_type': data_type, 'item': item, 'max_abs_error': error,
+                             'scale': scale, 'relative_error': error / scale, 'passed': error <= rtol * scale})
+
+    report = pd.DataFrame(rows).set_index(['side', 'data_type', 'item'])
+    status = 'PASSED' if report['passed'].all() else 'FAILED'
+    print(f"float32 precision check {status} (rtol {rtol:g}, worst {report['relative_error'].max():.2e})")
+    return report
+
+
+def save_benchmarks(results, output_dir):
+    """
+    측정 결과를 버전 정보와 함께 JSON으로 저장 (bench_{커밋}_{시각}.json)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    info = _version_info()
+    output_path = os.path.join(
+        output_dir, f"bench_{info['commit']}_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump({'meta': info, 'results': results}, f, indent=2)
+    print(f"\nBenchmark results saved to: {output_path}")
+    return output_path
+
+
+def compare_benchmarks(baseline_path, current_path):
+    """
+    두 벤치마크 결과 파일을 함수/신호 길이별로 비교
+
+    Returns:
+    - df: best_s 기준 비교 표 (ratio = current / baseline, 1보다 크면 느려짐)
+    """
+    frames = []
+    for label, path in [('baseline', baseline_path), ('current', current_path)]:
+        with open(path, encoding='utf-8') as f:
+            df = pd.DataFrame(json.load(f)['results'])
+        frames.append(df.set_index(['function', 'n_samples'])['best_s'].rename(label))
+
+    df = pd.concat(frames, axis=1)
+    df['ratio'] = df['current'] / df['baseline']
+    return df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='HSI pipeline microbenchmarks')
+    parser.add_argument('--sprints', type=int, nargs='+', default=DEFAULT_SPRINTS,
+                        help='synthetic sprint counts (controls signal length)')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--fs', type=float, default=1000.0)
+    parser.add_argument('--output-dir', default=os.path.join(os.getcwd(), 'HSI_DataProcessing', 'bench'))
+    parser.add_argument('--compare', metavar='BASELINE_JSON',
+                        help='compare the new results against an earlier result file')
+    parser.add_argument('--precision', action='store_true',
+                        help='only check float32 mode against float64 (FLOAT32_RTOL)')
+    args = parser.parse_args()
+
+    if args.precision:
+        report = precision_check(n_sprints=max(args.sprints), fs=args.fs)
+        with pd.option_context('display.float_format', '{:.3e}'.format, 'display.width', 120):
+            print(report)
+        raise SystemExit(0 if report['passed'].all() else 1)
+
+    results = run_benchmarks(args.sprints, repeats=args.repeats, fs=args.fs)
+    output_path = save_benchmarks(results, args.output_dir)
+
+    if args.compare:
+        comparison = compare_benchmarks(args.compare, output_path)
+        with pd.option_context('display.float_format', '{:.4f}'.format, 'display.width', 120):
+            print(comparison)
@@ -0,0 +1,312 @@
+# 피실험자 메타데이터 기반 임의 그룹 비교 (정규화된 사이클을 하나의 배열로 쌓아 group-by 통계)
+import os
+import numpy as np
+import pandas as pd
+from HSI_e06 import _group_entry
+
+DATA_TYPES = ['IMU', 'ACC', 'BF', 'ST']
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def load_subject_metadata(metadata_path, bands=None):
+    """
+    피실험자 메타데이터 표 (CSV 또는 엑셀) 읽기
+
+    - 필수 열: subject
+    - 선택 열: group (c/l/r/skip, 그룹 매니페스트와 동일), side (right/left),
+      그 외 임의 열 (예: sport, sex, age, injury_date, session_date)
+    - group이 c/l/r이면 control/injury로 바꾸고 side가 없으면 분석할 다리 방향도 함께 결정
+    - *_date 열은 날짜로 변환하고, injury_date와 session_date가 모두 있으면 days_since_injury 열 추가
+    - bands: {열: 구간 경계 리스트} (예: {'age': [18, 25, 30, 40]}, 열마다 add_band로 '{열}_band' 열 추가,
+      CLI는 HSI_emain --band age=18,25,30,40)
+
+    Returns:
+    - metadata: 피실험자(subject)를 인덱스로 하는 데이터프레임 ('skip' 행 제외)
+    """
+    if metadata_path.endswith(('.xlsx', '.xls')):
+        metadata = pd.read_excel(metadata_path, dtype={'subject': str})
+    else:
+        metadata = pd.read_csv(metadata_path, dtype={'subject': str})
+    metadata['subject'] = metadata['subject'].str.strip()
+    metadata = metadata.set_index('subject')
+
+    if 'group' in metadata.columns:
+        codes = metadata['group'].astype(str).str.strip().str.lower()
+        metadata = metadata[codes != 'skip']
+        codes = codes[codes != 'skip']
+        is_code = codes.isin(['c', 'l', 'r'])
+        entries = codes[is_code].map(_group_entry)
+        metadata.loc[is_code, 'group'] = entries.map(lambda entry: entry['group'])
+        if 'side' not in metadata.columns:
+            metadata['side'] = entries.map(lambda entry: entry['side'])
+
+    for column in [c for c in metadata.columns if c.endswith('_date')]:
+        metadata[column] = pd.to_datetime(metadata[column], errors='coerce')
+    if 'injury_date' in metadata.columns and 'session_date' in metadata.columns:
+        metadata['days_since_injury'] = (metadata['session_date'] - metadata['injury_date']).dt.days
+
+    for column, bins in (bands or {}).items():
+        if column not in metadata.columns:
+            raise ValueError(f"Band column '{column}' not in metadata: {metadata_path}")
+        metadata = add_band(metadata, column, bins)
+
+    return metadata
+
+
+def add_band(metadata, column, bins, labels=None, name=None):
+    """
+    연속 변수(예: age, days_since_injury)를 구간 열로 변환 (group-by 키로 사용)
+
+    Parameters:
+    - metadata: load_subject_metadata 결과
+    - column: 구간으로 나눌 열
+    - bins: 구간 경계 리스트 (왼쪽 포함, 예: [18, 25, 30, 40])
+    - labels: 구간 이름 (None이면 '18-25' 형식)
+    - name: 새 열 이름 (None이면 '{column}_band')
+
+    Returns:
+    - metadata: 구간 열이 추가된 복사본
+    """
+    if labels is None:
+        labels = [f"{lo:g}-{hi:g}" for lo, hi in zip(bins[:-1], bins[1:])]
+    metadata = metadata.copy()
+    metadata[name or f"{column}_band"] = pd.cut(metadata[column], bins=bins, labels=labels, right=False)
+    return metadata
+
+
+def metadata_subject_data(metadata):
+    """
+    메타데이터에서 Step 6 (analyze_injury_data)용 {파일명: {'group', 'side'}} 추출
+    - group이 control/injury이고 side가 있는 피실험자만 포함
+    """
+    if 'group' not in metadata.columns or 'side' not in metadata.columns:
+        return {}
+    rows = metadata[metadata['group'].isin(['control', 'injury']) & metadata['side'].isin(['right', 'left'])]
+    return {subject: {'group': row['group'], 'side': row['side']} for subject, row in rows.iterrows()}
+
+
+class CycleStack:
+    """
+    모든 피실험자의 정규화된 사이클 (Step 5 결과)을 데이터 종류별 (사이클 수, 101) 배열 하나로 쌓고
+    사이클마다 (subject, leg, sprint, cycle + 메타데이터) 행을 갖는 인덱스 표를 함께 유지
+
+    파일은 from_interpolated에서 한 번만 읽고, 그룹 기준을 바꾼 group_stats 호출은 메모리 안에서만 계산
+    """
+
+    def __init__(self, curves, index):
+        self.curves = curves
+        self.index = index.reset_index(drop=True)
+
+    @classmethod
+    def from_interpolated(cls, interpolated_dir, metadata, data_types=None, dtype=float):
+        """
+        Step 5 결과(*_{side}_interpolated.xlsx)를 읽어 CycleStack 생성
+
+        Parameters:
+        - interpolated_dir: 05_InterpolatedData 경로
+        - metadata: load_subject_metadata 결과 (인덱스의 피실험자만 읽음)
+        - data_types: 쌓을 데이터 종류 (None이면 IMU, ACC, BF, ST)
+        - dtype: 곡선 배열 자료형 (np.float32이면 메모리 절반, group_stats의 평균/표준편차는 float64로 누적)
+
+        Returns:
+        - stack: CycleStack (양쪽 다리와 모든 스프린트 포함,
+          analysis_leg 열 = 메타데이터 side와 같은 다리인지 여부)
+        """
+        data_types = data_types or DATA_TYPES
+        curves = {data_type: [] for data_type in data_types}
+        rows = []
+
+        for subject in metadata.index:
+            for leg in ['right', 'left']:
+                file_path = os.path.join(interpolated_dir, f"{subject}_{leg}_interpolated.xlsx")
+                if not os.path.exists(file_path):
+                    continue
+                try:
+                    sheets = pd.read_excel(file_path, sheet_name=None, index_col=0)
+                except Exception as e:
+                    print(f"Error reading {os.path.basename(file_path)}: {str(e)}")
+                    continue
+
+                sprints = sorted({int(name.split('_sprint')[1]) for name in sheets if '_sprint' in name})
+                for sprint in sprints:
+                    sprint_sheets = [sheets.get(f"{data_type}_sprint{sprint}") for data_type in data_types]
+                    if any(sheet is None for sheet in sprint_sheets):
+                        continue
+                    # 보간에 실패한 사이클은 시트에서 빠지고 뒤 사이클 번호가 당겨지므로, 데이터 종류마다
+                    # 사이클 수가 다르면 같은 열이 같은 보폭이라는 보장이 없어 스프린트 전체를 제외
+                    counts = [sheet.shape[1] for sheet in sprint_sheets]
+                    if len(set(counts)) > 1:
+                        print(f"Warning: {subject} {leg} sprint {sprint} has mismatched cycle counts "
+                              f"{dict(zip(data_types, counts))}, skipping...")
+                        continue
+                    n_cycles = counts[0]
+                    for data_type, sheet in zip(data_types, sprint_sheets):
+                        curves[data_type].append(sheet.values[:, :n_cycles].T)
+                    rows.append(pd.DataFrame({'subject': subject, 'leg': leg, 'sprint': sprint,
+                                              'cycle': np.arange(1, n_cycles + 1)}))
+
+        if not rows:
+            print("No interpolated cycles found for the subjects in metadata.")
+            return cls({data_type: np.empty((0, 101), dtype=dtype) for data_type in data_types},
+                       pd.DataFrame(columns=['subject', 'leg', 'sprint', 'cycle', 'analysis_leg']))
+
+        index = pd.concat(rows, ignore_index=True).join(metadata, on='subject')
+        index['analysis_leg'] = index['leg'] == index['side'] if 'side' in index.columns else True
+        curves = {data_type: np.vstack(chunks).astype(dtype) for data_type, chunks in curves.items()}
+        print(f"Stacked {len(index)} cycles from {index['subject'].nunique()} subjects")
+        return cls(curves, index)
+
+    def group_stats(self, by, where=None, analysis_leg_only=True, data_types=None, percentiles=PERCENTILES):
+        """
+        임의의 메타데이터 열 조합으로 그룹을 나눠 평균, 표준편차, 백분위 곡선 계산
+
+        - 사이클을 그룹 순서로 정렬해 (데이터 종류, 그룹, 최대 사이클 수, 101) 배열에 NaN 패딩으로 채운 뒤
+          모든 그룹/데이터 종류의 통계를 축 하나에 대한 한 번의 NaN 리덕션으로 계산
+
+        Parameters:
+        - by: 그룹 기준 열 이름 또는 리스트 (예: 'sport', ['sex', 'age_band'], 'sprint')
+        - where: 추가 필터 (DataFrame.query 문자열 또는 bool 배열, 예: 'sprint == 1')
+        - analysis_leg_only: True이면 메타데이터 side 다리의 사이클만 사용 (Step 6와 동일)
+        - data_types: 계산할 데이터 종류 (None이면 전체)
+        - percentiles: 계산할 백분위
+
+        Returns:
+        - stats: 열 = by..., DataType, Time(%), N_Subjects, N_Cycles, Mean, STD, P{백분위}...
+          (그룹 키가 비어 있는 사이클은 제외)
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        data_types = data_types or list(self.curves)
+
+        mask = np.ones(len(self.index), dtype=bool)
+        if analysis_leg_only:
+            mask &= self.index['analysis_leg'].to_numpy(dtype=bool)
+        if where is not None:
+            mask &= self.index.eval(where).to_numpy(dtype=bool) if isinstance(where, str) \
+                else np.asarray(where, dtype=bool)
+
+        selected = self.index[mask]
+        grouped = selected.groupby(by, sort=True, observed=True, dropna=True)
+        codes = grouped.ngroup().to_numpy(dtype=float)
+        keep = ~np.isnan(codes)
+        rows, codes = np.flatnonzero(mask)[keep], codes[keep].astype(int)
+        columns = by + ['DataType', 'Time(%)', 'N_Subjects', 'N_Cycles', 'Mean', 'STD'] + \
+            [f'P{p:g}' for p in percentiles]
+        if len(codes) == 0:
+            return pd.DataFrame(columns=columns)
+
+        # 그룹별로 정렬 후 그룹 내 위치를 계산해 패딩 배열에 배치
+        n_groups = codes.max() + 1
+        order = np.argsort(codes, kind='stable')
+        codes, rows = codes[order], rows[order]
+        counts = np.bincount(codes, minlength=n_groups)
+        positions = np.arange(len(codes)) - np.repeat(np.cumsum(counts) - counts, counts)
+
+        data = np.stack([self.curves[data_type][rows] for data_type in data_types])
+        cube = np.full((len(data_types), n_groups, counts.max(), data.shape[-1]), np.nan, dtype=data.dtype)
+        cube[:, codes, positions] = data
+
+        mean = np.nanmean(cube, axis=2, dtype=np.float64)
+        std = np.nanstd(cube, axis=2, dtype=np.float64)
+        bands = np.nanpercentile(cube, percentiles, axis=2).astype(np.float64)
+
+        # size()의 인덱스 순서는 ngroup() 코드와 같음 (by가 하나여도 열 이름이 있는 표로 변환)
+        keys = grouped.size().index.to_frame(index=False)
+        n_subjects = grouped['subject'].nunique().to_numpy()
+        n_points = data.shape[-1]
+        n_rows = len(data_types) * n_groups * n_points
+
+        stats = keys.iloc[np.tile(np.repeat(np.arange(n_groups), n_points), len(data_types))].reset_index(drop=True)
+        stats['DataType'] = np.repeat(data_types, n_groups * n_points)
+        stats['Time(%)'] = np.tile(np.linspace(0, 100, n_points), len(data_types) * n_groups)
+        stats['N_Subjects'] = np.tile(np.repeat(n_subjects, n_points), len(data_types))
+        stats['N_Cycles'] = np.tile(np.repeat(counts, n_points), len(data_types))
+        stats['Mean'] = mean.reshape(n_rows)
+        stats['STD'] = std.reshape(n_rows)
+        for p, band in zip(percentiles, bands):
+            stats[f'P{p:g}'] = band.reshape(n_rows)
+        return stats[columns]
+
+
+def _group_label(row, by):
+    return ' / '.join(f"{column}={row[column]}" for column in by)
+
+
+def plot_group_stats(stats, by, output_path, band=('P25', 'P75')):
+    """
+    group_stats 결과를 데이터 종류별 subplot에 그룹별 평균 곡선 + 백분위 밴드로 표시
+    """
+    import matplotlib.pyplot as plt
+    by = [by] if isinstance(by, str) else list(by)
+    data_types = list(dict.fromkeys(stats['DataType']))
+    fig, axes = plt.subplots(1, len(data_types), figsize=(5 * len(data_types), 5), squeeze=False)
+
+    for ax, data_type in zip(axes[0], data_types):
+        type_stats = stats[stats['DataType'] == data_type]
+        for _, group_stats in type_stats.groupby(by, sort=False, observed=True):
+            first = group_stats.iloc[0]
+            label = f"{_group_label(first, by)} (n={first['N_Subjects']})"
+            line, = ax.plot(group_stats['Time(%)'], group_stats['Mean'], linewidth=2, label=label)
+            ax.fill_between(group_stats['Time(%)'], group_stats[band[0]], group_stats[band[1]],
+                            color=line.get_color(), alpha=0.2)
+        ax.set_title(data_type)
+        ax.set_xlabel('Gait Cycle (%)')
+        ax.grid(True, alpha=0.3)
+        ax.legend(fontsize=8)
+
+    fig.suptitle(f"Group comparison by {', '.join(by)} (mean, {band[0]}-{band[1]})")
+    plt.tight_layout()
+    plt.savefig(output_path, dpi=300, bbox_inches='tight')
+    plt.close()
+    print(f"Saved group-by graph to: {output_path}")
+
+
+def save_group_stats(stats, output_path):
+    """group_stats 결과를 데이터 종류별 시트로 엑셀 저장"""
+    with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
+        for data_type, type_stats in stats.groupby('DataType', sort=False):
+            type_stats.drop(columns='DataType').to_excel(writer, sheet_name=data_type, index=False)
+    print(f"Saved group-by statistics to: {output_path}")
+
+
+def analyze_cohort_groups(interpolated_dir, metadata, groupings, output_dir, sprint=1, profiler=None,
+                          dtype=float):
+    """
+    메타데이터 기준 그룹 비교 (사이클은 한 번만 쌓고 그룹 기준마다 group_stats 재계산)
+
+    Parameters:
+    - interpolated_dir: 05_InterpolatedData 경로
+    - metadata: load_subject_metadata 결과
+    - groupings: 그룹 기준 리스트 (각 항목은 열 이름 또는 열 이름 리스트)
+    - output_dir: 결과 저장 디렉토리 (groupby_{열 이름}.xlsx / .png)
+    - sprint: 비교할 스프린트 번호 (Step 6와 동일하게 1, None이면 모든 스프린트)
+    - profiler: StageProfiler (None이면 기록하지 않음)
+    - dtype: CycleStack.from_interpolated 참고
+
+    Returns:
+    - results: {그룹 기준 튜플: group_stats 결과}
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    stack = CycleStack.from_interpolated(interpolated_dir, metadata, dtype=dtype)
+    if profiler is not None:
+        profiler.lap('(cohort)', 'build_cycle_stack', cycles=len(stack.index))
+
+    where = None if sprint is None else f"sprint == {sprint}"
+    results = {}
+    for by in groupings:
+        by = [by] if isinstance(by, str) else list(by)
+        missing = [column for column in by if column not in stack.index.columns]
+        if missing:
+            print(f"Unknown grouping column(s) {missing}, skipping...")
+            continue
+        stats = stack.group_stats(by, where=where)
+        name = '_'.join(by)
+        if profiler is not None:
+            profiler.lap('(cohort)', f'group_by[{name}]', cycles=int(stats.drop_duplicates(by)['N_Cycles'].sum()))
+        if stats.empty:
+            print(f"No cycles for grouping {by}, skipping...")
+            continue
+        save_group_stats(stats, os.path.join(output_dir, f"groupby_{name}.xlsx"))
+        plot_group_stats(stats, by, os.path.join(output_dir, f"groupby_{name}.png"))
+        results[tuple(by)] = stats
+
+    return results
@@ -0,0 +1,186 @@
+# 코호트 사이클 데이터베이스 (SQLite, 사이클 인덱스 표 + 정규화 곡선)
+import os
+import sqlite3
+import argparse
+import numpy as np
+import pandas as pd
+
+DATA_TYPES = ['IMU', 'ACC', 'BF', 'ST']
+NUM_POINTS = 101
+
+# Step 3 피크 데이터 열 -> 데이터베이스 열
+PEAK_COLUMNS = {
+    'IMU_Peak': 'imu_peak', 'ACC': 'acc', 'BF': 'bf', 'ST': 'st',
+    'BF_MDF': 'bf_mdf', 'BF_MNF': 'bf_mnf', 'ST_MDF': 'st_mdf', 'ST_MNF': 'st_mnf'
+}
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS cycles (
+    cycle_id INTEGER PRIMARY KEY,
+    subject TEXT NOT NULL,
+    leg TEXT NOT NULL,
+    sprint INTEGER NOT NULL,
+    cycle INTEGER NOT NULL,
+    valley_idx INTEGER NOT NULL,
+    start_time REAL,
+    end_time REAL,
+    duration REAL,
+    {', '.join(f'{column} REAL' for column in PEAK_COLUMNS.values())},
+    UNIQUE (subject, leg, sprint, cycle)
+);
+CREATE TABLE IF NOT EXISTS curves (
+    cycle_id INTEGER NOT NULL REFERENCES cycles (cycle_id) ON DELETE CASCADE,
+    data_type TEXT NOT NULL,
+    points BLOB NOT NULL,
+    PRIMARY KEY (cycle_id, data_type)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_cycles_leg_sprint ON cycles (leg, sprint);
+CREATE INDEX IF NOT EXISTS idx_cycles_subject ON cycles (subject);
+CREATE INDEX IF NOT EXISTS idx_cycles_imu_peak ON cycles (imu_peak);
+"""
+
+
+def open_cycle_db(db_path):
+    """
+    사이클 데이터베이스 연결 (파일이 없으면 스키마와 인덱스 생성)
+    - WAL 모드: Step 6 등에서 읽는 동안에도 다음 피실험자를 쓸 수 있음
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA foreign_keys=ON')
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def cycle_records(subject, side, selected, valleys, time_data, peak_data, interpolated):
+    """
+    한 다리의 선택된 사이클(Step 4)과 보간 곡선(Step 5)을 데이터베이스 행으로 변환
+
+    Parameters:
+    - subject: 피실험자 이름
+    - side: 'right' 또는 'left'
+    - selected: select_middle_cycles 결과 {스프린트: [valley 인덱스]}
+    - valleys: find_gait_cycles 전체 valley 인덱스 (사이클 종료 시각 계산용)
+    - time_data: GYRO 시간 데이터
+    - peak_data: extract_peak_data 결과 (스펙트럼 열 포함 가능)
+    - interpolated: {data_type: {스프린트: [101 포인트 곡선]}} (process_file의 interpolated_data[side])
+
+    Returns:
+    - rows: cycles 표 행 리스트 (dict)
+    - curves: rows와 같은 순서의 {data_type: 곡선} 리스트 (보간되지 않은 사이클은 빈 dict)
+    """
+    peaks = pd.DataFrame(peak_data)
+    peaks.index = np.asarray(valleys)
+    time_values = np.asarray(time_data, dtype=float)
+    valleys = np.asarray(valleys)
+
+    rows, curves = [], []
+    for sprint, cycles in selected.items():
+        # 보간 결과는 사이클 순서와 같은 리스트, 건너뛴 사이클이 있으면 순서를 알 수 없으므로 저장하지 않음
+        sprint_curves = {}
+        for data_type in DATA_TYPES:
+            data = interpolated.get(data_type, {}).get(sprint, [])
+            if len(data) == len(cycles):
+                sprint_curves[data_type] = data
+            elif len(data):
+                print(f"{subject} {side} sprint {sprint}: {data_type} curves do not match cycles, not stored")
+
+        for i, valley in enumerate(cycles):
+            position = np.searchsorted(valleys, valley)
+            end_time = time_values[valleys[position + 1]] if position + 1 < len(valleys) else None
+            start_time = time_values[valley]
+            row = {
+                'subject': subject, 'leg': side, 'sprint': int(sprint), 'cycle': i + 1,
+                'valley_idx': int(valley), 'start_time': float(start_time),
+                'end_time': None if end_time is None else float(end_time),
+                'duration': None if end_time is None else float(end_time - start_time)
+            }
+            for source, column in PEAK_COLUMNS.items():
+                value = peaks[source].get(valley, np.nan) if source in peaks.columns else np.nan
+                row[column] = None if pd.isna(value) else float(value)
+            rows.append(row)
+            curves.append({data_type: data[i] for data_type, data in sprint_curves.items()})
+
+    return rows, curves
+
+
+def insert_subject_cycles(db_path, subject, rows, curves):
+    """
+    피실험자 한 명의 사이클을 하나의 트랜잭션으로 일괄 저장 (기존 행은 삭제 후 교체)
+    """
+    conn = open_cycle_db(db_path)
+    columns = list(rows[0]) if rows else []
+    try:
+        with conn:
+            conn.execute('DELETE FROM cycles WHERE subject = ?', (subject,))
+            if not rows:
+                return
+            conn.executemany(
+                f"INSERT INTO cycles ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                [tuple(row[c] for c in columns) for row in rows])
+            # 방금 넣은 행의 cycle_id 조회 (executemany는 lastrowid를 주지 않음)
+            ids = dict(((leg, sprint, cycle), cycle_id) for cycle_id, leg, sprint, cycle in conn.execute(
+                'SELECT cycle_id, leg, sprint, cycle FROM cycles WHERE subject = ?', (subject,)))
+            conn.executemany(
+                'INSERT INTO curves (cycle_id, data_type, points) VALUES (?, ?, ?)',
+                [(ids[(row['leg'], row['sprint'], row['cycle'])], data_type,
+                  np.asarray(points, dtype=np.float64).tobytes())
+                 for row, cycle_curves in zip(rows, curves) for data_type, points in cycle_curves.items()])
+        print(f"Stored {len(rows)} cycles for {subject} in cycle database")
+    finally:
+        conn.close()
+
+
+def query_cycles(db_path, where=None, params=(), data_type=None):
+    """
+    사이클 인덱스 표 조회 (선택적으로 정규화 곡선 포함)
+
+    예: 스프린트 2의 왼쪽 다리 ST 곡선 중 GYRO 피크 < -600°/s
+        query_cycles(db, "leg = ? AND sprint = ? AND imu_peak < ?", ('left', 2, -600), data_type='ST')
+
+    Parameters:
+    - db_path: 데이터베이스 경로
+    - where: SQL WHERE 조건 (cycles 표 열 사용, ? 자리표시자 권장)
+    - params: 자리표시자 값
+    - data_type: 'IMU', 'ACC', 'BF', 'ST' 중 하나 (None이면 곡선 없이 인덱스 표만 반환)
+
+    Returns:
+    - index: 조건을 만족하는 사이클 데이터프레임 (data_type이 있으면 곡선이 저장된 사이클만)
+    - curves: (사이클 수, 101) 배열 (data_type이 None이면 None)
+    """
+    conn = open_cycle_db(db_path)
+    try:
+        condition = f"WHERE ({where})" if where else ''
+        if data_type is None:
+            return pd.read_sql_query(f"SELECT * FROM cycles {condition} ORDER BY cycle_id", conn, params=params), None
+
+        condition = f"{condition} AND" if condition else 'WHERE'
+        query = (f"SELECT cycles.*, curves.points FROM cycles JOIN curves USING (cycle_id) "
+                 f"{condition} curves.data_type = ? ORDER BY cycle_id")
+        index = pd.read_sql_query(query, conn, params=tuple(params) + (data_type,))
+    finally:
+        conn.close()
+
+    curves = np.frombuffer(b''.join(index.pop('points')), dtype=np.float64).reshape(-1, NUM_POINTS)
+    return index, curves
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Query the HSI cycle database')
+    parser.add_argument('db_path')
+    parser.add_argument('--where', help="SQL condition, e.g. \"leg = 'left' AND sprint = 2\"")
+    parser.add_argument('--data-type', choices=DATA_TYPES)
+    parser.add_argument('--output', help='CSV path for the matching rows (curves appended as P0..P100)')
+    args = parser.parse_args()
+
+    index, curves = query_cycles(args.db_path, args.where, data_type=args.data_type)
+    print(f"{len(index)} cycle(s) from {index['subject'].nunique()} subject(s)")
+    if args.output:
+        if curves is not None:
+            index = pd.concat([index, pd.DataFrame(curves, columns=[f'P{i}' for i in range(NUM_POINTS)])], axis=1)
+        index.to_csv(args.output, index=False)
+        print(f"Saved to: {args.output}")
+    else:
+        with pd.option_context('display.width', 160, 'display.max_columns', None):
+            print(index)
@@ -0,0 +1,122 @@
+# 피실험자별 진단 그래프 (전체 세션 GYRO 추세를 LTTB로 줄여 사이클 검출/스프린트 구분 결과를 빠르게 저장)
+import os
+import numpy as np
+
+# 한 다리 추세선에 남길 최대 포인트 수 (그래프 폭 1500 픽셀 수준이면 모양은 그대로 유지됨)
+MAX_POINTS = 2000
+
+
+def lttb(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets 다운샘플링 (피크/골짜기 모양을 유지하며 포인트 수를 n_out으로 줄임)
+
+    - 첫/마지막 포인트는 항상 포함, 나머지는 n_out-2개 구간에서 하나씩 선택
+    - 각 구간에서 (직전 선택 포인트, 후보, 다음 구간 평균)이 이루는 삼각형 넓이가 가장 큰 후보를 선택
+    - 다음 구간 평균은 reduceat 한 번으로 미리 계산, 구간 안의 넓이 계산은 배열 연산
+
+    Parameters:
+    - x, y: 같은 길이의 배열 (x는 증가 순서)
+    - n_out: 남길 포인트 수
+
+    Returns:
+    - indices: 선택된 원본 인덱스 (증가 순서)
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    counts = np.diff(edges)
+    mean_x = np.add.reduceat(x[:n - 1], edges[:-1]) / counts
+    mean_y = np.add.reduceat(y[:n - 1], edges[:-1]) / counts
+    # 마지막 구간의 "다음 구간"은 마지막 포인트
+    next_x = np.append(mean_x[1:], x[-1])
+    next_y = np.append(mean_y[1:], y[-1])
+
+    indices = np.empty(n_out, dtype=int)
+    indices[0], indices[-1] = 0, n - 1
+    a = 0
+    for k in range(n_out - 2):
+        lo, hi = edges[k], edges[k + 1]
+        area = np.abs((x[a] - next_x[k]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y[k] - y[a]))
+        a = lo + int(np.argmax(area))
+        indices[k + 1] = a
+    return indices
+
+
+def decimate_trace(time_data, data, n_out=MAX_POINTS, keep=None):
+    """
+    그래프용 추세선 인덱스 (NaN 패딩 제외 후 LTTB, keep 인덱스(검출된 valley 등)는 항상 포함)
+    """
+    values = np.asarray(data, dtype=float)
+    valid = np.flatnonzero(~np.isnan(values))
+    indices = valid[lttb(np.asarray(time_data, dtype=float)[valid], values[valid], n_out)]
+    if keep is not None and len(keep):
+        indices = np.union1d(indices, np.asarray(keep, dtype=int))
+    return indices
+
+
+def plot_cycle_diagnostics(subject, time_data, legs, output_path, max_points=MAX_POINTS, peak_threshold=-200):
+    """
+    피실험자 한 명의 사이클 검출/스프린트 구분 진단 그래프 저장 (다리별 subplot)
+
+    - GYRO 추세선: decimate_trace (LTTB)
+    - 스프린트 구간: 음영 + 번호
+    - valley: 선택된 사이클 / 품질 검사 제외 / 그 외 검출을 상태별 scatter 한 번씩 표시
+      (valley마다 annotate하지 않음)
+    - pyplot 없이 Figure 객체에 직접 그려 GUI 백엔드를 사용하지 않음
+
+    Parameters:
+    - subject: 피실험자 이름 (그래프 제목)
+    - time_data: GYRO 시간 데이터
+    - legs: {side: {'gyro': GYRO 데이터, 'valleys': find_gait_cycles 결과,
+                    'intervals': find_sprint_intervals 결과, 'selected': select_middle_cycles 결과,
+                    'rejected': 품질 검사 제외 valley 리스트 (선택)}}
+    - output_path: PNG 경로
+    - max_points: 다리별 추세선 최대 포인트 수
+    - peak_threshold: 검출 임계값 표시선 (°/s)
+    """
+    from matplotlib.figure import Figure
+
+    time_values = np.asarray(time_data, dtype=float)
+    fig = Figure(figsize=(15, 4 * len(legs)))
+    axes = fig.subplots(len(legs), 1, sharex=True, squeeze=False)[:, 0]
+
+    for ax, (side, leg) in zip(axes, legs.items()):
+        gyro = np.asarray(leg['gyro'], dtype=float)
+        valleys = np.asarray(leg['valleys'], dtype=int)
+        selected = np.concatenate([np.asarray(c, dtype=int) for c in leg['selected'].values()] or [[]]).astype(int)
+        rejected = np.asarray(leg.get('rejected') or [], dtype=int)
+
+        trace = decimate_trace(time_values, gyro, max_points, keep=valleys)
+        ax.plot(time_values[trace], gyro[trace], color='tab:blue', linewidth=0.6, label=f'{side.capitalize()} Gyro')
+
+        for sprint, (start, end) in leg['intervals'].items():
+            ax.axvspan(time_values[start], time_values[min(end, len(time_values) - 1)], color='tab:orange', alpha=0.1)
+            ax.text(time_values[start], 0.98, f' S{sprint}', transform=ax.get_xaxis_transform(),
+                    va='top', fontsize=8)
+
+        is_selected = np.isin(valleys, selected)
+        is_rejected = np.isin(valleys, rejected)
+        other = ~is_selected & ~is_rejected
+        ax.scatter(time_values[valleys[other]], gyro[valleys[other]], marker='|', color='gray', s=40,
+                   label=f'Detected ({other.sum()})')
+        ax.scatter(time_values[valleys[is_selected]], gyro[valleys[is_selected]], marker='o', color='tab:green',
+                   s=16, label=f'Selected ({is_selected.sum()})')
+        ax.scatter(time_values[valleys[is_rejected]], gyro[valleys[is_rejected]], marker='x', color='tab:red',
+                   s=30, label=f'QC rejected ({is_rejected.sum()})')
+        ax.axhline(y=peak_threshold, color='r', linestyle='--', alpha=0.3, linewidth=0.8)
+        ax.set_ylabel('Angular Velocity (°/s)')
+        ax.set_title(f'{subject} - {side.capitalize()} Leg: {len(leg["intervals"])} sprints, '
+                     f'{len(valleys)} valleys', loc='left', fontsize=10)
+        ax.legend(loc='lower right', bbox_to_anchor=(1.0, 1.0), fontsize=8, ncol=4, frameon=False)
+        ax.grid(True, alpha=0.3)
+
+    axes[-1].set_xlabel('Time (s)')
+    # tight_layout은 그림을 한 번 더 그리므로 여백을 고정
+    fig.subplots_adjust(left=0.05, right=0.99, top=0.93, bottom=0.08, hspace=0.3)
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    fig.savefig(output_path, dpi=100)
+    return output_path
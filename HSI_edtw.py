@@ -0,0 +1,202 @@
+# 보행 주기 DTW 정합 (Sakoe-Chiba 밴드, 사이클 배치 단위 계산)
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from HSI_e06 import load_subject_curves
+
+
+def _dtw_chunk(x, t, band):
+    """
+    사이클 배치 전체의 밴드 DTW (누적 비용은 반대각선 순서로 채우고 사이클 축으로 벡터화)
+
+    Parameters:
+    - x: (사이클 수, 포인트) 정합할 곡선
+    - t: (사이클 수, 포인트) 사이클별 템플릿
+    - band: Sakoe-Chiba 밴드 폭 (포인트, |i - j| <= band)
+
+    Returns:
+    - distance: (사이클 수,) 최종 누적 비용
+    - path_i, path_j: (사이클 수, 최대 경로 길이) 정합 경로 (곡선 인덱스 i -> 템플릿 인덱스 j, 빈 칸은 -1)
+    """
+    n, m = x.shape
+    # D[:, i + 1, j + 1] = 누적 비용, 0번 행/열은 경계 (D[:, 0, 0] = 0, 나머지 inf)
+    D = np.full((n, m + 1, m + 1), np.inf)
+    D[:, 0, 0] = 0.0
+
+    for k in range(2 * m - 1):
+        i = np.arange(max(0, k - m + 1), min(m, k + 1))
+        j = k - i
+        inside = np.abs(i - j) <= band
+        i, j = i[inside], j[inside]
+        cost = (x[:, i] - t[:, j]) ** 2
+        D[:, i + 1, j + 1] = cost + np.minimum(np.minimum(D[:, i, j], D[:, i, j + 1]), D[:, i + 1, j])
+
+    # 끝점 (m-1, m-1)에서 시작점 (0, 0)까지 모든 사이클을 동시에 역추적
+    rows = np.arange(n)
+    i = np.full(n, m - 1)
+    j = np.full(n, m - 1)
+    path_i, path_j = [i.copy()], [j.copy()]
+    active = np.ones(n, dtype=bool)
+    while active.any():
+        steps = np.stack([D[rows, i, j], D[rows, i, j + 1], D[rows, i + 1, j]])  # 대각, 위, 왼쪽
+        move = np.argmin(steps, axis=0)
+        i = np.where(active & (move != 2), i - 1, i)
+        j = np.where(active & (move != 1), j - 1, j)
+        path_i.append(np.where(active, i, -1))
+        path_j.append(np.where(active, j, -1))
+        active = (i > 0) | (j > 0)
+
+    return D[:, m, m], np.stack(path_i, axis=1), np.stack(path_j, axis=1)
+
+
+def _pad_paths(paths, width):
+    return np.pad(paths, ((0, 0), (0, width - paths.shape[1])), constant_values=-1)
+
+
+def dtw_align(curves, templates, band=10, n_workers=None, chunk_size=512):
+    """
+    정규화된 사이클 전체를 템플릿에 밴드 DTW로 정렬
+
+    - 사이클 chunk_size개 단위로 계산 (메모리 = chunk_size x 102 x 102 x 8 바이트)
+    - 사이클이 chunk_size보다 많으면 청크를 프로세스 풀에 분배 (n_workers=1이면 현재 프로세스에서 계산)
+
+    Parameters:
+    - curves: (사이클 수, 101) 배열
+    - templates: (101,) 공통 템플릿 또는 (사이클 수, 101) 사이클별 템플릿
+    - band: Sakoe-Chiba 밴드 폭 (포인트, 기본 10 = 보행 주기의 10%)
+    - n_workers: 프로세스 수 (None이면 CPU 수)
+    - chunk_size: 한 번에 계산할 사이클 수
+
+    Returns:
+    - distance: 사이클별 DTW 누적 비용
+    - path_i, path_j: 정합 경로 (apply_warp 입력)
+    """
+    x = np.asarray(curves, dtype=float)
+    t = np.broadcast_to(np.asarray(templates, dtype=float), x.shape)
+    if len(x) == 0:
+        empty = np.empty((0, 0), dtype=int)
+        return np.empty(0), empty, empty
+
+    chunks = [(x[s:s + chunk_size], t[s:s + chunk_size], band) for s in range(0, len(x), chunk_size)]
+    if len(chunks) > 1 and n_workers != 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            parts = list(executor.map(_dtw_chunk, *zip(*chunks)))
+    else:
+        parts = [_dtw_chunk(*chunk) for chunk in chunks]
+
+    width = max(p[1].shape[1] for p in parts)
+    distance = np.concatenate([p[0] for p in parts])
+    path_i = np.vstack([_pad_paths(p[1], width) for p in parts])
+    path_j = np.vstack([_pad_paths(p[2], width) for p in parts])
+    return distance, path_i, path_j
+
+
+def apply_warp(curves, path_i, path_j):
+    """
+    정합 경로로 곡선을 템플릿 시간축에 재배치 (템플릿 포인트 j에 대응하는 곡선 값들의 평균)
+    - 기준 채널(IMU)에서 구한 경로를 같은 사이클의 ACC/EMG에도 그대로 적용
+    - 평균은 float64로 계산하고 결과는 입력 자료형 (float32 모드면 float32 곡선)
+    """
+    dtype = np.asarray(curves).dtype
+    dtype = dtype if np.issubdtype(dtype, np.floating) else np.float64
+    x = np.asarray(curves, dtype=float)
+    n, m = x.shape
+    valid = path_i >= 0
+    rows = np.broadcast_to(np.arange(n)[:, None], path_i.shape)[valid]
+    target = rows * m + path_j[valid]
+    sums = np.bincount(target, weights=x[rows, path_i[valid]], minlength=n * m)
+    counts = np.bincount(target, minlength=n * m)
+    return (sums / counts).reshape(n, m).astype(dtype, copy=False)
+
+
+def register_subject(interpolated_data, reference='IMU', band=10, template=None, n_iter=2, n_workers=None):
+    """
+    피실험자 한 명의 Step 5 보간 결과를 DTW로 정합 (모든 다리/스프린트의 사이클을 한 번에 계산)
+
+    Parameters:
+    - interpolated_data: {side: {data_type: {스프린트: [101 포인트 곡선]}}} (process_file의 interpolated_data)
+    - reference: 정합 경로를 구할 기준 채널 (기본 IMU, 경로는 모든 채널에 적용)
+    - band: Sakoe-Chiba 밴드 폭 (포인트)
+    - template: 기준 채널 템플릿 (101,) (None이면 다리/스프린트별 피실험자 평균을 n_iter번 갱신하며 사용)
+    - n_iter: 피실험자 평균 템플릿 갱신 횟수 (정합된 평균으로 템플릿을 다시 만들어 원본을 다시 정합)
+    - n_workers: dtw_align 참고
+
+    Returns:
+    - registered: interpolated_data와 같은 구조의 정합된 곡선
+      (채널마다 사이클 수가 다른 다리/스프린트는 같은 사이클끼리 짝지을 수 없으므로 정합하지 않고 경고 출력)
+    - distances: {side: {스프린트: 사이클별 DTW 비용}} (정합하지 않은 다리/스프린트는 빠짐)
+    """
+    # (side, 스프린트)별 사이클을 하나의 배치로 모음
+    blocks = []
+    for side, types in interpolated_data.items():
+        for sprint, cycles in types[reference].items():
+            counts = {dt: len(types[dt].get(sprint, [])) for dt in types}
+            if all(count == len(cycles) for count in counts.values()):
+                blocks.append((side, sprint, len(cycles)))
+            else:
+                print(f"Warning: {side} sprint {sprint} left unregistered (cycle counts differ: {counts})")
+    registered = {side: {dt: dict(sprints) for dt, sprints in types.items()}
+                  for side, types in interpolated_data.items()}
+    distances = {side: {} for side in interpolated_data}
+    if not blocks:
+        return registered, distances
+
+    ref = np.vstack([interpolated_data[side][reference][sprint] for side, sprint, _ in blocks])
+    block_ids = np.repeat(np.arange(len(blocks)), [count for _, _, count in blocks])
+
+    if template is not None:
+        distance, path_i, path_j = dtw_align(ref, template, band, n_workers)
+    else:
+        current = ref
+        for _ in range(max(1, n_iter)):
+            means = np.vstack([current[block_ids == b].mean(axis=0) for b in range(len(blocks))])
+            distance, path_i, path_j = dtw_align(ref, means[block_ids], band, n_workers)
+            current = apply_warp(ref, path_i, path_j)
+
+    for data_type in interpolated_data[blocks[0][0]]:
+        stacked = np.vstack([interpolated_data[side][data_type][sprint] for side, sprint, _ in blocks])
+        warped = apply_warp(stacked, path_i, path_j)
+        for b, (side, sprint, _) in enumerate(blocks):
+            registered[side][data_type][sprint] = list(warped[block_ids == b])
+    for b, (side, sprint, _) in enumerate(blocks):
+        distances[side][sprint] = distance[block_ids == b]
+
+    return registered, distances
+
+
+def build_group_template(interpolated_dir, subject_data, output_path, reference='IMU', group=None):
+    """
+    선형 정규화 결과(Step 5)로 그룹 템플릿 작성 (register_subject의 template 입력용)
+
+    Parameters:
+    - interpolated_dir: 05_InterpolatedData 경로
+    - subject_data: get_injury_side/load_group_manifest 결과
+    - output_path: 템플릿 CSV 경로 (열: Time(%), Template)
+    - reference: 템플릿 채널
+    - group: 'control' 또는 'injury' (None이면 전체)
+
+    Returns:
+    - template: (101,) 배열 (피실험자별 평균의 평균, 사이클 수가 많은 피실험자에 치우치지 않도록)
+    """
+    means = []
+    for subject, info in subject_data.items():
+        if group is not None and info['group'] != group:
+            continue
+        try:
+            means.append(load_subject_curves(interpolated_dir, subject, info['side'])[reference].mean(axis=0))
+        except Exception as e:
+            print(f"Error reading {subject} for template: {str(e)}")
+    if not means:
+        raise ValueError("No interpolated curves available for the group template")
+
+    template = np.mean(means, axis=0)
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    pd.DataFrame({'Time(%)': np.linspace(0, 100, len(template)), 'Template': template}).to_csv(output_path, index=False)
+    print(f"Saved {reference} template from {len(means)} subjects to: {output_path}")
+    return template
+
+
+def load_template(template_path):
+    """build_group_template로 저장한 템플릿 CSV 읽기"""
+    return pd.read_csv(template_path)['Template'].to_numpy(dtype=float)
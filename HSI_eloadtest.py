@@ -0,0 +1,181 @@
+# 코호트 규모 부하 테스트 (합성 코호트로 HSI_emain.main 전체 실행)
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from HSI_esynth import generate_sprint_recording
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_COHORTS = [10, 50, 100, 500]
+
+
+def _write_template(path, seed, recording_kwargs):
+    generate_sprint_recording(seed=seed, **recording_kwargs).to_excel(path, index=False)
+    return path
+
+
+def write_synthetic_cohort(base_dir, n_subjects, n_templates=8, recording_kwargs=None,
+                           template_dir=None, n_workers=None):
+    """
+    합성 코호트(sprint_data/*.xlsx)와 그룹 매니페스트(group_manifest.csv) 생성
+
+    - 서로 다른 합성 기록 n_templates개만 생성하고 나머지 피실험자는 파일 복사로 채움
+      (엑셀 쓰기가 생성 시간의 대부분이므로)
+    - 그룹은 c, l, r 순서로 돌아가며 배정
+
+    Parameters:
+    - base_dir: 코호트를 만들 디렉토리 (sprint_data 하위 폴더 생성)
+    - n_subjects: 피실험자 수
+    - n_templates: 서로 다른 합성 기록 개수
+    - recording_kwargs: generate_sprint_recording 인자
+    - template_dir: 합성 기록 저장 위치 (None이면 base_dir/templates, 이미 있는 파일은 재사용)
+    - n_workers: 템플릿 생성 프로세스 수
+
+    Returns:
+    - manifest_path: 그룹 매니페스트 경로
+    """
+    recording_kwargs = recording_kwargs or {}
+    data_dir = os.path.join(base_dir, 'sprint_data')
+    if template_dir is None:
+        template_dir = os.path.join(base_dir, 'templates')
+    os.makedirs(data_dir, exist_ok=True)
+    os.makedirs(template_dir, exist_ok=True)
+
+    n_templates = max(1, min(n_templates, n_subjects))
+    template_paths = [os.path.join(template_dir, f"template_{i:02d}.xlsx") for i in range(n_templates)]
+    missing = [(path, i) for i, path in enumerate(template_paths) if not os.path.exists(path)]
+    if missing:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            list(executor.map(_write_template, [p for p, _ in missing], [i for _, i in missing],
+                              [recording_kwargs] * len(missing)))
+
+    rows = []
+    for i in range(n_subjects):
+        subject = f"SUB{i + 1:04d}"
+        shutil.copyfile(template_paths[i % n_templates], os.path.join(data_dir, f"{subject}.xlsx"))
+        rows.append({'subject': subject, 'group': 'clr'[i % 3]})
+
+    manifest_path = os.path.join(base_dir, 'group_manifest.csv')
+    pd.DataFrame(rows).to_csv(manifest_path, index=False)
+    return manifest_path
+
+
+def _dir_size_mb(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+    return round(total / (1024 * 1024), 2)
+
+
+def run_cohort(base_dir, manifest_path, pipeline_kwargs=None):
+    """
+    별도 프로세스에서 HSI_emain.main (Phase 1, 2)을 실행하고 결과 요약을 반환
+    - 프로세스를 분리해야 코호트 크기별 최대 메모리를 독립적으로 측정할 수 있음
+    - 출력은 base_dir/pipeline.log 로 저장
+    """
+    kwargs = dict(pipeline_kwargs or {}, base_dir=base_dir, group_manifest=manifest_path)
+    code = f"import HSI_emain; HSI_emain.main(**{kwargs!r})"
+    env = dict(os.environ, PYTHONPATH=REPO_DIR + os.pathsep + os.environ.get('PYTHONPATH', ''),
+               MPLBACKEND='Agg')
+
+    start = time.perf_counter()
+    with open(os.path.join(base_dir, 'pipeline.log'), 'w', encoding='utf-8') as log:
+        completed = subprocess.run([sys.executable, '-c', code], cwd=base_dir, env=env,
+                                   stdout=log, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL)
+    wall = time.perf_counter() - start
+
+    processing_dir = os.path.join(base_dir, 'HSI_DataProcessing')
+    report_path = os.path.join(processing_dir, '00_RunReport', 'run_report.json')
+    records = []
+    if os.path.exists(report_path):
+        with open(report_path, encoding='utf-8') as f:
+            records = json.load(f)['records']
+    stages = pd.DataFrame(records)
+
+    n_subjects = len(pd.read_csv(manifest_path))
+    summary = {
+        'n_subjects': n_subjects,
+        'returncode': completed.returncode,
+        'wall_s': round(wall, 2),
+        'subjects_per_min': round(n_subjects / wall * 60, 2) if wall > 0 else None,
+        'input_mb': _dir_size_mb(os.path.join(base_dir, 'sprint_data'))
+    }
+    if not stages.empty:
+        # main이 기록마다 남긴 phase (1 = Step 1-5, 2 = Step 6)
+        summary['phase1_s'] = round(stages.loc[stages['phase'].eq(1), 'wall_s'].sum(), 2)
+        summary['phase2_s'] = round(stages.loc[stages['phase'].eq(2), 'wall_s'].sum(), 2)
+        summary['peak_rss_mb'] = stages['peak_rss_mb'].max()
+    for name in sorted(os.listdir(processing_dir)) if os.path.isdir(processing_dir) else []:
+        summary[f'output_mb[{name}]'] = _dir_size_mb(os.path.join(processing_dir, name))
+    return summary
+
+
+def run_load_test(work_dir, cohort_sizes=None, n_templates=8, recording_kwargs=None,
+                  pipeline_kwargs=None, keep_outputs=False):
+    """
+    코호트 크기를 늘려가며 전체 파이프라인을 실행하고 확장성 리포트 작성
+
+    Parameters:
+    - work_dir: 작업 디렉토리 (코호트 크기별 하위 폴더 생성)
+    - cohort_sizes: 피실험자 수 리스트
+    - n_templates: 서로 다른 합성 기록 개수
+    - recording_kwargs: generate_sprint_recording 인자
+    - pipeline_kwargs: HSI_emain.main 인자 (예: {'shared_memory': True})
+    - keep_outputs: False이면 코호트 크기별 입력/출력 파일을 측정 후 삭제
+
+    Returns:
+    - df: 코호트 크기별 처리량, 최대 메모리, 출력 크기 표 (work_dir/load_test_report.csv 저장)
+    """
+    if cohort_sizes is None:
+        cohort_sizes = DEFAULT_COHORTS
+    os.makedirs(work_dir, exist_ok=True)
+    # 템플릿은 코호트 크기 간에 공유 (실행마다 recording_kwargs가 다를 수 있으므로 새로 생성)
+    template_dir = os.path.join(work_dir, 'templates')
+    shutil.rmtree(template_dir, ignore_errors=True)
+    rows = []
+
+    for n_subjects in cohort_sizes:
+        print(f"\n=== Cohort of {n_subjects} subjects ===")
+        cohort_dir = os.path.join(work_dir, f"cohort_{n_subjects:05d}")
+        shutil.rmtree(cohort_dir, ignore_errors=True)
+        os.makedirs(cohort_dir)
+        manifest_path = write_synthetic_cohort(cohort_dir, n_subjects, n_templates, recording_kwargs,
+                                               template_dir=template_dir)
+
+        summary = run_cohort(cohort_dir, manifest_path, pipeline_kwargs)
+        print(summary)
+        rows.append(summary)
+
+        if not keep_outputs:
+            for name in ['sprint_data', 'HSI_DataProcessing']:
+                shutil.rmtree(os.path.join(cohort_dir, name), ignore_errors=True)
+
+    df = pd.DataFrame(rows)
+    report_path = os.path.join(work_dir, 'load_test_report.csv')
+    df.to_csv(report_path, index=False)
+    print(f"\nLoad test report saved to: {report_path}")
+    return df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='HSI pipeline cohort-scale load test')
+    parser.add_argument('--work-dir', default=os.path.join(os.getcwd(), 'HSI_LoadTest'))
+    parser.add_argument('--cohorts', type=int, nargs='+', default=DEFAULT_COHORTS)
+    parser.add_argument('--templates', type=int, default=8)
+    parser.add_argument('--fs', type=float, default=1000.0)
+    parser.add_argument('--sprints', type=int, default=3)
+    parser.add_argument('--shared-memory', action='store_true')
+    parser.add_argument('--keep-outputs', action='store_true')
+    args = parser.parse_args()
+
+    df = run_load_test(args.work_dir, args.cohorts, args.templates,
+                       recording_kwargs={'fs': args.fs, 'n_sprints': args.sprints},
+                       pipeline_kwargs={'shared_memory': args.shared_memory},
+                       keep_outputs=args.keep_outputs)
+    with pd.option_context('display.width', 160, 'display.max_columns', None):
+        print(df)
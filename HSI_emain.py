@@ -1,23 +1,43 @@
 # Main script
 import os
+import argparse
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-from HSI_e01 import read_excel_files, ACC_extract, GYRO_extract, EMG_extract
+from HSI_e01 import (read_excel_files, ACC_extract, GYRO_extract, EMG_extract, EMG_condition,
+                     map_indices_by_time, time_grid_issues, select_subjects)
 from HSI_e02 import find_gait_cycles, plot_gait_cycles
 from HSI_e03 import extract_peak_data, save_peak_data_to_excel
 from HSI_e04 import (find_sprint_intervals, find_cycles_in_sprint, 
-                   select_middle_cycles, save_interval_data_to_excel)
+                   select_middle_cycles, save_interval_data_to_excel, DEFAULT_PARAMS)
 from HSI_e05 import interpolate_cycle_data, save_interpolated_data
-from HSI_e06 import get_injury_side, analyze_injury_data
+from HSI_e06 import get_injury_side, load_group_manifest, analyze_injury_data
+from HSI_eparallel import analyze_legs_shared
+from HSI_eprofile import StageProfiler, profile_call
+from HSI_espectral import cycle_spectral_features
+from HSI_ecohort import load_subject_metadata, metadata_subject_data, analyze_cohort_groups
+from HSI_ecycledb import cycle_records, insert_subject_cycles
+from HSI_edtw import register_subject, load_template
+from HSI_eqc import cycle_qc_features, rejected_cycles, qc_summary, QC_THRESHOLDS
+from HSI_ediag import plot_cycle_diagnostics
+from HSI_esymmetry import bilateral_symmetry, save_symmetry, analyze_symmetry_groups
+from HSI_ewriter import OutputWriter, write_output, MAX_PENDING
 
-def create_directories(base_dir):
-    """분석 결과를 저장할 디렉토리 생성"""
+FAILED_FILENAME = 'failed_subjects.txt'
+WRITE_REPORT_FILENAME = 'write_report.csv'
+
+def create_directories(base_dir, output_dir=None):
+    """분석 결과를 저장할 디렉토리 생성 (output_dir가 없으면 base_dir/HSI_DataProcessing)"""
+    if output_dir is None:
+        output_dir = os.path.join(base_dir, 'HSI_DataProcessing')
     directories = {
-        'peak_data': os.path.join(base_dir, 'HSI_DataProcessing', '03_PeakData'),
-        'interval_data': os.path.join(base_dir, 'HSI_DataProcessing', '04_IntervalData'),
-        'interpolated_data': os.path.join(base_dir, 'HSI_DataProcessing', '05_InterpolatedData'),
-        'injury_analysis': os.path.join(base_dir, 'HSI_DataProcessing', '06_InjuryAnalysis')
+        'peak_data': os.path.join(output_dir, '03_PeakData'),
+        'interval_data': os.path.join(output_dir, '04_IntervalData'),
+        'interpolated_data': os.path.join(output_dir, '05_InterpolatedData'),
+        'injury_analysis': os.path.join(output_dir, '06_InjuryAnalysis'),
+        'run_report': os.path.join(output_dir, '00_RunReport'),
+        'cycle_db': os.path.join(output_dir, '08_CycleDatabase'),
+        'diagnostics': os.path.join(output_dir, '09_Diagnostics'),
+        'symmetry': os.path.join(output_dir, '10_Symmetry')
     }
     
     for directory in directories.values():
@@ -25,17 +45,76 @@ def create_directories(base_dir):
     
     return directories
 
-def process_file(filename, df, directories):
-    """각 파일에 대한 처리 과정"""
+def process_file(filename, df, directories, shared_memory=False, n_workers=None, profiler=None,
+                 condition_emg=False, spectral_features=True, cycle_db=None,
+                 registration=None, dtw_band=10, dtw_template=None, qc=False, qc_thresholds=None,
+                 diagnostics=True, params=None, steps=None, symmetry=False, writer=None):
+    """
+    각 파일에 대한 처리 과정
+    - shared_memory=True: 채널 행렬을 공유 메모리에 올리고 다리/채널 단위로 워커 풀에서 병렬 처리
+      (파일 하나가 매우 클 때 지연시간 단축용)
+    - profiler: StageProfiler (None이면 기록만 하고 버림)
+    - condition_emg=True: 보간 전에 EMG를 band-pass, 정류, 포락선 처리 (EMG_condition)
+      (Step 3, 4의 EMG 값도 포락선 기준이 됨)
+    - df가 {'GYRO': df, 'ACC': df, 'EMG': df} (read_excel_files(multirate=True))이면
+      센서 그룹별 고유 시간축으로 처리: GYRO에서 찾은 사이클 경계를 시각 기준으로 ACC/EMG 인덱스로
+      변환하고, Step 5는 각 채널을 자기 샘플로 보간
+    - spectral_features=True: 사이클별 BF/ST 중앙/평균 주파수를 계산하여 Step 3, 4 결과에 추가
+      (EMG_condition 전의 원시 EMG 사용, 스프린트 구간 안의 사이클만 계산하고 나머지 피크는 NaN)
+    - cycle_db: 사이클 데이터베이스 경로 (주어지면 선택된 사이클의 인덱스/피크 값/보간 곡선을 일괄 저장)
+    - registration='dtw': 선형 정규화 후 IMU 기준 밴드 DTW로 사이클 정합 (HSI_edtw.register_subject)
+      저장되는 보간 데이터가 정합된 곡선으로 바뀌므로 Step 6와 사이클 데이터베이스도 정합 결과를 사용
+    - dtw_band: Sakoe-Chiba 밴드 폭 (포인트)
+    - dtw_template: IMU 템플릿 (101,) 배열 (None이면 피실험자 평균 템플릿)
+    - qc=True: 중간 사이클 선택 전에 사이클 품질 검사로 이상 사이클 제외 (HSI_eqc.cycle_qc_features)
+      판정 결과는 Step 4 엑셀의 Right_QC/Left_QC 시트로 저장 (선택되는 사이클이 바뀌므로 기본값은 False)
+    - qc_thresholds: HSI_eqc.QC_THRESHOLDS 일부를 덮어쓸 딕셔너리
+    - diagnostics=True: 다리별 사이클 검출/스프린트 구분 진단 그래프를 09_Diagnostics/<피실험자>_cycles.png로 저장
+      (HSI_ediag.plot_cycle_diagnostics)
+    - params: 사이클 검출/스프린트 구분/선택 파라미터 중 기본값과 다른 것
+      (이름과 기본값은 HSI_e04.DEFAULT_PARAMS, 예: {'peak_threshold': -250, 'n_cycles': 8})
+    - steps: 결과를 저장할 단계 번호 (None이면 1-5 전체)
+      앞 단계 결과는 필요한 만큼 메모리에서 다시 계산하고 저장하지 않음 (예: {5}이면 Step 5 파일만 다시 씀)
+    - symmetry=True: Step 5 곡선으로 오른쪽/왼쪽 보폭을 짝지어 양측 대칭 지수를 10_Symmetry/<피실험자>_symmetry.xlsx로
+      저장 (HSI_esymmetry.bilateral_symmetry, EMG 지표는 EMG_condition 포락선 곡선 사용)
+      condition_emg=True이면 이미 보간한 포락선 곡선을 그대로 쓰고, 아니면 포락선을 한 번 더 계산/보간하므로 기본값은 False
+    - writer: HSI_ewriter.OutputWriter (주어지면 결과 파일/그래프를 백그라운드 스레드에서 저장하고 바로 다음 단계 진행,
+      저장 오류는 writer가 기록, None이면 단계마다 바로 저장)
+    """
+    if profiler is None:
+        profiler = StageProfiler()
+    subject = os.path.splitext(filename)[0]
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    steps = set(range(1, 6)) if steps is None else set(steps)
+    raise_errors = writer is not None
+    
     print(f"\n{'='*20} Processing {filename} {'='*20}")
+    profiler.start()
     
     # 1. Data Extraction
     print("\n[Step 1] Extracting sensor data...")
-    gyro_data = GYRO_extract(df)
-    acc_data = ACC_extract(df)
-    emg_data = EMG_extract(df)
+    multirate = isinstance(df, dict)
+    if multirate:
+        gyro_data, acc_data, emg_data = df['GYRO'], df['ACC'], df['EMG']
+        profiler.lap(subject, 'extract', rows=len(emg_data))
+    else:
+        gyro_data = GYRO_extract(df)
+        acc_data = ACC_extract(df)
+        emg_data = EMG_extract(df)
+        profiler.lap(subject, 'extract', rows=len(df))
+    
+    raw_emg_data = emg_data
+    if condition_emg:
+        print("\n[Step 1-1] Conditioning EMG (band-pass, rectify, envelope)...")
+        emg_data = EMG_condition(emg_data)
+        profiler.lap(subject, 'condition_emg', rows=len(emg_data))
+    
+    if not steps & {2, 3, 4, 5}:
+        return
     
     time_data = gyro_data['X [s]']
+    acc_time = acc_data['X [s]']
+    emg_time = emg_data['X [s]']
     
     # Right leg data
     right_gyro = gyro_data.iloc[:, 1]
@@ -53,103 +132,513 @@ def process_file(filename, df, directories):
         'ST': emg_data.iloc[:, 4]
     }
     
+    # Step 3, 4는 GYRO 피크 시점의 값만 저장하므로 ACC/EMG는 GYRO 샘플 시각에 가장 가까운 값을 사용
+    if multirate:
+        acc_map = map_indices_by_time(np.arange(len(time_data)), time_data, acc_time)
+        emg_map = map_indices_by_time(np.arange(len(time_data)), time_data, emg_time)
+        right_acc_pt = right_acc.iloc[acc_map].reset_index(drop=True)
+        left_acc_pt = left_acc.iloc[acc_map].reset_index(drop=True)
+        right_emg_pt = {m: s.iloc[emg_map].reset_index(drop=True) for m, s in right_emg.items()}
+        left_emg_pt = {m: s.iloc[emg_map].reset_index(drop=True) for m, s in left_emg.items()}
+    else:
+        right_acc_pt, left_acc_pt = right_acc, left_acc
+        right_emg_pt, left_emg_pt = right_emg, left_emg
+    
+    if shared_memory and multirate:
+        print("Shared-memory mode needs a single time base; processing multi-rate recording serially.")
+        shared_memory = False
+    
+    leg_results = None
+    if shared_memory:
+        print("\n[Step 2-5] Dispatching legs and channels to shared-memory workers...")
+        leg_results = analyze_legs_shared(time_data, {
+            'right': {'IMU': right_gyro, 'ACC': right_acc, 'BF': right_emg['BF'], 'ST': right_emg['ST']},
+            'left': {'IMU': left_gyro, 'ACC': left_acc, 'BF': left_emg['BF'], 'ST': left_emg['ST']}
+        }, n_workers=n_workers, qc=qc, qc_thresholds=qc_thresholds, params=params)
+        profiler.lap(subject, 'shared_dispatch', rows=len(time_data),
+                     cycles=sum(len(leg_results[side]['cycles']) for side in leg_results))
+    
     # 2. Gait Cycle Analysis
     print("\n[Step 2] Analyzing gait cycles...")
-    right_valleys, right_cycles = find_gait_cycles(time_data, right_gyro, 'Right')
-    left_valleys, left_cycles = find_gait_cycles(time_data, left_gyro, 'Left')
-    
-    # 3. Peak Data Analysis
-    print("\n[Step 3] Extracting peak data...")
-    right_peak_data = extract_peak_data(
-        right_valleys, time_data, right_gyro, right_acc, right_emg)
-    left_peak_data = extract_peak_data(
-        left_valleys, time_data, left_gyro, left_acc, left_emg)
-    save_peak_data_to_excel(right_peak_data, left_peak_data, filename, 
-                           directories['peak_data'])
+    if leg_results:
+        right_valleys, right_cycles = leg_results['right']['valleys'], leg_results['right']['cycles']
+        left_valleys, left_cycles = leg_results['left']['valleys'], leg_results['left']['cycles']
+    else:
+        detection = {name: params[name] for name in ['min_distance', 'window_size', 'peak_threshold']}
+        right_valleys, right_cycles = find_gait_cycles(time_data, right_gyro, 'Right', **detection)
+        left_valleys, left_cycles = find_gait_cycles(time_data, left_gyro, 'Left', **detection)
+    profiler.lap(subject, 'detect_cycles', rows=len(time_data), cycles=len(right_cycles) + len(left_cycles))
+    
+    # 스프린트 구간과 구간 안의 사이클 (Step 2-1 스펙트럼 대상과 Step 4 선택에 사용)
+    if leg_results:
+        right_intervals, left_intervals = leg_results['right']['intervals'], leg_results['left']['intervals']
+        right_categorized = leg_results['right']['categorized']
+        left_categorized = leg_results['left']['categorized']
+    else:
+        interval_params = {name: params[name] for name in ['velocity_threshold', 'min_rest_duration']}
+        right_intervals = find_sprint_intervals(right_gyro.values, time_data.values, **interval_params)
+        left_intervals = find_sprint_intervals(left_gyro.values, time_data.values, **interval_params)
+        
+        right_categorized = find_cycles_in_sprint(right_valleys, right_intervals)
+        left_categorized = find_cycles_in_sprint(left_valleys, left_intervals)
+    
+    spectral = None
+    if spectral_features and steps & {3, 4}:
+        # 스프린트 구간 안의 사이클만 계산 (휴식 구간을 건너뛰는 구간은 NaN)
+        print("\n[Step 2-1] Computing EMG spectral features per cycle...")
+        spectral = {}
+        for side, valleys, categorized, (bf_col, st_col) in [('right', right_valleys, right_categorized, (1, 2)),
+                                                             ('left', left_valleys, left_categorized, (3, 4))]:
+            emg_valleys = map_indices_by_time(valleys, time_data, emg_time) if multirate else valleys
+            spectral[side] = cycle_spectral_features(
+                emg_time, {'BF': raw_emg_data.iloc[:, bf_col], 'ST': raw_emg_data.iloc[:, st_col]},
+                emg_valleys, labels=valleys,
+                cycles=[valley for cycles in categorized.values() for valley in cycles])
+        profiler.lap(subject, 'spectral_features', cycles=len(spectral['right']) + len(spectral['left']))
+    
+    # 3. Peak Data Analysis (사이클 데이터베이스도 피크 값을 사용)
+    if 3 in steps or (cycle_db is not None and 5 in steps):
+        print("\n[Step 3] Extracting peak data...")
+        right_peak_data = extract_peak_data(
+            right_valleys, time_data, right_gyro, right_acc_pt, right_emg_pt)
+        left_peak_data = extract_peak_data(
+            left_valleys, time_data, left_gyro, left_acc_pt, left_emg_pt)
+        if spectral is not None:
+            # 각 피크에서 시작하는 사이클의 MDF/MNF (마지막 피크는 NaN)
+            right_peak_data.update(spectral['right'].reindex(right_valleys).items())
+            left_peak_data.update(spectral['left'].reindex(left_valleys).items())
+        if 3 in steps:
+            write_output(writer, subject, 'peak_data', save_peak_data_to_excel,
+                         right_peak_data, left_peak_data, filename, directories['peak_data'],
+                         raise_errors=raise_errors)
+        profiler.lap(subject, 'save_peak_data', cycles=len(right_valleys) + len(left_valleys))
     
     # 4. Sprint Interval Analysis
     print("\n[Step 4] Analyzing sprint intervals...")
-    right_intervals = find_sprint_intervals(right_gyro.values, time_data.values)
-    left_intervals = find_sprint_intervals(left_gyro.values, time_data.values)
+    qc_features = None
+    if leg_results:
+        right_selected = leg_results['right']['selected']
+        left_selected = leg_results['left']['selected']
+        if qc:
+            qc_features = {side: leg_results[side]['qc'] for side in ['right', 'left']}
+    else:
+        if qc:
+            # 4-1. 사이클 품질 검사 (검출된 전체 사이클, 선택 전)
+            qc_features = {}
+            for side, valleys, categorized, gyro, emg in [
+                    ('right', right_valleys, right_categorized, right_gyro, right_emg),
+                    ('left', left_valleys, left_categorized, left_gyro, left_emg)]:
+                qc_features[side] = cycle_qc_features(time_data, gyro, valleys, categorized, emg=emg,
+                                                      emg_time=emg_time if multirate else None,
+                                                      thresholds=qc_thresholds)
+            profiler.lap(subject, 'cycle_qc', cycles=len(qc_features['right']) + len(qc_features['left']))
+        
+        right_selected = select_middle_cycles(
+            right_categorized, n_cycles=params['n_cycles'],
+            rejected=rejected_cycles(qc_features['right']) if qc else None)
+        left_selected = select_middle_cycles(
+            left_categorized, n_cycles=params['n_cycles'],
+            rejected=rejected_cycles(qc_features['left']) if qc else None)
+    if qc_features is not None:
+        print(f"Cycle QC - Right: {qc_summary(qc_features['right'])}, Left: {qc_summary(qc_features['left'])}")
+    n_selected = sum(len(c) for c in right_selected.values()) + sum(len(c) for c in left_selected.values())
+    profiler.lap(subject, 'sprint_intervals', rows=len(time_data), cycles=n_selected)
     
-    right_categorized = find_cycles_in_sprint(right_valleys, right_intervals)
-    left_categorized = find_cycles_in_sprint(left_valleys, left_intervals)
+    if 4 in steps:
+        write_output(
+            writer, subject, 'interval_data', save_interval_data_to_excel,
+            right_selected, left_selected, time_data,
+            right_gyro, left_gyro, right_acc_pt, left_acc_pt,
+            right_emg_pt, left_emg_pt, filename, directories['interval_data'],
+            spectral=spectral, qc=qc_features, raise_errors=raise_errors
+        )
+        profiler.lap(subject, 'save_interval_data', cycles=n_selected)
     
-    right_selected = select_middle_cycles(right_categorized)
-    left_selected = select_middle_cycles(left_categorized)
+    if diagnostics and 4 in steps:
+        print("\n[Step 4-2] Saving cycle diagnostics plot...")
+        legs = {}
+        for side, gyro, valleys, intervals, selected in [
+                ('right', right_gyro, right_valleys, right_intervals, right_selected),
+                ('left', left_gyro, left_valleys, left_intervals, left_selected)]:
+            legs[side] = {'gyro': gyro, 'valleys': valleys, 'intervals': intervals, 'selected': selected,
+                          'rejected': rejected_cycles(qc_features[side]) if qc_features is not None else None}
+        write_output(writer, subject, 'diagnostics_plot', plot_cycle_diagnostics, subject, time_data, legs,
+                     os.path.join(directories['diagnostics'], f'{subject}_cycles.png'),
+                     peak_threshold=params['peak_threshold'])
+        profiler.lap(subject, 'diagnostics_plot', rows=len(time_data))
     
-    save_interval_data_to_excel(
-        right_selected, left_selected, time_data,
-        right_gyro, left_gyro, right_acc, left_acc,
-        right_emg, left_emg, filename, directories['interval_data']
-    )
+    if 5 not in steps:
+        return
     
     # 5. Data Interpolation
     print("\n[Step 5] Interpolating cycle data...")
-    interpolated_data = {
-        'right': {'IMU': {}, 'ACC': {}, 'BF': {}, 'ST': {}},
-        'left': {'IMU': {}, 'ACC': {}, 'BF': {}, 'ST': {}}
-    }
+    if leg_results:
+        interpolated_data = {side: leg_results[side]['interpolated'] for side in ['right', 'left']}
+    else:
+        interpolated_data = {
+            'right': {'IMU': {}, 'ACC': {}, 'BF': {}, 'ST': {}},
+            'left': {'IMU': {}, 'ACC': {}, 'BF': {}, 'ST': {}}
+        }
+    
+        # Right leg interpolation
+        for category, cycles in right_selected.items():
+            if len(cycles) > 1:
+                acc_cycles = map_indices_by_time(cycles, time_data, acc_time) if multirate else cycles
+                emg_cycles = map_indices_by_time(cycles, time_data, emg_time) if multirate else cycles
+                interpolated_data['right']['IMU'][category] = interpolate_cycle_data(
+                    time_data, right_gyro, cycles)
+                interpolated_data['right']['ACC'][category] = interpolate_cycle_data(
+                    acc_time, right_acc, acc_cycles)
+                interpolated_data['right']['BF'][category] = interpolate_cycle_data(
+                    emg_time, right_emg['BF'], emg_cycles)
+                interpolated_data['right']['ST'][category] = interpolate_cycle_data(
+                    emg_time, right_emg['ST'], emg_cycles)
+    
+        # Left leg interpolation
+        for category, cycles in left_selected.items():
+            if len(cycles) > 1:
+                acc_cycles = map_indices_by_time(cycles, time_data, acc_time) if multirate else cycles
+                emg_cycles = map_indices_by_time(cycles, time_data, emg_time) if multirate else cycles
+                interpolated_data['left']['IMU'][category] = interpolate_cycle_data(
+                    time_data, left_gyro, cycles)
+                interpolated_data['left']['ACC'][category] = interpolate_cycle_data(
+                    acc_time, left_acc, acc_cycles)
+                interpolated_data['left']['BF'][category] = interpolate_cycle_data(
+                    emg_time, left_emg['BF'], emg_cycles)
+                interpolated_data['left']['ST'][category] = interpolate_cycle_data(
+                    emg_time, left_emg['ST'], emg_cycles)
+    
+    n_interpolated = sum(len(cycles) for side in interpolated_data.values()
+                         for categories in side.values() for cycles in categories.values())
+    profiler.lap(subject, 'interpolate', cycles=n_interpolated)
+    
+    # 대칭성의 EMG 지표는 포락선 곡선으로 계산 (condition_emg=True이면 BF/ST 곡선이 이미 포락선이므로 그대로 사용,
+    # False이면 원시 EMG 곡선이므로 포락선을 따로 보간하고 DTW 정합에도 같은 경로가 적용되도록
+    # 정합 전에 *_Envelope로 함께 넣었다가 저장 전에 분리)
+    envelope_types = []
+    if symmetry and not condition_emg:
+        envelope = EMG_condition(raw_emg_data)
+        interpolated_data = {side: dict(types) for side, types in interpolated_data.items()}
+        for side, selected, columns in [('right', right_selected, {'BF': 1, 'ST': 2}),
+                                        ('left', left_selected, {'BF': 3, 'ST': 4})]:
+            for muscle, col in columns.items():
+                interpolated_data[side][f'{muscle}_Envelope'] = {
+                    category: interpolate_cycle_data(
+                        emg_time, envelope.iloc[:, col],
+                        map_indices_by_time(cycles, time_data, emg_time) if multirate else cycles)
+                    for category, cycles in selected.items() if len(cycles) > 1}
+        envelope_types = ['BF', 'ST']
+        profiler.lap(subject, 'interpolate_envelope', rows=len(envelope))
     
-    # Right leg interpolation
-    for category, cycles in right_selected.items():
-        if len(cycles) > 1:
-            interpolated_data['right']['IMU'][category] = interpolate_cycle_data(
-                time_data, right_gyro, cycles)
-            interpolated_data['right']['ACC'][category] = interpolate_cycle_data(
-                time_data, right_acc, cycles)
-            interpolated_data['right']['BF'][category] = interpolate_cycle_data(
-                time_data, right_emg['BF'], cycles)
-            interpolated_data['right']['ST'][category] = interpolate_cycle_data(
-                time_data, right_emg['ST'], cycles)
-    
-    # Left leg interpolation
-    for category, cycles in left_selected.items():
-        if len(cycles) > 1:
-            interpolated_data['left']['IMU'][category] = interpolate_cycle_data(
-                time_data, left_gyro, cycles)
-            interpolated_data['left']['ACC'][category] = interpolate_cycle_data(
-                time_data, left_acc, cycles)
-            interpolated_data['left']['BF'][category] = interpolate_cycle_data(
-                time_data, left_emg['BF'], cycles)
-            interpolated_data['left']['ST'][category] = interpolate_cycle_data(
-                time_data, left_emg['ST'], cycles)
-    
-    save_interpolated_data(interpolated_data, filename, directories['interpolated_data'])
+    if registration == 'dtw':
+        print("\n[Step 5-1] Registering cycles with banded DTW...")
+        interpolated_data, _ = register_subject(interpolated_data, band=dtw_band, template=dtw_template,
+                                                n_workers=n_workers)
+        profiler.lap(subject, 'dtw_registration', cycles=n_interpolated)
+    
+    symmetry_data = {side: {**types, **{muscle: types[f'{muscle}_Envelope'] for muscle in envelope_types}}
+                     for side, types in interpolated_data.items()}
+    interpolated_data = {side: {data_type: types[data_type] for data_type in ['IMU', 'ACC', 'BF', 'ST']}
+                         for side, types in interpolated_data.items()}
+    
+    write_output(writer, subject, 'interpolated_data', save_interpolated_data,
+                 interpolated_data, filename, directories['interpolated_data'], raise_errors=raise_errors)
+    profiler.lap(subject, 'save_interpolated_data', cycles=n_interpolated)
+    
+    if cycle_db is not None:
+        rows, curves = [], []
+        for side, selected, valleys, peak_data in [('right', right_selected, right_valleys, right_peak_data),
+                                                   ('left', left_selected, left_valleys, left_peak_data)]:
+            side_rows, side_curves = cycle_records(subject, side, selected, valleys, time_data,
+                                                   peak_data, interpolated_data[side])
+            rows.extend(side_rows)
+            curves.extend(side_curves)
+        insert_subject_cycles(cycle_db, subject, rows, curves)
+        profiler.lap(subject, 'store_cycle_db', cycles=len(rows))
+    
+    if symmetry:
+        print("\n[Step 5-2] Computing bilateral symmetry...")
+        pairs, symmetry_curves = bilateral_symmetry(
+            subject, time_data, {'right': right_selected, 'left': left_selected},
+            {'right': right_valleys, 'left': left_valleys}, symmetry_data)
+        write_output(writer, subject, 'symmetry', save_symmetry, pairs, symmetry_curves, filename,
+                     directories['symmetry'])
+        profiler.lap(subject, 'bilateral_symmetry', cycles=len(pairs))
 
-def main():
+def main(shared_memory=False, n_workers=None, profile_subject=None,
+         base_dir=None, group_manifest=None, condition_emg=False, multirate=False,
+         spectral_features=True, subject_metadata=None, group_by=None, bands=None, cycle_db=False,
+         registration=None, dtw_band=10, dtw_template=None, time_policy='repair', diagnostics=True,
+         float32=False, data_dir=None, output_dir=None, stages=(1, 6), include=None, exclude=None,
+         params=None, qc=False, qc_thresholds=None, symmetry=False, async_writes=True, writer_threads=1,
+         max_pending_writes=MAX_PENDING):
+    """
+    전체 파이프라인 실행
+    - shared_memory, n_workers: process_file 참고
+    - profile_subject: 지정한 피실험자(파일명, 확장자 제외)의 처리 과정을 cProfile로 저장
+    - base_dir: sprint_data와 HSI_DataProcessing이 위치한 디렉토리 (None이면 현재 작업 디렉토리)
+    - group_manifest: 피실험자 그룹 CSV 경로 (None이면 get_injury_side로 직접 입력)
+    - condition_emg: process_file 참고
+    - multirate: 센서 그룹별 고유 샘플링 주파수 유지 (read_excel_files 참고)
+    - spectral_features: process_file 참고
+    - subject_metadata: 피실험자 메타데이터 표 경로 (HSI_ecohort.load_subject_metadata 참고)
+      group_manifest가 없으면 메타데이터의 group/side로 Step 6 그룹을 결정
+    - group_by: 메타데이터 기준 그룹 비교 리스트 (예: ['sport', ['sex', 'age_band']])
+    - bands: 연속 변수 구간 {열: 경계 리스트} (예: {'age': [18, 25, 30, 40]}이면 age_band 열 추가,
+      HSI_ecohort.load_subject_metadata 참고)
+    - cycle_db: True이면 08_CycleDatabase/cycles.sqlite에 사이클 인덱스와 곡선을 저장 (HSI_ecycledb 참고)
+    - registration, dtw_band: process_file 참고
+    - dtw_template: 그룹 템플릿 CSV 경로 (HSI_edtw.build_group_template, None이면 피실험자 평균 템플릿)
+    - time_policy: 시간축 검사/복구 방식 ('repair', 'flag', 'error', None이면 검사 생략, HSI_e01.check_time_grid 참고)
+      발견한 이상은 00_RunReport/time_grid_report.csv에 저장
+    - diagnostics: process_file 참고
+    - float32: 센서 채널을 float32로 읽어 Step 1-5와 Step 6 곡선 스택을 float32로 처리 (시간축과 평균/표준편차
+      누적은 float64, 허용 오차는 HSI_ebench.precision_check 참고)
+    - data_dir: 원본 엑셀 폴더 (None이면 base_dir/sprint_data)
+    - output_dir: 결과 폴더 (None이면 base_dir/HSI_DataProcessing)
+    - stages: 실행할 단계 범위 (처음, 끝), 예: (5, 6)이면 Step 5 결과만 다시 쓰고 Step 6 실행,
+      (6, 6)이면 원본을 읽지 않고 기존 Step 5 결과로 Step 6만 실행
+    - include, exclude: Step 1-5를 처리할 피실험자 이름/glob 패턴 (HSI_e01.select_subjects, Step 6는 전체 사용)
+    - params: 사이클 검출/스프린트 구분/선택 파라미터 (process_file 참고)
+    - qc, qc_thresholds: process_file 참고
+    - symmetry: process_file 참고, Step 6에서 그룹별 대칭 지수를 06_InjuryAnalysis/symmetry_stats.xlsx로 저장
+    - async_writes: Step 1-5 결과 파일을 백그라운드 writer 스레드에서 저장 (HSI_ewriter.OutputWriter)
+    - writer_threads, max_pending_writes: writer 스레드 수, 대기 중인 저장 작업 최대 개수 (가득 차면 계산이 대기)
+      저장 작업별 시간/오류는 00_RunReport/write_report.csv, 저장에 실패한 피실험자는 실패 목록에 포함
+    처리에 실패한 피실험자는 건너뛰고 00_RunReport/failed_subjects.txt에 기록 (CLI --retry-failed)
+    (이번 실행에서 처리하지 않은 피실험자의 이전 실패 기록은 유지, 다시 처리해 성공하면 제거)
+    """
     # Base directory setup: raw 데이터 경로 외에는 동적으로 현재 작업 디렉토리를 기준으로 사용
-    base_dir = os.getcwd()
-    data_dir = os.path.join(base_dir, 'sprint_data')
+    if base_dir is None:
+        base_dir = os.getcwd()
+    if data_dir is None:
+        data_dir = os.path.join(base_dir, 'sprint_data')
+    first, last = stages
     
     print("\n=== HSI Data Analysis Pipeline ===")
     
     # Create necessary directories
-    directories = create_directories(base_dir)
+    directories = create_directories(base_dir, output_dir)
+    profiler = StageProfiler()
+    db_path = os.path.join(directories['cycle_db'], 'cycles.sqlite') if cycle_db else None
+    template = load_template(dtw_template) if dtw_template is not None else None
+    signal_dtype = np.float32 if float32 else None
+    failed, write_errors = [], None
     
     # Phase 1: Process each file (Step 1-5)
-    print("\n[Phase 1] Reading and processing files...")
-    excel_data = read_excel_files(data_dir)
+    if first <= 5:
+        print(f"\n[Phase 1] Reading and processing files (Step {max(first, 1)}-{min(last, 5)})...")
+        profiler.phase = 1
+        excel_data = read_excel_files(data_dir, multirate=multirate, time_policy=time_policy, dtype=signal_dtype,
+                                      include=include, exclude=exclude)
+        profiler.lap('(all)', 'read_excel',
+                     rows=sum(len(df['EMG']) if multirate else len(df) for df in excel_data.values()))
+        
+        if time_policy is not None:
+            time_grid = time_grid_issues(excel_data)
+            time_grid_path = os.path.join(directories['run_report'], 'time_grid_report.csv')
+            time_grid.to_csv(time_grid_path, index=False)
+            problems = time_grid[time_grid['issue'] != 'padding']
+            if len(problems):
+                print(f"Time grid issues in {problems['file'].nunique()} file(s) "
+                      f"({int(problems['long'].sum())} long fills), see: {time_grid_path}")
+        
+        options = dict(shared_memory=shared_memory, n_workers=n_workers, profiler=profiler,
+                       condition_emg=condition_emg, spectral_features=spectral_features,
+                       cycle_db=db_path, registration=registration, dtw_band=dtw_band,
+                       dtw_template=template, qc=qc, qc_thresholds=qc_thresholds, diagnostics=diagnostics,
+                       params=params, steps=range(max(first, 1), min(last, 5) + 1), symmetry=symmetry)
+        writer = OutputWriter(writer_threads, max_pending_writes) if async_writes else None
+        # 읽기에 실패한 파일도 실패 목록에 포함
+        listed = select_subjects([f for f in sorted(os.listdir(data_dir)) if f.endswith('.xlsx')], include, exclude)
+        failed.extend(os.path.splitext(filename)[0] for filename in listed if filename not in excel_data)
+        try:
+            for filename, df in excel_data.items():
+                try:
+                    if profile_subject is not None and os.path.splitext(filename)[0] == profile_subject:
+                        prof_path = os.path.join(directories['run_report'], f"{profile_subject}.prof")
+                        profile_call(prof_path, process_file, filename, df, directories, writer=writer, **options)
+                    else:
+                        process_file(filename, df, directories, writer=writer, **options)
+                except Exception as e:
+                    print(f"Error processing {filename}: {str(e)}")
+                    failed.append(os.path.splitext(filename)[0])
+        finally:
+            if writer is not None:
+                # Step 6는 저장된 Step 5 파일을 읽으므로 남은 저장 작업을 모두 끝낸 뒤 진행
+                write_errors = writer.close()
+                writer.report().to_csv(os.path.join(directories['run_report'], WRITE_REPORT_FILENAME), index=False)
+                profiler.lap('(all)', 'drain_writes')
+        if write_errors is not None:
+            failed.extend(subject for subject in dict.fromkeys(write_errors['subject']) if subject not in failed)
+        
+        # 이번 실행에서 다루지 않은 피실험자(--include/--retry-failed 일부 실행)의 이전 실패 기록은 유지
+        failed_path = os.path.join(directories['run_report'], FAILED_FILENAME)
+        processed = {os.path.splitext(filename)[0] for filename in listed}
+        previous = []
+        if os.path.exists(failed_path):
+            with open(failed_path, encoding='utf-8') as f:
+                previous = [line.strip() for line in f if line.strip()]
+        recorded = [subject for subject in previous if subject not in processed] + failed
+        with open(failed_path, 'w', encoding='utf-8') as f:
+            f.write(''.join(f"{subject}\n" for subject in recorded))
+        if failed:
+            print(f"\n{len(failed)} file(s) failed: {', '.join(failed)} (rerun with --retry-failed)")
     
-    for filename, df in excel_data.items():
-        process_file(filename, df, directories)
+    if last < 6:
+        finish_run(directories, profiler, failed, write_errors)
+        return
     
         # Phase 2: Injury Analysis (Step 6)
     print("\n[Phase 2] Performing injury analysis...")
-    subject_data = get_injury_side(directories['interpolated_data'])
+    profiler.phase = 2
+    metadata = load_subject_metadata(subject_metadata, bands) if subject_metadata is not None else None
+    if group_manifest is not None:
+        subject_data = load_group_manifest(group_manifest)
+    elif metadata is not None:
+        subject_data = metadata_subject_data(metadata)
+    else:
+        subject_data = get_injury_side(directories['interpolated_data'])
     
     if subject_data:
         print("\nAnalyzing data and generating visualizations...")
         results = analyze_injury_data(
             directories['interpolated_data'],
             subject_data,
-            directories['injury_analysis']
+            directories['injury_analysis'],
+            profiler=profiler,
+            interval_dir=directories['interval_data'],
+            dtype=signal_dtype
         )
         print("\nAnalysis results have been saved to:")
         print(f"- Graphs: {directories['injury_analysis']}/*.png")
         print(f"- Statistics: {directories['injury_analysis']}/analysis_stats.xlsx")
+        if symmetry:
+            print("\nComparing bilateral symmetry between groups...")
+            analyze_symmetry_groups(directories['symmetry'], subject_data, directories['injury_analysis'])
+            profiler.lap('(all)', 'symmetry_groups')
     
-    print("\n=== Analysis Pipeline Completed Successfully! ===")
+    if metadata is not None and group_by:
+        print("\nComparing metadata-defined groups...")
+        analyze_cohort_groups(directories['interpolated_data'], metadata, group_by,
+                              directories['injury_analysis'], profiler=profiler,
+                              dtype=signal_dtype or float)
+    
+    finish_run(directories, profiler, failed, write_errors)
+
+def finish_run(directories, profiler, failed, write_errors=None):
+    """실행 리포트 저장 후 실행 요약 출력 (처리/저장 실패가 있으면 목록과 리포트 경로)"""
+    profiler.save(directories['run_report'])
+    if write_errors is not None and len(write_errors):
+        print(f"\n{len(write_errors)} output(s) failed to write:")
+        for row in write_errors.itertuples():
+            print(f"- {row.subject} {row.output}: {row.error}")
+        print(f"See: {os.path.join(directories['run_report'], WRITE_REPORT_FILENAME)}")
+    if failed:
+        print(f"\n=== Analysis Pipeline Completed with {len(failed)} failed subject(s): {', '.join(failed)} ===")
+    else:
+        print("\n=== Analysis Pipeline Completed Successfully! ===")
+
+def parse_stages(text):
+    """'5-6' / '6' / '1-5' 형태의 단계 범위를 (처음, 끝) 튜플로 변환 (1-6)"""
+    first, _, last = text.partition('-')
+    first, last = int(first), int(last or first)
+    if not 1 <= first <= last <= 6:
+        raise argparse.ArgumentTypeError(f"stage range must be within 1-6: {text}")
+    return first, last
+
+def parse_band(text):
+    """'age=18,25,30,40' 형태의 구간 정의를 (열, 경계 리스트)로 변환"""
+    column, _, edges = text.partition('=')
+    try:
+        bins = [float(edge) for edge in edges.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"band edges must be numbers: {text}")
+    if not column or len(bins) < 2 or bins != sorted(bins):
+        raise argparse.ArgumentTypeError(f"band must look like COL=EDGE,EDGE,... (increasing): {text}")
+    return column, bins
+
+def build_parser(description='HSI sprint data pipeline (Step 1-6)'):
+    """HSI_emain CLI 인자 파서 (감시 모드 HSI_ewatch도 같은 옵션을 사용)"""
+    parser = argparse.ArgumentParser(description=description)
+    io_group = parser.add_argument_group('input/output')
+    io_group.add_argument('--base-dir', help='directory holding sprint_data and HSI_DataProcessing (default: cwd)')
+    io_group.add_argument('--data-dir', help='raw Excel directory (default: BASE/sprint_data)')
+    io_group.add_argument('--output-dir', help='results directory (default: BASE/HSI_DataProcessing)')
+    io_group.add_argument('--manifest', help='group manifest CSV (subject,group)')
+    io_group.add_argument('--metadata', help='subject metadata table (see HSI_ecohort)')
+    io_group.add_argument('--group-by', action='append', metavar='COL[,COL]',
+                          help='metadata grouping for cohort comparison (repeatable)')
+    io_group.add_argument('--band', action='append', type=parse_band, metavar='COL=EDGE,EDGE,...',
+                          help="add a COL_band grouping column, e.g. 'age=18,25,30,40' (repeatable)")
+
+    run_group = parser.add_argument_group('stage and subject selection')
+    run_group.add_argument('--stages', type=parse_stages, default=(1, 6), metavar='FIRST[-LAST]',
+                           help="steps to run, e.g. '5-6' or '6' (default: 1-6)")
+    run_group.add_argument('--include', nargs='+', metavar='SUBJECT', help='subject names or glob patterns')
+    run_group.add_argument('--exclude', nargs='+', metavar='SUBJECT', help='subject names or glob patterns')
+    run_group.add_argument('--retry-failed', action='store_true',
+                           help=f'only process subjects listed in 00_RunReport/{FAILED_FILENAME}')
+
+    threshold_group = parser.add_argument_group('thresholds (default: function defaults)')
+    for name, default in DEFAULT_PARAMS.items():
+        # 샘플 수/사이클 수는 정수, 나머지 임계값은 실수
+        value_type = int if name in ['window_size', 'min_distance', 'n_cycles'] else float
+        threshold_group.add_argument(f"--{name.replace('_', '-')}", type=value_type, help=f'default {default}')
+    threshold_group.add_argument('--qc', action='store_true', help='reject outlier cycles before selection')
+    for name, default in QC_THRESHOLDS.items():
+        threshold_group.add_argument(f"--qc-{name.replace('_', '-')}", type=float, help=f'default {default}')
+    threshold_group.add_argument('--time-policy', choices=['repair', 'flag', 'error', 'off'], default='repair')
+
+    option_group = parser.add_argument_group('processing options')
+    option_group.add_argument('--shared-memory', action='store_true')
+    option_group.add_argument('--workers', type=int)
+    option_group.add_argument('--multirate', action='store_true')
+    option_group.add_argument('--condition-emg', action='store_true')
+    option_group.add_argument('--no-spectral', action='store_true')
+    option_group.add_argument('--no-diagnostics', action='store_true')
+    option_group.add_argument('--symmetry', action='store_true', help='save bilateral symmetry indices (10_Symmetry)')
+    option_group.add_argument('--sync-writes', action='store_true', help='save outputs in the processing thread')
+    option_group.add_argument('--writer-threads', type=int, default=1)
+    option_group.add_argument('--max-pending-writes', type=int, default=MAX_PENDING)
+    option_group.add_argument('--float32', action='store_true')
+    option_group.add_argument('--cycle-db', action='store_true')
+    option_group.add_argument('--registration', choices=['dtw'])
+    option_group.add_argument('--dtw-band', type=int, default=10)
+    option_group.add_argument('--dtw-template')
+    option_group.add_argument('--profile-subject')
+    return parser
+
+def parse_args(argv=None):
+    """HSI_emain CLI 인자 (main의 매개변수와 같은 이름)"""
+    return build_parser().parse_args(argv)
+
+def main_options(args):
+    """CLI 인자를 main의 키워드 인자로 변환 (--retry-failed는 호출하는 쪽에서 처리)"""
+    return dict(
+        shared_memory=args.shared_memory, n_workers=args.workers, profile_subject=args.profile_subject,
+        base_dir=args.base_dir or os.getcwd(), group_manifest=args.manifest, condition_emg=args.condition_emg,
+        multirate=args.multirate, spectral_features=not args.no_spectral, subject_metadata=args.metadata,
+        group_by=[column.split(',') for column in args.group_by] if args.group_by else None,
+        bands=dict(args.band) if args.band else None,
+        cycle_db=args.cycle_db, registration=args.registration, dtw_band=args.dtw_band,
+        dtw_template=args.dtw_template, time_policy=None if args.time_policy == 'off' else args.time_policy,
+        diagnostics=not args.no_diagnostics, float32=args.float32, data_dir=args.data_dir,
+        output_dir=args.output_dir, stages=args.stages, include=args.include, exclude=args.exclude,
+        params={name: getattr(args, name) for name in DEFAULT_PARAMS if getattr(args, name) is not None},
+        qc=args.qc, symmetry=args.symmetry, async_writes=not args.sync_writes,
+        writer_threads=args.writer_threads, max_pending_writes=args.max_pending_writes,
+        qc_thresholds={name: getattr(args, f'qc_{name}') for name in QC_THRESHOLDS
+                       if getattr(args, f'qc_{name}') is not None})
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    args = parse_args()
+    options = main_options(args)
+    if args.retry_failed:
+        output_dir = args.output_dir or os.path.join(options['base_dir'], 'HSI_DataProcessing')
+        with open(os.path.join(output_dir, '00_RunReport', FAILED_FILENAME), encoding='utf-8') as f:
+            options['include'] = [line.strip() for line in f if line.strip()]
+        if not options['include']:
+            raise SystemExit("No failed subjects recorded in the last run.")
+
+    main(**options)
\ No newline at end of file
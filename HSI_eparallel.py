@@ -0,0 +1,159 @@
+# 공유 메모리 기반 파일 내부 병렬 처리 (다리/채널 단위)
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import os
+from HSI_e02 import find_gait_cycles
+from HSI_e04 import find_sprint_intervals, find_cycles_in_sprint, select_middle_cycles, DEFAULT_PARAMS
+from HSI_e05 import interpolate_cycle_data
+from HSI_eqc import cycle_qc_features, rejected_cycles
+
+SIDES = ['right', 'left']
+DATA_TYPES = ['IMU', 'ACC', 'BF', 'ST']
+
+# 워커 프로세스가 붙어 있는 공유 메모리 (워커당 하나)
+_shared = {'name': None, 'shm': None, 'time': None, 'matrix': None, 'rows': None}
+
+
+class SharedChannelMatrix:
+    """
+    기록 하나의 채널 행렬을 공유 메모리에 한 번만 올려두는 컨테이너
+    - 버퍼 앞부분: float64 시간 벡터
+    - 이어서 채널 행렬 (행: '{side}_{data_type}' (예: 'right_IMU', 'left_BF'), 열: 샘플)
+      자료형은 입력 채널 자료형 (float32 모드면 float32, 공유 메모리 크기가 거의 절반)
+    워커는 이름으로 붙기만 하므로 데이터 복사가 발생하지 않음
+    """
+
+    def __init__(self, time_data, leg_signals):
+        rows = [f'{side}_{data_type}' for side in SIDES for data_type in DATA_TYPES]
+        n_samples = len(time_data)
+        dtype = np.result_type(*[np.asarray(leg_signals[side][data_type]).dtype
+                                 for side in SIDES for data_type in DATA_TYPES])
+
+        self.rows = rows
+        self.shape = (len(rows), n_samples)
+        self.dtype = dtype if np.issubdtype(dtype, np.floating) else np.dtype(np.float64)
+        self.offset = n_samples * np.dtype(np.float64).itemsize
+        size = self.offset + int(np.prod(self.shape)) * self.dtype.itemsize
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, size))
+        self.time = np.ndarray((n_samples,), dtype=np.float64, buffer=self.shm.buf)
+        self.matrix = np.ndarray(self.shape, dtype=self.dtype, buffer=self.shm.buf, offset=self.offset)
+
+        self.time[:] = np.asarray(time_data, dtype=np.float64)
+        for side in SIDES:
+            for data_type in DATA_TYPES:
+                self.matrix[rows.index(f'{side}_{data_type}')] = np.asarray(leg_signals[side][data_type], dtype=self.dtype)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def handle(self):
+        """워커에 넘길 최소 정보 (이름, 형태, dtype, 행 이름)"""
+        return self.shm.name, self.shape, self.dtype.str, self.rows
+
+    def close(self):
+        self.time = None
+        self.matrix = None
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _attach(handle):
+    """워커 쪽: 공유 메모리에 복사 없이 붙어서 (시간, 행렬, 행 이름) 뷰를 반환 (같은 이름이면 재사용)"""
+    name, shape, dtype, rows = handle
+    if _shared['name'] != name:
+        if _shared['shm'] is not None:
+            _shared['time'] = _shared['matrix'] = None
+            _shared['shm'].close()
+        shm = shared_memory.SharedMemory(name=name)
+        offset = shape[1] * np.dtype(np.float64).itemsize
+        _shared.update(name=name, shm=shm, rows=rows,
+                       time=np.ndarray((shape[1],), dtype=np.float64, buffer=shm.buf),
+                       matrix=np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf, offset=offset))
+    return _shared['time'], _shared['matrix'], _shared['rows']
+
+
+def _detect_leg(handle, side, qc=False, qc_thresholds=None, params=None):
+    """
+    워커 작업: 한쪽 다리의 사이클 검출, 인터벌 구분, 품질 검사, 중간 사이클 선택 (Step 2, 4)
+    - params: 검출/구분/선택 파라미터 중 기본값과 다른 것 (HSI_e04.DEFAULT_PARAMS 참고)
+    """
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    time_data, matrix, rows = _attach(handle)
+    gyro = matrix[rows.index(f'{side}_IMU')]
+
+    valleys, cycles = find_gait_cycles(time_data, gyro, side.capitalize(), min_distance=params['min_distance'],
+                                       window_size=params['window_size'], peak_threshold=params['peak_threshold'])
+    intervals = find_sprint_intervals(gyro, time_data, velocity_threshold=params['velocity_threshold'],
+                                      min_rest_duration=params['min_rest_duration'])
+    categorized = find_cycles_in_sprint(valleys, intervals)
+    qc_features = None
+    if qc:
+        emg = {muscle: matrix[rows.index(f'{side}_{muscle}')] for muscle in ['BF', 'ST']}
+        qc_features = cycle_qc_features(time_data, gyro, valleys, categorized, emg=emg, thresholds=qc_thresholds)
+    selected = select_middle_cycles(categorized, n_cycles=params['n_cycles'],
+                                    rejected=rejected_cycles(qc_features) if qc else None)
+
+    return {
+        'valleys': valleys,
+        'cycles': cycles,
+        'intervals': intervals,
+        'categorized': categorized,
+        'qc': qc_features,
+        'selected': selected
+    }
+
+
+def _interpolate_channel(handle, side, data_type, selected):
+    """워커 작업: 한쪽 다리의 한 채널을 스프린트별로 보간 (Step 5)"""
+    time_data, matrix, rows = _attach(handle)
+    data = matrix[rows.index(f'{side}_{data_type}')]
+
+    return {category: interpolate_cycle_data(time_data, data, cycles)
+            for category, cycles in selected.items() if len(cycles) > 1}
+
+
+def analyze_legs_shared(time_data, leg_signals, n_workers=None, qc=False, qc_thresholds=None, params=None):
+    """
+    채널 행렬을 공유 메모리에 올린 뒤 다리/채널 단위 작업을 워커 풀에 분배
+
+    Parameters:
+    - time_data: 시간 데이터
+    - leg_signals: {'right': {'IMU':..., 'ACC':..., 'BF':..., 'ST':...}, 'left': {...}}
+    - n_workers: 워커 수 (None이면 min(8, CPU 수))
+    - qc, qc_thresholds: 선택 전 사이클 품질 검사 (HSI_eqc.cycle_qc_features)
+    - params: 검출/구분/선택 파라미터 (_detect_leg 참고)
+
+    Returns:
+    - leg_results: {side: {'valleys', 'cycles', 'intervals', 'categorized', 'qc', 'selected', 'interpolated'}}
+    """
+    if n_workers is None:
+        n_workers = min(len(SIDES) * len(DATA_TYPES), os.cpu_count() or 1)
+
+    with SharedChannelMatrix(time_data, leg_signals) as shared:
+        handle = shared.handle()
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            # Step 2, 4: 다리별 검출
+            detect_futures = {side: executor.submit(_detect_leg, handle, side, qc, qc_thresholds, params)
+                              for side in SIDES}
+            leg_results = {side: future.result() for side, future in detect_futures.items()}
+
+            # Step 5: 다리 x 채널별 보간
+            interp_futures = {
+                (side, data_type): executor.submit(
+                    _interpolate_channel, handle, side, data_type, leg_results[side]['selected'])
+                for side in SIDES for data_type in DATA_TYPES
+            }
+            for side in SIDES:
+                leg_results[side]['interpolated'] = {
+                    data_type: interp_futures[(side, data_type)].result() for data_type in DATA_TYPES
+                }
+
+    return leg_results
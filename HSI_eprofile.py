@@ -0,0 +1,115 @@
+# 단계별 실행 시간/메모리 계측 및 실행 리포트
+import os
+import sys
+import json
+import time
+import cProfile
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def _peak_rss_mb(who=None):
+    """프로세스 최대 RSS (MB). resource 모듈이 없으면 None"""
+    if resource is None:
+        return None
+    if who is None:
+        who = resource.RUSAGE_SELF
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux는 KB, macOS는 byte 단위
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return round(peak / scale, 2)
+
+
+class StageProfiler:
+    """
+    파이프라인 단계별 wall time, CPU time, 최대 RSS, 처리한 행/사이클 수를 기록
+
+    사용법:
+        profiler.start()                           # 기준 시점 설정
+        ...단계 수행...
+        profiler.lap(subject, 'extract', rows=n)   # 직전 시점부터의 소요 시간 기록
+        profiler.phase = 2                         # 이후 기록의 phase 열 (HSI_emain: 1 = Step 1-5, 2 = Step 6)
+    """
+
+    def __init__(self):
+        self.records = []
+        self.phase = None
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+
+    def start(self):
+        """다음 lap의 기준 시점을 현재로 설정"""
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+
+    def lap(self, subject, stage, rows=None, cycles=None):
+        """직전 start/lap 이후 구간을 하나의 단계로 기록"""
+        wall, cpu = time.perf_counter(), time.process_time()
+        record = {
+            'subject': subject,
+            'stage': stage,
+            'phase': self.phase,
+            'wall_s': round(wall - self._wall, 6),
+            'cpu_s': round(cpu - self._cpu, 6),
+            'peak_rss_mb': _peak_rss_mb(),
+            'peak_rss_children_mb': _peak_rss_mb(resource.RUSAGE_CHILDREN) if resource else None,
+            'rows': rows,
+            'cycles': cycles
+        }
+        self.records.append(record)
+        self._wall, self._cpu = wall, cpu
+        return record
+
+    def summary(self):
+        """단계별 합계 (wall/CPU 시간, 최대 RSS)"""
+        if not self.records:
+            return pd.DataFrame()
+        df = pd.DataFrame(self.records)
+        return df.groupby('stage', sort=False).agg(
+            wall_s=('wall_s', 'sum'),
+            cpu_s=('cpu_s', 'sum'),
+            peak_rss_mb=('peak_rss_mb', 'max'),
+            subjects=('subject', 'nunique')
+        )
+
+    def save(self, output_dir, basename='run_report'):
+        """
+        실행 리포트를 JSON과 CSV로 저장
+
+        Returns:
+        - (json 경로, csv 경로)
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        json_path = os.path.join(output_dir, f"{basename}.json")
+        csv_path = os.path.join(output_dir, f"{basename}.csv")
+
+        summary = self.summary()
+        report = {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'records': self.records,
+            'summary': summary.reset_index().to_dict(orient='records')
+        }
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False, default=float)
+        pd.DataFrame(self.records).to_csv(csv_path, index=False)
+
+        print(f"Run report saved to: {json_path}")
+        return json_path, csv_path
+
+
+def profile_call(output_path, func, *args, **kwargs):
+    """
+    func(*args, **kwargs)를 cProfile로 실행하고 결과를 output_path(.prof)에 저장
+    (snakeviz, pstats 등으로 확인)
+    """
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func, *args, **kwargs)
+    finally:
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        profiler.dump_stats(output_path)
+        print(f"cProfile stats saved to: {output_path}")
@@ -0,0 +1,149 @@
+# 사이클 품질 검사 (세션 전체 사이클의 특징 행렬을 배열 연산으로 계산, 선택 전 이상 사이클 제외)
+import numpy as np
+import pandas as pd
+from HSI_e01 import map_indices_by_time
+
+# 판정 기준 (robust z = (값 - 스프린트 중앙값) / (1.4826 x MAD))
+QC_THRESHOLDS = {
+    'max_duration_z': 3.5,        # 사이클 시간 robust z 절댓값 상한
+    'max_velocity_z': 3.5,        # 사이클 안 최대 각속도(스윙 피크) robust z 절댓값 상한
+    'max_emg_saturation': 0.02,   # EMG 포화(클리핑) 샘플 비율 상한
+    'min_median_corr': 0.8        # 스프린트 중앙 GYRO 곡선과의 상관계수 하한
+}
+# MAD가 0에 가까운 매우 규칙적인 스프린트에서 z가 폭주하지 않도록 중앙값 대비 최소 척도
+MIN_SCALE_RATIO = 0.05
+SATURATION_TOLERANCE = 0.001
+NUM_POINTS = 101
+
+
+def _robust_z(values, groups):
+    """그룹(스프린트)별 중앙값/MAD 기준 robust z (그룹 0 = 스프린트 밖, NaN)"""
+    z = np.full(len(values), np.nan)
+    for group in np.unique(groups[groups > 0]):
+        mask = groups == group
+        median = np.nanmedian(values[mask])
+        scale = 1.4826 * np.nanmedian(np.abs(values[mask] - median))
+        scale = max(scale, MIN_SCALE_RATIO * abs(median), np.finfo(float).tiny)
+        z[mask] = (values[mask] - median) / scale
+    return z
+
+
+def cycle_qc_features(time, gyro, valleys, categorized, emg=None, emg_time=None, thresholds=None):
+    """
+    검출된 모든 사이클(valley[i] ~ valley[i+1])의 품질 특징을 한 번에 계산하고 판정
+
+    - 최대 각속도(Max_Velocity, 사이클 안 GYRO 최댓값), EMG 포화 비율: 사이클 경계 기준 reduceat 한 번
+      (find_gait_cycles의 peak_velocity는 valley 시점 값이므로 다른 지표)
+    - 중앙 곡선 상관: 모든 사이클 GYRO를 한 번의 np.interp로 101 포인트로 재표본화 후 행별 상관
+    - 스프린트(categorized)에 속하지 않는 사이클과 마지막 valley는 판정하지 않음 (Pass)
+    - 스프린트의 마지막 사이클은 다음 valley가 휴식 구간 뒤에 있으므로 Step 5 보간과 같이
+      직전 사이클 길이를 사이클 길이로 사용
+
+    Parameters:
+    - time: GYRO 시간 데이터
+    - gyro: GYRO 데이터
+    - valleys: find_gait_cycles 결과
+    - categorized: find_cycles_in_sprint 결과
+    - emg: {'BF': EMG 데이터, 'ST': EMG 데이터} (None이면 포화 검사 생략)
+    - emg_time: EMG 시간 데이터 (다중 주파수 기록, None이면 GYRO와 같은 시간축)
+    - thresholds: QC_THRESHOLDS 일부를 덮어쓸 딕셔너리
+
+    Returns:
+    - qc: 사이클 시작 valley를 인덱스로 하는 데이터프레임
+      (열 = Sprint, Duration, Duration_Z, Max_Velocity, Max_Velocity_Z, EMG_Saturation, Median_Corr, Pass, Reason)
+    """
+    thresholds = {**QC_THRESHOLDS, **(thresholds or {})}
+    valleys = np.asarray(valleys, dtype=int)
+    columns = ['Sprint', 'Duration', 'Duration_Z', 'Max_Velocity', 'Max_Velocity_Z',
+               'EMG_Saturation', 'Median_Corr', 'Pass', 'Reason']
+    if len(valleys) < 2:
+        return pd.DataFrame(columns=columns, index=pd.Index(valleys, name='valley_idx'))
+
+    time_values = np.asarray(time, dtype=float)
+    gyro_values = np.asarray(gyro, dtype=float)
+    starts, ends = valleys[:-1], valleys[1:]
+    n = len(starts)
+
+    sprint = np.zeros(n, dtype=int)
+    for category, cycles in categorized.items():
+        sprint[np.isin(starts, cycles)] = category
+
+    # 다음 valley가 다른 스프린트(또는 휴식)면 직전 사이클 길이로 끝을 정함 (interpolate_cycle_data와 동일)
+    sprint_end = (sprint > 0) & (np.append(sprint[1:], 0) != sprint)
+    previous_length = np.diff(valleys, prepend=valleys[0])[:-1]
+    ends = np.where(sprint_end & (previous_length > 0),
+                    np.minimum(starts + previous_length, len(gyro_values) - 1), ends)
+
+    duration = time_values[ends] - time_values[starts]
+    # 구간 [start, end) 합/최대를 reduceat 한 번으로 계산 (시작/끝 경계를 교대로 배치하고 짝수 번째만 사용)
+    bounds = np.column_stack([starts, np.maximum(ends, starts + 1)]).ravel()
+    bounds = np.minimum(bounds, len(gyro_values) - 1)
+    max_velocity = np.maximum.reduceat(gyro_values, bounds)[::2]
+
+    saturation = np.zeros(n)
+    if emg is not None:
+        if emg_time is None:
+            emg_starts, emg_ends = starts, ends
+        else:
+            emg_starts = map_indices_by_time(starts, time_values, emg_time)
+            emg_ends = map_indices_by_time(ends, time_values, emg_time)
+        emg_ends = np.maximum(emg_ends, emg_starts + 1)
+        for data in emg.values():
+            magnitude = np.abs(np.asarray(data, dtype=float))
+            rail = np.nanmax(magnitude)
+            clipped = (magnitude >= rail * (1 - SATURATION_TOLERANCE)).astype(float)
+            emg_bounds = np.minimum(np.column_stack([emg_starts, emg_ends]).ravel(), len(clipped) - 1)
+            counts = np.add.reduceat(clipped, emg_bounds)[::2]
+            saturation = np.maximum(saturation, counts / np.maximum(emg_ends - emg_starts, 1))
+
+    # 모든 사이클을 101 포인트로 재표본화 (선형)
+    positions = starts[:, None] + np.linspace(0, 1, NUM_POINTS)[None, :] * (ends - starts)[:, None]
+    curves = np.interp(positions.ravel(), np.arange(len(gyro_values)), gyro_values).reshape(n, NUM_POINTS)
+    median_corr = np.full(n, np.nan)
+    for category in np.unique(sprint[sprint > 0]):
+        mask = sprint == category
+        reference = np.median(curves[mask], axis=0)
+        centered = curves[mask] - curves[mask].mean(axis=1, keepdims=True)
+        ref_centered = reference - reference.mean()
+        denom = np.linalg.norm(centered, axis=1) * np.linalg.norm(ref_centered)
+        median_corr[mask] = np.where(denom > 0, centered @ ref_centered / np.where(denom > 0, denom, 1), 0.0)
+
+    duration_z = _robust_z(duration, sprint)
+    max_velocity_z = _robust_z(max_velocity, sprint)
+
+    in_sprint = sprint > 0
+    failures = {
+        'duration': in_sprint & (np.abs(duration_z) > thresholds['max_duration_z']),
+        'max_velocity': in_sprint & (np.abs(max_velocity_z) > thresholds['max_velocity_z']),
+        'emg_saturation': in_sprint & (saturation > thresholds['max_emg_saturation']),
+        'median_corr': in_sprint & (median_corr < thresholds['min_median_corr'])
+    }
+    failed = np.any(np.stack(list(failures.values())), axis=0)
+    reason = np.full(n, '', dtype=object)
+    for name, mask in failures.items():
+        reason[mask] = reason[mask] + ',' + name
+
+    qc = pd.DataFrame({
+        'Sprint': sprint,
+        'Duration': duration,
+        'Duration_Z': duration_z,
+        'Max_Velocity': max_velocity,
+        'Max_Velocity_Z': max_velocity_z,
+        'EMG_Saturation': saturation,
+        'Median_Corr': median_corr,
+        'Pass': ~failed,
+        'Reason': pd.Series(reason).str.lstrip(',').to_numpy()
+    }, index=pd.Index(starts, name='valley_idx'))
+    return qc[columns]
+
+
+def rejected_cycles(qc):
+    """판정에 실패한 사이클 시작 valley 인덱스 리스트 (select_middle_cycles의 rejected 입력)"""
+    return qc.index[~qc['Pass'].astype(bool)].tolist()
+
+
+def qc_summary(qc):
+    """스프린트 안의 검사/제외 사이클 수 문자열 (로그 출력용)"""
+    in_sprint = qc[qc['Sprint'] > 0]
+    n_rejected = int((~in_sprint['Pass'].astype(bool)).sum())
+    return f"{n_rejected}/{len(in_sprint)} sprint cycles rejected"
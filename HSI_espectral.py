@@ -0,0 +1,172 @@
+# EMG 주파수 피로 지표 (사이클별 중앙/평균 주파수)
+import os
+import numpy as np
+import pandas as pd
+
+MUSCLES = ['BF', 'ST']
+SPECTRAL_BAND = (20, 450)
+FEATURES = ['MDF', 'MNF']
+# 중앙 사이클 길이의 이 배수보다 긴 구간(휴식 구간을 건너뛰는 valley 쌍)은 배치 FFT에서 제외
+MAX_LENGTH_RATIO = 3.0
+
+
+def _cycle_matrix(data, starts, lengths, n_fft):
+    """
+    (사이클 수, n_fft) 행렬로 사이클 구간을 한 번에 모음
+    - 각 행은 사이클 길이에 맞춘 Hann 윈도우를 곱하고 나머지는 0으로 채움
+    """
+    k = np.arange(n_fft)
+    valid = k[None, :] < lengths[:, None]
+    idx = np.minimum(starts[:, None] + k[None, :], len(data) - 1)
+    # 사이클마다 길이가 다른 Hann 윈도우를 한 번에 계산
+    denom = np.maximum(lengths - 1, 1)[:, None]
+    window = 0.5 - 0.5 * np.cos(2 * np.pi * k[None, :] / denom)
+    segments = data[idx]
+    # DC 제거 (사이클별 평균)
+    means = np.sum(np.where(valid, segments, 0.0), axis=1, keepdims=True) / lengths[:, None]
+    return np.where(valid, (segments - means) * window, 0.0)
+
+
+def cycle_spectral_features(time, emg_channels, valleys, labels=None, band=SPECTRAL_BAND, min_samples=16,
+                            cycles=None, max_length_ratio=MAX_LENGTH_RATIO):
+    """
+    연속된 두 음의 피크 사이(valley[i] ~ valley[i+1])를 한 사이클로 보고
+    대상 사이클 x 모든 EMG 채널의 중앙 주파수(MDF)와 평균 주파수(MNF)를 한 번의 배치 FFT로 계산
+    - 배치 행렬 크기는 (채널, 사이클, 가장 긴 대상 사이클)이므로 휴식 구간을 포함하는 긴 구간은
+      cycles와 max_length_ratio로 제외 (제외된 사이클은 NaN)
+
+    Parameters:
+    - time: EMG 시간 데이터
+    - emg_channels: {'BF': EMG 데이터, 'ST': EMG 데이터} (정류/포락선 처리 전 원시 EMG)
+    - valleys: EMG 샘플 인덱스 기준 사이클 경계 (find_gait_cycles 결과, 다중 주파수면 변환 후)
+    - labels: 결과 행 인덱스 (None이면 valleys, 다중 주파수에서는 GYRO 기준 valley 인덱스 사용)
+    - band: 지표 계산에 사용할 주파수 대역 (Hz)
+    - min_samples: 이보다 짧은 사이클은 NaN
+    - cycles: 계산할 사이클의 시작 위치 (labels 기준, 예: 스프린트 구간 안의 valley, None이면 전체)
+    - max_length_ratio: 대상 사이클 길이 중앙값의 이 배수보다 긴 사이클은 NaN
+
+    Returns:
+    - features: 사이클 시작 valley별 {'BF_MDF', 'BF_MNF', 'ST_MDF', 'ST_MNF'} 데이터프레임
+      (마지막 valley는 다음 경계가 없으므로 제외)
+    """
+    valleys = np.asarray(valleys, dtype=int)
+    labels = valleys if labels is None else np.asarray(labels)
+    columns = [f'{muscle}_{feature}' for muscle in emg_channels for feature in FEATURES]
+    if len(valleys) < 2:
+        return pd.DataFrame(columns=columns, index=pd.Index([], name='valley_idx'), dtype=float)
+
+    time_values = np.asarray(time, dtype=float)
+    fs = 1.0 / np.nanmedian(np.diff(time_values))
+    starts = valleys[:-1]
+    lengths = np.diff(valleys)
+    target = np.ones(len(starts), dtype=bool) if cycles is None else np.isin(labels[:-1], np.asarray(cycles))
+    if target.any():
+        target &= lengths <= max_length_ratio * np.median(lengths[target])
+    if not target.any():
+        return pd.DataFrame(np.nan, columns=columns, index=pd.Index(labels[:-1], name='valley_idx'))
+    n_fft = int(2 ** np.ceil(np.log2(max(lengths[target].max(), min_samples))))
+
+    # (채널, 대상 사이클, n_fft) -> 한 번의 rfft
+    stacked = np.stack([_cycle_matrix(np.asarray(data, dtype=float), starts[target], lengths[target], n_fft)
+                        for data in emg_channels.values()])
+    power = np.abs(np.fft.rfft(stacked, axis=-1)) ** 2
+    freqs = np.fft.rfftfreq(n_fft, 1.0 / fs)
+
+    in_band = (freqs >= band[0]) & (freqs <= min(band[1], fs / 2))
+    power = power[..., in_band]
+    freqs = freqs[in_band]
+
+    total = power.sum(axis=-1)
+    mnf = (power * freqs).sum(axis=-1) / total
+    cumulative = np.cumsum(power, axis=-1)
+    mdf = freqs[np.argmax(cumulative >= total[..., None] / 2, axis=-1)]
+
+    too_short = lengths[target] < min_samples
+    features = {}
+    for c, muscle in enumerate(emg_channels):
+        for feature, values in [('MDF', mdf[c]), ('MNF', mnf[c])]:
+            column = np.full(len(starts), np.nan)
+            column[target] = np.where(too_short | (total[c] == 0), np.nan, values)
+            features[f'{muscle}_{feature}'] = column
+
+    df = pd.DataFrame(features, index=pd.Index(labels[:-1], name='valley_idx'))
+    return df[columns]
+
+
+def spectral_trend(features, selected):
+    """
+    스프린트별 MDF/MNF 평균과 스프린트 내 추세(사이클당 기울기)
+
+    Parameters:
+    - features: cycle_spectral_features 결과
+    - selected: select_middle_cycles 결과 {스프린트: [valley 인덱스]}
+
+    Returns:
+    - trend: 행 = (Sprint, Muscle), 열 = MDF_Mean, MDF_Slope, MNF_Mean, MNF_Slope, N_Cycles
+    """
+    rows = []
+    for category, cycles in selected.items():
+        sprint_features = features.reindex(cycles)
+        for muscle in MUSCLES:
+            row = {'Sprint': category, 'Muscle': muscle}
+            for feature in FEATURES:
+                values = sprint_features.get(f'{muscle}_{feature}', pd.Series(dtype=float)).to_numpy(dtype=float)
+                valid = ~np.isnan(values)
+                row[f'{feature}_Mean'] = np.nanmean(values) if valid.any() else np.nan
+                # 사이클 순서에 대한 1차 회귀 기울기 (피로 시 MDF 감소)
+                row[f'{feature}_Slope'] = np.polyfit(np.arange(len(values))[valid], values[valid], 1)[0] \
+                    if valid.sum() > 1 else np.nan
+            row['N_Cycles'] = int(sprint_features.notna().any(axis=1).sum())
+            rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def summarize_spectral_groups(interval_dir, subject_data, cache=None):
+    """
+    Step 4 결과(*_interval_data.xlsx)의 사이클별 MDF/MNF를 그룹/스프린트/근육별로 요약 (Step 6 비교용)
+    - cache: {(피실험자, side): 해당 다리 시트 데이터프레임 (스펙트럼 열이 없으면 None)} 딕셔너리
+      주어지면 캐시에 없는 피실험자만 파일에서 읽고 캐시에 추가 (감시 모드에서 재처리한 피실험자만 다시 읽음)
+
+    Returns:
+    - summary: 열 = Group, Sprint, Muscle, MDF_Mean, MDF_STD, MNF_Mean, MNF_STD, N_Cycles
+      (스펙트럼 열이 없는 파일만 있으면 빈 데이터프레임)
+    """
+    frames = []
+    for subject, info in subject_data.items():
+        cache_key = (subject, info['side'])
+        if cache is not None and cache_key in cache:
+            df = cache[cache_key]
+        else:
+            file_path = os.path.join(interval_dir, f"{subject}_interval_data.xlsx")
+            sheet_name = 'Right_Leg' if info['side'] == 'right' else 'Left_Leg'
+            try:
+                df = pd.read_excel(file_path, sheet_name=sheet_name)
+            except Exception as e:
+                print(f"Error reading spectral features for {subject}: {str(e)}")
+                continue
+            if 'BF_MDF' not in df.columns:
+                df = None
+            if cache is not None:
+                cache[cache_key] = df
+        if df is None:
+            continue
+        frames.append(df.assign(Group=info['group']))
+
+    if not frames:
+        return pd.DataFrame()
+
+    data = pd.concat(frames, ignore_index=True)
+    rows = []
+    for (group, sprint), sprint_data in data.groupby(['Group', 'Category']):
+        for muscle in MUSCLES:
+            rows.append({
+                'Group': group,
+                'Sprint': sprint,
+                'Muscle': muscle,
+                'MDF_Mean': sprint_data[f'{muscle}_MDF'].mean(),
+                'MDF_STD': sprint_data[f'{muscle}_MDF'].std(ddof=0),
+                'MNF_Mean': sprint_data[f'{muscle}_MNF'].mean(),
+                'MNF_STD': sprint_data[f'{muscle}_MNF'].std(ddof=0),
+                'N_Cycles': int(sprint_data[f'{muscle}_MDF'].notna().sum())
+            })
+    return pd.DataFrame(rows)
@@ -0,0 +1,149 @@
+# 1D SPM 방식 두 그룹 비교 (순열 기반 클러스터 추론)
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+
+def _t_curves(x, x_sq, total, total_sq, labels):
+    """
+    순열 배치 전체의 두 표본 t 곡선 (합동 분산)
+    - x, x_sq: (관측 수, 포인트) 데이터와 제곱
+    - labels: (순열 수, 관측 수) bool, True = A 그룹
+    행렬 곱 두 번으로 모든 순열의 그룹 합계를 한 번에 계산
+    """
+    weights = labels.astype(x.dtype)
+    n_a = weights.sum(axis=1, keepdims=True)
+    n_b = x.shape[0] - n_a
+
+    sum_a = weights @ x
+    sum_sq_a = weights @ x_sq
+    sum_b = total - sum_a
+    sum_sq_b = total_sq - sum_sq_a
+
+    mean_a, mean_b = sum_a / n_a, sum_b / n_b
+    ss = (sum_sq_a - n_a * mean_a ** 2) + (sum_sq_b - n_b * mean_b ** 2)
+    pooled = ss / (n_a + n_b - 2)
+    se = np.sqrt(np.maximum(pooled, 0) * (1 / n_a + 1 / n_b))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(se > 0, (mean_a - mean_b) / se, 0.0)
+
+
+def _cluster_masses(t, threshold):
+    """
+    각 행(순열)에서 |t| > threshold 인 연속 구간(클러스터)의 질량(|t| 합)을 계산
+    Returns: (행 수, 최대 클러스터 수) 질량 배열, (행 수, 포인트) 클러스터 번호 (0 = 없음)
+    """
+    supra = np.abs(t) > threshold
+    starts = supra & ~np.pad(supra, ((0, 0), (1, 0)))[:, :-1]
+    cluster_id = np.cumsum(starts, axis=1) * supra
+    n_rows, n_points = t.shape
+    n_max = n_points // 2 + 2
+
+    flat = (np.arange(n_rows)[:, None] * n_max + cluster_id).ravel()
+    masses = np.bincount(flat, weights=(np.abs(t) * supra).ravel(), minlength=n_rows * n_max)
+    masses = masses.reshape(n_rows, n_max)
+    masses[:, 0] = 0
+    return masses, cluster_id
+
+
+def _null_max_mass(x, x_sq, total, total_sq, n_a, threshold, n_permutations, seed, chunk_size):
+    """순열 chunk_size개 단위로 최대 클러스터 질량과 최대 |t| 분포 계산"""
+    rng = np.random.default_rng(seed)
+    n = x.shape[0]
+    max_mass, max_t = [], []
+    for start in range(0, n_permutations, chunk_size):
+        m = min(chunk_size, n_permutations - start)
+        # 각 행에서 무작위 순서의 앞 n_a개를 A 그룹으로 배정
+        ranks = np.argsort(rng.random((m, n)), axis=1)
+        labels = ranks < n_a
+        t = _t_curves(x, x_sq, total, total_sq, labels)
+        masses, _ = _cluster_masses(t, threshold)
+        max_mass.append(masses.max(axis=1))
+        max_t.append(np.abs(t).max(axis=1))
+    return np.concatenate(max_mass), np.concatenate(max_t)
+
+
+def spm_two_sample(group_a, group_b, n_permutations=10000, alpha=0.05, n_jobs=None,
+                   chunk_size=1000, seed=0):
+    """
+    보행 주기(101 포인트) 전체에 대한 두 표본 t 검정과 순열 기반 클러스터 추론
+
+    - 관측 단위는 사이클 (analyze_injury_data의 평균/표준편차와 동일한 단위)
+    - 클러스터 형성 임계값은 모수적 양측 t 임계값 (자유도 n_a + n_b - 2)
+    - 클러스터 p값 = 순열 분포에서 최대 클러스터 질량이 관측 질량 이상인 비율
+    - 순열은 chunk_size 단위 배치 행렬 연산으로 계산하고 n_jobs개 스레드에 분배
+
+    Parameters:
+    - group_a, group_b: (사이클 수, 포인트) 배열 (예: control, injury)
+    - n_permutations: 순열 횟수
+    - alpha: 유의수준
+    - n_jobs: 스레드 수 (None이면 CPU 수)
+    - chunk_size: 한 번에 계산할 순열 수 (메모리 = chunk_size x 사이클 수)
+    - seed: 난수 시드
+
+    Returns:
+    - result: {'t': 관측 t 곡선, 'threshold': 클러스터 형성 임계값,
+               't_critical': 순열 최대 |t| 분포의 (1-alpha) 분위수 (포인트별 FWE 임계값),
+               'clusters': [{'start', 'end', 'mass', 'p'}], 'significant': 포인트별 bool}
+    """
+    from scipy import stats
+    a = np.asarray(group_a, dtype=float)
+    b = np.asarray(group_b, dtype=float)
+    x = np.vstack([a, b])
+    x_sq = x ** 2
+    total, total_sq = x.sum(axis=0), x_sq.sum(axis=0)
+    n_a = len(a)
+    dof = len(x) - 2
+    threshold = stats.t.ppf(1 - alpha / 2, dof)
+
+    observed_labels = (np.arange(len(x)) < n_a)[None, :]
+    t_obs = _t_curves(x, x_sq, total, total_sq, observed_labels)
+    masses, cluster_id = _cluster_masses(t_obs, threshold)
+    t_obs, masses, cluster_id = t_obs[0], masses[0], cluster_id[0]
+
+    # 순열을 스레드별로 나눔 (행렬 곱은 GIL을 해제하므로 스레드로 충분)
+    if n_jobs is None:
+        n_jobs = os.cpu_count() or 1
+    n_jobs = max(1, min(n_jobs, n_permutations // chunk_size or 1))
+    shares = [n_permutations // n_jobs + (i < n_permutations % n_jobs) for i in range(n_jobs)]
+    seeds = np.random.SeedSequence(seed).spawn(n_jobs)
+    with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+        parts = list(executor.map(
+            lambda args: _null_max_mass(x, x_sq, total, total_sq, n_a, threshold, args[0], args[1], chunk_size),
+            zip(shares, seeds)))
+    null_mass = np.concatenate([p[0] for p in parts])
+    null_t = np.concatenate([p[1] for p in parts])
+
+    clusters = []
+    significant = np.zeros(len(t_obs), dtype=bool)
+    for k in range(1, cluster_id.max() + 1):
+        points = np.flatnonzero(cluster_id == k)
+        p = (np.sum(null_mass >= masses[k]) + 1) / (len(null_mass) + 1)
+        clusters.append({'start': int(points[0]), 'end': int(points[-1]), 'mass': float(masses[k]), 'p': float(p)})
+        if p < alpha:
+            significant[points] = True
+
+    return {
+        't': t_obs,
+        'threshold': float(threshold),
+        't_critical': float(np.quantile(null_t, 1 - alpha)),
+        'clusters': clusters,
+        'significant': significant
+    }
+
+
+def spm_cluster_table(spm_results):
+    """
+    {측정 항목: spm_two_sample 결과}를 클러스터 목록 표로 변환 (analysis_stats.xlsx 저장용)
+    """
+    rows = []
+    for key, result in spm_results.items():
+        if not result['clusters']:
+            rows.append({'Measurement': key, 'Start(%)': None, 'End(%)': None, 'Mass': None, 'p': None,
+                         'Threshold': result['threshold'], 'T_Critical': result['t_critical']})
+        for cluster in result['clusters']:
+            rows.append({'Measurement': key, 'Start(%)': cluster['start'], 'End(%)': cluster['end'],
+                         'Mass': cluster['mass'], 'p': cluster['p'],
+                         'Threshold': result['threshold'], 'T_Critical': result['t_critical']})
+    return pd.DataFrame(rows)
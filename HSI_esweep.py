@@ -0,0 +1,216 @@
+# 파라미터 스윕 (기록은 한 번만 읽고, 바뀐 파라미터의 하위 단계만 재계산)
+import os
+import itertools
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from HSI_e01 import read_excel_file, split_legs
+from HSI_e02 import find_gait_cycles
+from HSI_e04 import (find_sprint_intervals, find_cycles_in_sprint, select_middle_cycles,
+                     DETECTION_PARAMS, INTERVAL_PARAMS, SELECTION_PARAMS, DEFAULT_PARAMS)
+from HSI_e05 import interpolate_cycle_data
+from HSI_e06 import load_group_manifest
+from HSI_eqc import cycle_qc_features, rejected_cycles
+
+# 단계별로 영향을 주는 파라미터는 DETECTION_PARAMS(HSI_e02), INTERVAL_PARAMS/SELECTION_PARAMS(HSI_e04)
+
+DATA_TYPES = ['IMU', 'ACC', 'BF', 'ST']
+
+
+def expand_grid(grid):
+    """
+    {파라미터: [값, ...]} 그리드를 파라미터 조합 리스트로 펼침 (지정하지 않은 파라미터는 기본값)
+    """
+    unknown = set(grid) - set(DEFAULT_PARAMS)
+    if unknown:
+        raise ValueError(f"Unknown sweep parameter(s): {sorted(unknown)}")
+
+    names = list(grid)
+    param_sets = []
+    for values in itertools.product(*(grid[name] for name in names)):
+        param_sets.append({**DEFAULT_PARAMS, **dict(zip(names, values))})
+    return param_sets
+
+
+def _key(params, names):
+    return tuple(params[name] for name in names)
+
+
+def sweep_recording(file_path, param_sets, sprint=1, qc=False):
+    """
+    기록 하나에 대해 모든 파라미터 조합을 계산 (파일은 한 번만 읽음)
+
+    - 사이클 검출은 (window_size, min_distance, peak_threshold)가 같으면 재사용
+    - 인터벌 구분은 (velocity_threshold, min_rest_duration)이 같으면 재사용
+    - 사이클 품질 검사는 사이클 검출과 인터벌 구분 파라미터가 모두 같으면 재사용
+    - 보간은 선택된 사이클 목록 전체가 같으면 재사용 (n_cycles만 바뀌면 선택이 달라지므로 다시 보간)
+
+    Parameters:
+    - file_path: 원본 엑셀 파일 경로
+    - param_sets: expand_grid 결과
+    - sprint: 그룹 통계에 사용할 스프린트 번호 (analyze_injury_data와 동일하게 1)
+    - qc: 선택 전 사이클 품질 검사 (process_file과 동일하게 기본값 False, 켜면 기본 판정 기준 사용)
+
+    Returns:
+    - subject: 피실험자 이름 (파일명, 확장자 제외)
+    - results: 파라미터 조합 순서대로 {side: {'n_valleys', 'n_sprints', 'n_selected', 'curves'}}
+      (curves = {data_type: (사이클 수, 101) 배열}, 지정한 스프린트의 보간 데이터,
+       보간이 모두 실패하면 (0, 101) 배열)
+    """
+    subject = os.path.splitext(os.path.basename(file_path))[0]
+    time_data, legs = split_legs(read_excel_file(file_path))
+    time_values = time_data.values
+
+    valley_cache, interval_cache, qc_cache, curve_cache = {}, {}, {}, {}
+    results = []
+
+    for params in param_sets:
+        result = {}
+        for side, signals in legs.items():
+            gyro = signals['IMU']
+
+            detection_key = (side,) + _key(params, DETECTION_PARAMS)
+            if detection_key not in valley_cache:
+                valley_cache[detection_key], _ = find_gait_cycles(
+                    time_data, gyro, side.capitalize(),
+                    min_distance=params['min_distance'], window_size=params['window_size'],
+                    peak_threshold=params['peak_threshold'])
+            valleys = valley_cache[detection_key]
+
+            interval_key = (side,) + _key(params, INTERVAL_PARAMS)
+            if interval_key not in interval_cache:
+                interval_cache[interval_key] = find_sprint_intervals(
+                    gyro.values, time_values,
+                    velocity_threshold=params['velocity_threshold'],
+                    min_rest_duration=params['min_rest_duration'])
+            intervals = interval_cache[interval_key]
+
+            categorized = find_cycles_in_sprint(valleys, intervals)
+            rejected = None
+            if qc:
+                qc_key = detection_key + interval_key[1:]
+                if qc_key not in qc_cache:
+                    qc_cache[qc_key] = rejected_cycles(cycle_qc_features(
+                        time_values, gyro, valleys, categorized,
+                        emg={muscle: signals[muscle] for muscle in ['BF', 'ST']}))
+                rejected = qc_cache[qc_key]
+            selected = select_middle_cycles(categorized, n_cycles=params['n_cycles'], rejected=rejected)
+
+            curves = {}
+            cycles = selected.get(sprint, [])
+            if len(cycles) > 1:
+                for data_type in DATA_TYPES:
+                    curve_key = (side, data_type, tuple(cycles))
+                    if curve_key not in curve_cache:
+                        # 보간이 모두 실패해도 (0, 101) 모양을 유지해 np.vstack이 가능하도록
+                        curve_cache[curve_key] = np.array(
+                            interpolate_cycle_data(time_data, signals[data_type], cycles)).reshape(-1, 101)
+                    curves[data_type] = curve_cache[curve_key]
+
+            result[side] = {
+                'n_valleys': len(valleys),
+                'n_sprints': len(selected),
+                'n_selected': sum(len(c) for c in selected.values()),
+                'curves': curves
+            }
+        results.append(result)
+
+    return subject, results
+
+
+def _summarize(param_sets, recordings, subject_data):
+    """파라미터 조합별 사이클 수와 그룹 통계를 하나의 표로 정리"""
+    rows = []
+    for i, params in enumerate(param_sets):
+        row = dict(params)
+        row['n_subjects'] = 0
+        stacked = {}
+        for subject, results in recordings.items():
+            info = subject_data.get(subject) if subject_data is not None \
+                else {'group': 'all', 'side': 'right'}
+            if info is None:
+                continue
+            leg = results[i][info['side']]
+            row['n_subjects'] += 1
+            for name in ['n_valleys', 'n_sprints', 'n_selected']:
+                row[name] = row.get(name, 0) + leg[name]
+            for data_type, curves in leg['curves'].items():
+                if len(curves) == 0:
+                    continue
+                stacked.setdefault((info['group'], data_type), []).append(curves)
+
+        for (group, data_type), curves in sorted(stacked.items()):
+            data = np.vstack(curves)
+            mean, std = np.mean(data, axis=0), np.std(data, axis=0)
+            row[f'{group}_{data_type}_n_cycles'] = len(data)
+            row[f'{group}_{data_type}_mean'] = float(np.mean(mean))
+            row[f'{group}_{data_type}_min'] = float(np.min(mean))
+            row[f'{group}_{data_type}_max'] = float(np.max(mean))
+            row[f'{group}_{data_type}_std'] = float(np.mean(std))
+        rows.append(row)
+
+    return pd.DataFrame(rows)
+
+
+def run_sweep(data_dir, grid, subject_data=None, n_workers=None, output_dir=None, qc=False):
+    """
+    파라미터 그리드 전체를 기록 단위로 병렬 실행하고 비교 표 작성
+
+    Parameters:
+    - data_dir: 원본 엑셀 파일 디렉토리 (sprint_data)
+    - grid: {파라미터: [값, ...]} (DEFAULT_PARAMS의 키만 사용 가능)
+    - subject_data: get_injury_side/load_group_manifest 결과
+      (None이면 모든 피실험자의 오른쪽 다리를 'all' 그룹으로 사용)
+    - n_workers: 프로세스 수 (None이면 CPU 수)
+    - output_dir: 비교 표 저장 디렉토리 (None이면 HSI_DataProcessing/07_ParameterSweep)
+    - qc: sweep_recording 참고
+
+    Returns:
+    - df: 파라미터 조합별 사이클 수 및 그룹 통계 표
+    """
+    if output_dir is None:
+        output_dir = os.path.join(os.getcwd(), 'HSI_DataProcessing', '07_ParameterSweep')
+    os.makedirs(output_dir, exist_ok=True)
+
+    param_sets = expand_grid(grid)
+    file_paths = sorted(os.path.join(data_dir, f) for f in os.listdir(data_dir) if f.endswith('.xlsx'))
+    print(f"Sweeping {len(param_sets)} parameter set(s) over {len(file_paths)} recording(s)...")
+
+    recordings = {}
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        futures = {executor.submit(sweep_recording, path, param_sets, qc=qc): path for path in file_paths}
+        for future, path in futures.items():
+            try:
+                subject, results = future.result()
+                recordings[subject] = results
+            except Exception as e:
+                print(f"Error sweeping {os.path.basename(path)}: {str(e)}")
+
+    df = _summarize(param_sets, recordings, subject_data)
+    output_path = os.path.join(output_dir, 'sweep_results.csv')
+    df.to_csv(output_path, index=False)
+    print(f"Sweep results saved to: {output_path}")
+    return df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='HSI pipeline parameter sweep')
+    parser.add_argument('--data-dir', default=os.path.join(os.getcwd(), 'sprint_data'))
+    parser.add_argument('--manifest', help='group manifest CSV (subject,group)')
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--output-dir')
+    parser.add_argument('--qc', action='store_true', help='reject outlier cycles before selection')
+    for name, default in DEFAULT_PARAMS.items():
+        # 샘플 수/사이클 수 파라미터는 정수, 임계값/시간은 실수
+        value_type = int if name in ['window_size', 'min_distance', 'n_cycles'] else float
+        parser.add_argument(f"--{name.replace('_', '-')}", dest=name, type=value_type,
+                            nargs='+', help=f'values to sweep (default {default})')
+    args = parser.parse_args()
+
+    grid = {name: getattr(args, name) for name in DEFAULT_PARAMS if getattr(args, name)}
+    subject_data = load_group_manifest(args.manifest) if args.manifest else None
+    df = run_sweep(args.data_dir, grid, subject_data, n_workers=args.workers,
+                   output_dir=args.output_dir, qc=args.qc)
+    with pd.option_context('display.width', 160, 'display.max_columns', None):
+        print(df)
@@ -0,0 +1,244 @@
+# 양측 대칭성 분석 (오른쪽/왼쪽 보폭을 시간으로 짝짓고 정규화 곡선의 대칭 지수를 배열 연산으로 계산)
+import os
+import numpy as np
+import pandas as pd
+
+DATA_TYPES = ['IMU', 'ACC', 'BF', 'ST']
+NUM_POINTS = 101
+# 사이클 하나의 스칼라 지표: GYRO/ACC는 최대 크기, EMG는 포락선(EMG_condition) 곡선의 평균 크기
+SCALAR_METRICS = {'IMU': 'Peak', 'ACC': 'Peak', 'BF': 'Envelope', 'ST': 'Envelope'}
+# 다음 valley까지의 시간이 선택된 사이클 중앙값의 이 배수를 넘으면 (스프린트 끝) 직전 사이클 길이 사용
+MAX_DURATION_RATIO = 1.5
+
+
+def stack_leg_cycles(selected, interpolated, data_types=DATA_TYPES):
+    """
+    한 다리의 선택된 사이클(Step 4)과 보간 곡선(Step 5)을 배열로 쌓음
+    - 보간에 실패한 사이클이 있어 곡선 수가 사이클 수와 다른 스프린트는 순서를 알 수 없으므로 제외
+
+    Returns:
+    - valleys: (사이클 수,) 시작 valley 인덱스
+    - sprints: (사이클 수,) 스프린트 번호
+    - curves: {data_type: (사이클 수, 101) 배열}
+    """
+    valleys, sprints = [], []
+    curves = {data_type: [] for data_type in data_types}
+    for sprint, cycles in selected.items():
+        data = [interpolated.get(data_type, {}).get(sprint, []) for data_type in data_types]
+        if len(cycles) < 2 or any(len(d) != len(cycles) for d in data):
+            continue
+        valleys.extend(cycles)
+        sprints.extend([sprint] * len(cycles))
+        for data_type, d in zip(data_types, data):
+            curves[data_type].append(np.asarray(d, dtype=float))
+    curves = {data_type: np.vstack(c) if c else np.empty((0, NUM_POINTS)) for data_type, c in curves.items()}
+    return np.asarray(valleys, dtype=int), np.asarray(sprints, dtype=int), curves
+
+
+def cycle_durations(valleys, all_valleys, time_data):
+    """
+    선택된 사이클의 길이(초): 전체 valley에서 다음 valley까지의 시간
+    (스프린트 마지막 사이클처럼 중앙값의 MAX_DURATION_RATIO배를 넘으면 직전 사이클 길이)
+    """
+    time_values = np.asarray(time_data, dtype=float)
+    all_valleys = np.asarray(all_valleys, dtype=int)
+    position = np.searchsorted(all_valleys, valleys)
+    next_time = time_values[all_valleys[np.minimum(position + 1, len(all_valleys) - 1)]]
+    previous_time = time_values[all_valleys[np.maximum(position - 1, 0)]]
+    start_time = time_values[valleys]
+    duration = next_time - start_time
+    previous = start_time - previous_time
+    too_long = (duration <= 0) | (duration > MAX_DURATION_RATIO * np.median(duration))
+    return np.where(too_long, previous, duration)
+
+
+def pair_strides(right_times, right_durations, left_times):
+    """
+    오른쪽 사이클마다 그 사이클 안 [시작, 시작 + 길이)에서 처음 시작하는 왼쪽 사이클을 짝지음 (searchsorted 한 번)
+    - 왼쪽 사이클 하나는 한 번만 짝지음 (먼저 시작한 오른쪽 사이클 우선)
+
+    Parameters:
+    - right_times, left_times: 각 다리 사이클 시작 시각 (증가 순서)
+    - right_durations: 오른쪽 사이클 길이 (초)
+
+    Returns:
+    - right_idx, left_idx: 짝지어진 사이클 위치 배열
+    """
+    right_times = np.asarray(right_times, dtype=float)
+    left_times = np.asarray(left_times, dtype=float)
+    if len(right_times) == 0 or len(left_times) == 0:
+        return np.empty(0, dtype=int), np.empty(0, dtype=int)
+    position = np.searchsorted(left_times, right_times, side='left')
+    candidate = np.minimum(position, len(left_times) - 1)
+    valid = (position < len(left_times)) & (left_times[candidate] - right_times < right_durations)
+    right_idx, left_idx = np.flatnonzero(valid), candidate[valid]
+    first = np.concatenate([[True], np.diff(left_idx) != 0])
+    return right_idx[first], left_idx[first]
+
+
+def symmetry_index(right, left, scale=None):
+    """
+    대칭 지수 SI = 100 x (R - L) / (0.5 x (|R| + |L|)) (0이면 완전 대칭, 양수면 오른쪽이 큼)
+    - scale: 분모 대신 쓸 기준 크기 (곡선 SI에서 포인트마다 0 근처로 나누지 않도록 사이클 평균 크기 사용)
+    """
+    denominator = 0.5 * (np.abs(right) + np.abs(left)) if scale is None else scale
+    return 100 * np.divide(right - left, denominator, out=np.full(np.broadcast(right, denominator).shape, np.nan),
+                           where=denominator > 0)
+
+
+def bilateral_symmetry(subject, time_data, selected, valleys, interpolated):
+    """
+    피실험자 한 명의 양측 대칭성 (짝지어진 모든 보폭을 한 번에 계산)
+
+    Parameters:
+    - subject: 피실험자 이름
+    - time_data: GYRO 시간 데이터 (양쪽 다리 공통)
+    - selected: {'right': select_middle_cycles 결과, 'left': ...}
+    - valleys: {'right': find_gait_cycles valley, 'left': ...}
+    - interpolated: process_file의 interpolated_data ({side: {data_type: {스프린트: [곡선]}}})
+      BF/ST는 EMG_condition 포락선 곡선이어야 함 (원시 EMG를 101개 시점에서 뽑은 곡선이면 Envelope SI가 잡음이 됨,
+      process_file은 condition_emg=False일 때 포락선 곡선을 따로 보간해 전달)
+
+    Returns:
+    - pairs: 짝별 표 (Sprint, Right_Valley, Left_Valley, Right_Time, Left_Time, Lag, Lag_Ratio,
+      SI_IMU_Peak, SI_ACC_Peak, SI_BF_Envelope, SI_ST_Envelope, SI_{data_type}_Curve)
+      - Lag_Ratio: 왼쪽 시작 지연 / 오른쪽 사이클 길이 (대칭 보행이면 0.5 근처)
+      - SI_{data_type}_Curve: 곡선 SI 절댓값의 평균 (파형 전체의 비대칭)
+    - curves: 스프린트별 평균 SI 곡선 (열: Sprint, Time(%), IMU, ACC, BF, ST)
+    """
+    time_values = np.asarray(time_data, dtype=float)
+    stacked = {side: stack_leg_cycles(selected[side], interpolated[side]) for side in ['right', 'left']}
+    right_valleys, right_sprints, right_curves = stacked['right']
+    left_valleys, left_sprints, left_curves = stacked['left']
+
+    right_order, left_order = np.argsort(right_valleys), np.argsort(left_valleys)
+    right_durations = cycle_durations(right_valleys[right_order], valleys['right'], time_values) \
+        if len(right_valleys) else np.empty(0)
+    r, l = pair_strides(time_values[right_valleys[right_order]], right_durations,
+                        time_values[left_valleys[left_order]])
+    ri, li = right_order[r], left_order[l]
+
+    right_time, left_time = time_values[right_valleys[ri]], time_values[left_valleys[li]]
+    pairs = pd.DataFrame({
+        'Sprint': right_sprints[ri],
+        'Right_Valley': right_valleys[ri],
+        'Left_Valley': left_valleys[li],
+        'Right_Time': right_time,
+        'Left_Time': left_time,
+        'Lag': left_time - right_time,
+        'Lag_Ratio': (left_time - right_time) / right_durations[r]
+    })
+
+    si_curves = {}
+    for data_type in DATA_TYPES:
+        right, left = right_curves[data_type][ri], left_curves[data_type][li]
+        reducer = np.max if SCALAR_METRICS[data_type] == 'Peak' else np.mean
+        pairs[f'SI_{data_type}_{SCALAR_METRICS[data_type]}'] = symmetry_index(
+            reducer(np.abs(right), axis=1), reducer(np.abs(left), axis=1))
+        scale = 0.5 * (np.abs(right).mean(axis=1) + np.abs(left).mean(axis=1))[:, None]
+        si_curves[data_type] = symmetry_index(right, left, scale=scale)
+    for data_type in DATA_TYPES:
+        pairs[f'SI_{data_type}_Curve'] = np.nanmean(np.abs(si_curves[data_type]), axis=1) \
+            if len(pairs) else np.empty(0)
+
+    # 스프린트별 평균 SI 곡선 (짝 번호를 스프린트 코드로 묶어 합산, NaN 포인트는 평균에서 제외)
+    sprints, codes = np.unique(pairs['Sprint'].to_numpy(), return_inverse=True)
+    curves = pd.DataFrame({
+        'Sprint': np.repeat(sprints, NUM_POINTS),
+        'Time(%)': np.tile(np.linspace(0, 100, NUM_POINTS), len(sprints))
+    })
+    for data_type in DATA_TYPES:
+        sums = np.zeros((len(sprints), NUM_POINTS))
+        counts = np.zeros((len(sprints), NUM_POINTS))
+        finite = np.isfinite(si_curves[data_type])
+        np.add.at(sums, codes, np.where(finite, si_curves[data_type], 0.0))
+        np.add.at(counts, codes, finite)
+        curves[data_type] = np.divide(sums, counts, out=np.full_like(sums, np.nan), where=counts > 0).ravel()
+
+    print(f"{subject}: {len(pairs)} bilateral stride pairs "
+          f"(right {len(right_valleys)}, left {len(left_valleys)} selected cycles)")
+    return pairs, curves
+
+
+def save_symmetry(pairs, curves, filename, output_dir):
+    """피실험자별 대칭성 결과 저장 (<피실험자>_symmetry.xlsx, 시트: Pairs, Curves)"""
+    os.makedirs(output_dir, exist_ok=True)
+    base_filename = os.path.splitext(os.path.basename(filename))[0]
+    output_path = os.path.join(output_dir, f"{base_filename}_symmetry.xlsx")
+    with pd.ExcelWriter(output_path) as writer:
+        pairs.to_excel(writer, sheet_name='Pairs', index=False)
+        curves.to_excel(writer, sheet_name='Curves', index=False)
+    print(f"Saved symmetry data to: {output_path}")
+    return output_path
+
+
+def analyze_symmetry_groups(symmetry_dir, subject_data, output_dir, sprint=1, cache=None):
+    """
+    그룹별 양측 대칭성 비교 (Step 6와 같은 피실험자/그룹, 스프린트 1 기준)
+
+    - SI 부호를 분석 다리 기준으로 맞춤: SI = (분석 다리 - 반대 다리) / 평균 크기
+      (get_injury_side/매니페스트의 side가 left이면 부호 반전)
+    - 피실험자별 평균을 먼저 구한 뒤 그룹 평균/표준편차 계산 (사이클이 많은 피실험자에 치우치지 않도록)
+
+    Parameters:
+    - symmetry_dir: 피실험자별 *_symmetry.xlsx 폴더
+    - subject_data: get_injury_side/load_group_manifest 결과
+    - output_dir: symmetry_stats.xlsx 저장 폴더 (06_InjuryAnalysis)
+    - sprint: 비교할 스프린트 번호 (None이면 전체)
+    - cache: {피실험자: {'Pairs': 표, 'Curves': 표}} 딕셔너리 (주어지면 캐시에 없는 피실험자만 파일에서 읽음)
+
+    Returns:
+    - subjects: 피실험자별 평균 SI 표
+    - summary: 그룹 x 지표 평균/표준편차 표
+    """
+    subject_rows, curve_frames = [], []
+    for subject, info in subject_data.items():
+        if cache is not None and subject in cache:
+            sheets = cache[subject]
+        else:
+            file_path = os.path.join(symmetry_dir, f"{subject}_symmetry.xlsx")
+            if not os.path.exists(file_path):
+                continue
+            try:
+                sheets = pd.read_excel(file_path, sheet_name=['Pairs', 'Curves'])
+            except Exception as e:
+                print(f"Error reading {os.path.basename(file_path)}: {str(e)}")
+                continue
+            if cache is not None:
+                cache[subject] = sheets
+        pairs, curves = sheets['Pairs'], sheets['Curves']
+        if sprint is not None:
+            pairs, curves = pairs[pairs['Sprint'] == sprint], curves[curves['Sprint'] == sprint]
+        if pairs.empty:
+            continue
+        sign = -1.0 if info['side'] == 'left' else 1.0
+        si_columns = [column for column in pairs.columns if column.startswith('SI_')]
+        # 곡선 SI 평균(절댓값)은 부호가 없으므로 그대로 사용
+        signed = [column for column in si_columns if not column.endswith('_Curve')]
+        means = pairs[si_columns].mean()
+        means[signed] *= sign
+        subject_rows.append({'Subject': subject, 'Group': info['group'], 'Side': info['side'],
+                             'N_Pairs': len(pairs), 'Lag_Ratio': pairs['Lag_Ratio'].mean(), **means.to_dict()})
+        curve_frames.append(curves[['Time(%)'] + DATA_TYPES].assign(
+            **{data_type: curves[data_type] * sign for data_type in DATA_TYPES}, Group=info['group']))
+
+    if not subject_rows:
+        print("No bilateral symmetry data found.")
+        return None, None
+
+    subjects = pd.DataFrame(subject_rows)
+    metrics = [column for column in subjects.columns if column.startswith('SI_')] + ['Lag_Ratio']
+    summary = subjects.groupby('Group')[metrics].agg(['mean', 'std'])
+    summary.columns = [f"{metric}_{stat}" for metric, stat in summary.columns]
+    summary.insert(0, 'N_Subjects', subjects.groupby('Group').size())
+    summary = summary.reset_index()
+    curves = pd.concat(curve_frames).groupby(['Group', 'Time(%)'])[DATA_TYPES].mean().reset_index()
+
+    os.makedirs(output_dir, exist_ok=True)
+    output_path = os.path.join(output_dir, 'symmetry_stats.xlsx')
+    with pd.ExcelWriter(output_path) as writer:
+        summary.to_excel(writer, sheet_name='Summary', index=False)
+        subjects.to_excel(writer, sheet_name='Subjects', index=False)
+        curves.to_excel(writer, sheet_name='Curves', index=False)
+    print(f"Saved symmetry statistics to: {output_path}")
+    return subjects, summary
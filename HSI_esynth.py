@@ -0,0 +1,168 @@
+# 합성 스프린트 데이터 생성 (GYRO.Z, ACC.Z, EMG)
+import numpy as np
+import pandas as pd
+import os
+
+# Delsys 내보내기 형식과 같은 센서 순서 (EMG: R BF, R ST, L BF, L ST / IMU: R, L)
+EMG_CHANNELS = ['R BF', 'R ST', 'L BF', 'L ST']
+IMU_CHANNELS = ['R IMU', 'L IMU']
+
+
+def _activity_mask(t, n_sprints, sprint_duration, rest_duration, ramp=0.8):
+    """
+    스프린트/휴식 구조에 따른 활동 강도 (0~1)
+    - 휴식 → 스프린트 → 휴식 → ... → 휴식 순서
+    - 각 스프린트 시작/끝에서 ramp(초) 동안 선형 증가/감소
+    """
+    activity = np.zeros_like(t)
+    for k in range(n_sprints):
+        start = rest_duration + k * (sprint_duration + rest_duration)
+        end = start + sprint_duration
+        rise = np.clip((t - start) / ramp, 0, 1)
+        fall = np.clip((end - t) / ramp, 0, 1)
+        activity = np.maximum(activity, np.minimum(rise, fall))
+    return activity
+
+
+def _stride_phase(t, activity, stride_freq, stride_jitter, rng):
+    """보폭 주기마다 변동이 있는 위상 (0~1 반복). 휴식 중에는 위상이 멈춤"""
+    dt = np.diff(t, prepend=t[0])
+    # 보폭 단위(약 1/stride_freq 초)로 주파수 변동을 주고 샘플 단위로 보간
+    n_knots = int(np.ceil(t[-1] * stride_freq)) + 2
+    knots = np.linspace(t[0], t[-1], n_knots)
+    freq = stride_freq * (1 + stride_jitter * rng.standard_normal(n_knots))
+    inst_freq = np.interp(t, knots, freq) * (activity > 0)
+    return np.cumsum(inst_freq * dt) % 1.0
+
+
+def _bump(phase, center, width):
+    """위상 공간에서의 원형 가우시안 (주기 경계를 넘어도 연속)"""
+    d = (phase - center + 0.5) % 1.0 - 0.5
+    return np.exp(-0.5 * (d / width) ** 2)
+
+
+def _leg_signals(phase, activity, noise, rng):
+    """
+    한쪽 다리의 GYRO.Z [°/s], ACC.Z [g], EMG(BF, ST) [mV] 생성
+    - GYRO: 접지 직후 음의 피크(-600°/s 내외), 유각기 양의 피크(+900°/s 내외)
+    - ACC: 접지 충격 스파이크
+    - EMG: 유각기 후반~접지 초기 햄스트링 버스트
+    """
+    n = len(phase)
+    amp = activity * (1 + 0.05 * rng.standard_normal())
+
+    gyro = amp * (-600 * _bump(phase, 0.0, 0.035)
+                  + 900 * _bump(phase, 0.55, 0.12)
+                  - 120 * _bump(phase, 0.3, 0.05))
+    gyro += noise * 600 * rng.standard_normal(n)
+
+    acc = -1 + amp * (3.0 * _bump(phase, 0.03, 0.02) - 0.5 * _bump(phase, 0.5, 0.15))
+    acc += noise * 3.0 * rng.standard_normal(n)
+
+    emg = {}
+    for muscle, center in [('BF', 0.9), ('ST', 0.93)]:
+        envelope = 0.01 + activity * 0.4 * _bump(phase, center, 0.08)
+        emg[muscle] = envelope * rng.standard_normal(n) + noise * 0.01 * rng.standard_normal(n)
+
+    return gyro, acc, emg
+
+
+def generate_sprint_recording(fs=1000.0, fs_imu=None, n_sprints=3, sprint_duration=8.0,
+                              rest_duration=10.0, stride_freq=2.2, stride_jitter=0.03,
+                              noise=0.02, seed=None):
+    """
+    Delsys 내보내기 형식의 합성 스프린트 데이터 생성
+
+    Parameters:
+    - fs: EMG 샘플링 주파수 (Hz)
+    - fs_imu: IMU(GYRO, ACC) 샘플링 주파수 (None이면 fs와 동일)
+    - n_sprints: 스프린트 횟수
+    - sprint_duration: 스프린트 1회 길이 (초)
+    - rest_duration: 스프린트 사이 휴식 길이 (초, 처음과 끝에도 포함)
+    - stride_freq: 한쪽 다리 보폭 주파수 (Hz)
+    - stride_jitter: 보폭 주파수의 상대 변동 (표준편차)
+    - noise: 신호 크기 대비 노이즈 비율
+    - seed: 난수 시드
+
+    Returns:
+    - df: 'X [s]' + 센서 열 형태의 데이터프레임
+      (샘플링 주파수가 다른 센서 열은 긴 열의 길이에 맞춰 NaN으로 채워짐)
+    """
+    rng = np.random.default_rng(seed)
+    if fs_imu is None:
+        fs_imu = fs
+    duration = n_sprints * (sprint_duration + rest_duration) + rest_duration
+
+    t_emg = np.arange(int(round(duration * fs))) / fs
+    t_imu = np.arange(int(round(duration * fs_imu))) / fs_imu
+
+    # 위상은 EMG 시간축에서 한 번만 만들고 IMU 시간축으로 옮김 (두 센서가 같은 움직임을 기록)
+    activity = _activity_mask(t_emg, n_sprints, sprint_duration, rest_duration)
+    phase = {'R': _stride_phase(t_emg, activity, stride_freq, stride_jitter, rng)}
+    phase['L'] = (phase['R'] + 0.5) % 1.0
+
+    columns = []
+    sensor = 0
+    for channel in EMG_CHANNELS:
+        sensor += 1
+        side, muscle = channel.split()
+        _, _, emg = _leg_signals(phase[side], activity, noise, rng)
+        columns.append(('X [s]', t_emg))
+        columns.append((f'{channel}: EMG {sensor} [mV]', emg[muscle]))
+
+    imu_activity = np.interp(t_imu, t_emg, activity)
+    for channel in IMU_CHANNELS:
+        sensor += 1
+        side = channel[0]
+        # 위상은 주기 경계에서 불연속이므로 sin/cos로 보간
+        angle = 2 * np.pi * phase[side]
+        imu_phase = (np.arctan2(np.interp(t_imu, t_emg, np.sin(angle)),
+                                np.interp(t_imu, t_emg, np.cos(angle))) / (2 * np.pi)) % 1.0
+        gyro, acc, _ = _leg_signals(imu_phase, imu_activity, noise, rng)
+        columns.append(('X [s]', t_imu))
+        columns.append((f'{channel}: ACC.Z {sensor} [g]', acc))
+        columns.append(('X [s]', t_imu))
+        columns.append((f'{channel}: GYRO.Z {sensor} [°/s]', gyro))
+
+    n_rows = max(len(values) for _, values in columns)
+    matrix = np.full((n_rows, len(columns)), np.nan)
+    for j, (_, values) in enumerate(columns):
+        matrix[:len(values), j] = values
+
+    # 엑셀로 읽어들인 것과 같이 중복된 X [s] 열은 'X [s].1', 'X [s].2', ... 로 표기
+    names, seen = [], {}
+    for name, _ in columns:
+        names.append(name if name not in seen else f"{name}.{seen[name]}")
+        seen[name] = seen.get(name, 0) + 1
+
+    return pd.DataFrame(matrix, columns=names)
+
+
+def write_synthetic_recordings(directory, n_subjects=2, prefix='SYN', seed=0, **kwargs):
+    """
+    합성 데이터를 피실험자별 엑셀 파일로 저장 (sprint_data 폴더 대체용)
+
+    Parameters:
+    - directory: 저장할 디렉토리
+    - n_subjects: 생성할 피실험자 수
+    - prefix: 파일명 접두어 ({prefix}{번호:03d}.xlsx)
+    - seed: 첫 피실험자의 난수 시드 (피실험자마다 1씩 증가)
+    - kwargs: generate_sprint_recording 인자
+
+    Returns:
+    - paths: 저장된 파일 경로 리스트
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for i in range(n_subjects):
+        df = generate_sprint_recording(seed=seed + i, **kwargs)
+        path = os.path.join(directory, f"{prefix}{i + 1:03d}.xlsx")
+        df.to_excel(path, index=False)
+        paths.append(path)
+    return paths
+
+
+if __name__ == "__main__":
+    directory_path = os.path.join(os.getcwd(), 'sprint_data')
+    paths = write_synthetic_recordings(directory_path, n_subjects=2)
+    print(f"Synthetic recordings saved: {paths}")
@@ -0,0 +1,227 @@
+# 수집 폴더 감시 모드 (새 기록이 들어오면 해당 피실험자만 Step 1-5 처리 후 Step 6 갱신)
+import os
+import json
+import time
+import numpy as np
+from HSI_e01 import read_excel_file
+from HSI_e06 import load_group_manifest, analyze_injury_data
+from HSI_ecohort import load_subject_metadata, metadata_subject_data
+from HSI_edtw import load_template
+from HSI_emain import create_directories, process_file, build_parser, main_options
+from HSI_eprofile import StageProfiler
+from HSI_esymmetry import analyze_symmetry_groups
+from HSI_ewriter import MAX_PENDING
+
+STATE_FILENAME = 'watch_state.json'
+# HSI_emain.main 옵션 중 감시 모드에 해당하지 않는 것 (단계/피실험자 선택, 일괄 저장 설정, 메타데이터 그룹 비교)
+BATCH_ONLY_OPTIONS = {'stages': (1, 6), 'include': None, 'exclude': None, 'profile_subject': None,
+                      'group_by': None, 'bands': None, 'async_writes': True, 'writer_threads': 1, 'max_pending_writes': MAX_PENDING}
+
+
+def _snapshot(data_dir):
+    """sprint_data의 엑셀 파일별 (크기, 수정 시각) (엑셀 임시 잠금 파일 ~$*.xlsx 제외)"""
+    snapshot = {}
+    for entry in os.scandir(data_dir):
+        if entry.is_file() and entry.name.endswith('.xlsx') and not entry.name.startswith('~$'):
+            stat = entry.stat()
+            snapshot[entry.name] = [stat.st_size, stat.st_mtime]
+    return snapshot
+
+
+def _load_state(state_path):
+    """{'processed': {파일명: [크기, 수정 시각]}, 'failed': {...}} (이전 형식 {파일명: [...]}도 읽음)"""
+    if os.path.exists(state_path):
+        with open(state_path, encoding='utf-8') as f:
+            state = json.load(f)
+        if 'processed' in state:
+            return state
+        return {'processed': state, 'failed': {}}
+    return {'processed': {}, 'failed': {}}
+
+
+def _save_state(state_path, state):
+    tmp_path = state_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, state_path)
+
+
+class FolderWatcher:
+    """
+    sprint_data 폴더를 주기적으로 확인하여 새로 들어오거나 바뀐 기록을 찾음
+
+    - 파일 크기와 수정 시각이 settle_seconds 동안 변하지 않아야 쓰기가 끝난 것으로 판단
+      (복사/동기화 중인 파일을 읽지 않기 위함)
+    - 처리한 파일의 (크기, 수정 시각)은 00_RunReport/watch_state.json에 저장하여 재시작 후에도 다시 처리하지 않음
+    - 처리에 실패한 파일은 processed가 아닌 failed에 기록 (Step 6에서 제외, 파일이 다시 바뀌면 재시도)
+    """
+
+    def __init__(self, data_dir, state_path, settle_seconds=10.0):
+        self.data_dir = data_dir
+        self.state_path = state_path
+        self.settle_seconds = settle_seconds
+        state = _load_state(state_path)
+        self.processed, self.failed = state['processed'], state['failed']
+        self.pending = {}  # 파일명: (크기, 수정 시각, 처음 본 시각)
+
+    def ready_files(self, now=None):
+        """
+        쓰기가 끝난 새 파일/변경된 파일 목록 반환
+
+        Returns:
+        - ready: 처리할 파일명 리스트 (이름 순)
+        """
+        now = time.time() if now is None else now
+        snapshot = _snapshot(self.data_dir)
+        ready = []
+        for name, signature in snapshot.items():
+            if self.processed.get(name) == signature or self.failed.get(name) == signature:
+                self.pending.pop(name, None)
+                continue
+            previous = self.pending.get(name)
+            if previous is None or previous[:2] != signature:
+                # 처음 보거나 아직 쓰는 중 -> 안정화 시간 다시 측정
+                self.pending[name] = signature + [now]
+            elif now - previous[2] >= self.settle_seconds:
+                ready.append(name)
+        # 사라진 파일은 대기 목록에서 제거
+        for name in set(self.pending) - set(snapshot):
+            del self.pending[name]
+        return sorted(ready)
+
+    def mark_processed(self, name):
+        """처리 완료한 파일의 현재 (크기, 수정 시각)을 상태 파일에 기록"""
+        self.processed[name] = self.pending.pop(name)[:2]
+        self.failed.pop(name, None)
+        _save_state(self.state_path, {'processed': self.processed, 'failed': self.failed})
+
+    def mark_failed(self, name):
+        """처리에 실패한 파일 기록 (이전 처리 기록은 지워 Step 6에서 제외)"""
+        self.failed[name] = self.pending.pop(name)[:2]
+        self.processed.pop(name, None)
+        _save_state(self.state_path, {'processed': self.processed, 'failed': self.failed})
+
+
+def _subject_data(group_manifest, subject_metadata):
+    """Step 6 그룹 정보 (매니페스트를 매번 다시 읽어 새로 추가된 피실험자도 반영)"""
+    if group_manifest is not None:
+        return load_group_manifest(group_manifest)
+    return metadata_subject_data(load_subject_metadata(subject_metadata))
+
+
+def watch(base_dir=None, group_manifest=None, subject_metadata=None, poll_interval=5.0,
+          settle_seconds=10.0, once=False, data_dir=None, output_dir=None, multirate=False,
+          time_policy='repair', float32=False, shared_memory=False, n_workers=None, condition_emg=False,
+          spectral_features=True, cycle_db=False, registration=None, dtw_band=10, dtw_template=None,
+          diagnostics=True, params=None, qc=False, qc_thresholds=None, symmetry=False):
+    """
+    수집 폴더 감시 모드 실행
+
+    - 새 기록마다 Step 1-5를 그 피실험자에 대해서만 실행 (일괄 실행과 같은 옵션으로 process_file 호출)
+    - 한 번의 확인에서 처리한 기록이 있으면 Step 6 (analyze_injury_data, symmetry=True이면 analyze_symmetry_groups)을 갱신
+      (다른 피실험자의 보간 곡선/스펙트럼 시트/대칭성 표는 메모리 캐시를 재사용하므로 재처리한 피실험자만 다시 읽고,
+       SPM 순열 검정은 곡선을 읽은 피실험자 구성이 바뀐 경우에만 다시 계산)
+    - 처리에 실패한 기록은 Step 6에서 제외하고 watch_state.json의 failed에 기록
+    - 확인마다 실행 기록을 00_RunReport/watch_YYYYmmdd_HHMMSS.json/.csv로 저장
+
+    Parameters:
+    - base_dir: sprint_data와 HSI_DataProcessing이 위치한 디렉토리 (None이면 현재 작업 디렉토리)
+    - group_manifest, subject_metadata: Step 6 그룹 정보 (감시 모드는 대화형 입력을 쓸 수 없으므로 둘 중 하나 필요)
+    - poll_interval: 폴더 확인 간격 (초)
+    - settle_seconds: 파일이 이 시간 동안 변하지 않으면 처리
+    - once: True이면 현재 폴더의 기록을 모두 처리한 뒤 종료 (안정화 대기 포함)
+    - data_dir, output_dir, multirate, time_policy, float32: HSI_emain.main 참고
+    - shared_memory, n_workers, condition_emg, spectral_features, cycle_db, registration, dtw_band,
+      dtw_template, diagnostics, params, qc, qc_thresholds, symmetry: HSI_emain.main 참고
+    """
+    if group_manifest is None and subject_metadata is None:
+        raise ValueError("Watch mode needs group_manifest or subject_metadata for Stage 6 groups")
+    if base_dir is None:
+        base_dir = os.getcwd()
+    if data_dir is None:
+        data_dir = os.path.join(base_dir, 'sprint_data')
+    os.makedirs(data_dir, exist_ok=True)
+    directories = create_directories(base_dir, output_dir)
+    signal_dtype = np.float32 if float32 else None
+    options = dict(shared_memory=shared_memory, n_workers=n_workers, condition_emg=condition_emg,
+                   spectral_features=spectral_features,
+                   cycle_db=os.path.join(directories['cycle_db'], 'cycles.sqlite') if cycle_db else None,
+                   registration=registration, dtw_band=dtw_band,
+                   dtw_template=load_template(dtw_template) if dtw_template is not None else None,
+                   qc=qc, qc_thresholds=qc_thresholds, diagnostics=diagnostics, params=params, symmetry=symmetry)
+
+    watcher = FolderWatcher(data_dir, os.path.join(directories['run_report'], STATE_FILENAME), settle_seconds)
+    curve_cache, spectral_cache, spm_cache, symmetry_cache = {}, {}, {}, {}
+    print(f"\n=== HSI Watch Mode: {data_dir} (poll {poll_interval}s, settle {settle_seconds}s) ===")
+    print(f"Options: multirate={multirate}, time_policy={time_policy}, float32={float32}, "
+          f"condition_emg={condition_emg}, qc={qc}, registration={registration}, symmetry={symmetry}, "
+          f"params={params or 'defaults'}")
+    if watcher.failed:
+        print(f"Previously failed (retried when the file changes): {', '.join(sorted(watcher.failed))}")
+
+    try:
+        while True:
+            ready = watcher.ready_files()
+            if ready:
+                profiler = StageProfiler()
+                for filename in ready:
+                    subject = os.path.splitext(filename)[0]
+                    upload_time = watcher.pending[filename][1]
+                    try:
+                        df = read_excel_file(os.path.join(data_dir, filename), multirate=multirate,
+                                             time_policy=time_policy, dtype=signal_dtype)
+                        profiler.lap(subject, 'read_excel', rows=len(df['EMG']) if multirate else len(df))
+                        process_file(filename, df, directories, profiler=profiler, **options)
+                        watcher.mark_processed(filename)
+                        print(f"{filename}: processed {time.time() - upload_time:.1f}s after last write")
+                    except Exception as e:
+                        # 실패한 파일은 Step 6에서 제외 (파일이 다시 바뀌면 재시도)
+                        print(f"Error processing {filename}: {str(e)}")
+                        watcher.mark_failed(filename)
+                    for side in ['right', 'left']:
+                        curve_cache.pop((subject, side), None)
+                        spectral_cache.pop((subject, side), None)
+                    symmetry_cache.pop(subject, None)
+                    for key in [key for key in spm_cache if any(entry[0] == subject for entry in key[0])]:
+                        del spm_cache[key]
+
+                # 아직 업로드되지 않았거나 처리에 실패한 피실험자는 제외
+                ingested = {os.path.splitext(name)[0] for name in watcher.processed}
+                subject_data = {subject: info for subject, info in
+                                _subject_data(group_manifest, subject_metadata).items() if subject in ingested}
+                if subject_data:
+                    print("\nRefreshing injury analysis...")
+                    analyze_injury_data(directories['interpolated_data'], subject_data,
+                                        directories['injury_analysis'], profiler=profiler,
+                                        interval_dir=directories['interval_data'], curve_cache=curve_cache,
+                                        dtype=signal_dtype, spectral_cache=spectral_cache, spm_cache=spm_cache)
+                    if symmetry:
+                        analyze_symmetry_groups(directories['symmetry'], subject_data,
+                                                directories['injury_analysis'], cache=symmetry_cache)
+                        profiler.lap('(all)', 'symmetry_groups')
+                profiler.save(directories['run_report'], basename=f"watch_{time.strftime('%Y%m%d_%H%M%S')}")
+                print(f"\n=== Updated {len(ready)} recording(s), waiting for new files... ===")
+
+            if once and not watcher.pending:
+                break
+            time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        print("\nWatch mode stopped.")
+
+
+if __name__ == "__main__":
+    # 일괄 실행(HSI_emain)과 같은 옵션을 받아 감시 모드에서도 같은 설정으로 처리
+    parser = build_parser('Watch sprint_data and process new recordings with the batch pipeline options')
+    watch_group = parser.add_argument_group('watch mode')
+    watch_group.add_argument('--poll', type=float, default=5.0, help='seconds between folder checks')
+    watch_group.add_argument('--settle', type=float, default=10.0, help='seconds a file must stay unchanged')
+    watch_group.add_argument('--once', action='store_true', help='process what is there, then exit')
+    args = parser.parse_args()
+
+    options = main_options(args)
+    ignored = [name for name, default in BATCH_ONLY_OPTIONS.items() if options.pop(name) != default]
+    if args.retry_failed:
+        ignored.append('retry_failed')
+    if ignored:
+        print(f"Ignoring batch-only option(s) in watch mode: {', '.join(ignored)}")
+    watch(poll_interval=args.poll, settle_seconds=args.settle, once=args.once, **options)
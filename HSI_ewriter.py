@@ -0,0 +1,106 @@
+# 결과 파일 백그라운드 저장 (저장 작업을 크기 제한 큐에 넣고 writer 스레드가 디스크에 쓰는 동안 다음 계산 진행)
+import queue
+import threading
+import time
+import pandas as pd
+
+# 대기 중인 저장 작업 최대 개수 (작업마다 피실험자 결과를 참조하므로 메모리 상한 역할, 가득 차면 submit이 대기)
+MAX_PENDING = 6
+REPORT_COLUMNS = ['subject', 'output', 'queued_s', 'wall_s', 'error']
+
+
+class OutputWriter:
+    """
+    저장 함수 호출을 큐에 넣고 writer 스레드에서 실행
+
+    - submit은 큐가 가득 차면 자리가 날 때까지 대기 (backpressure)
+    - 저장 중 예외는 삼키지 않고 records에 기록, close()가 실패 목록을 반환
+    - 제출한 결과 객체는 저장이 끝날 때까지 수정하지 않아야 함
+
+    사용법:
+        writer = OutputWriter()
+        writer.submit(subject, 'peak_data', save_peak_data_to_excel, right, left, filename, output_dir)
+        ...
+        errors = writer.close()   # 남은 작업을 모두 저장한 뒤 실패한 작업 표 반환
+    """
+
+    def __init__(self, n_threads=1, max_pending=MAX_PENDING):
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._closed = False
+        self.records = []
+        self._threads = [threading.Thread(target=self._drain, name=f'HSI-writer-{i}', daemon=True)
+                         for i in range(max(1, n_threads))]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, subject, output, func, *args, **kwargs):
+        """
+        저장 작업 추가 (큐가 가득 차면 대기)
+
+        Parameters:
+        - subject: 피실험자 이름 (실행 요약용)
+        - output: 결과 이름 (예: 'peak_data')
+        - func, args, kwargs: 저장 함수와 인자
+
+        Returns:
+        - 큐 자리를 기다린 시간 (초)
+        """
+        if self._closed:
+            raise RuntimeError("OutputWriter is closed")
+        start = time.perf_counter()
+        self._queue.put((subject, output, func, args, kwargs, start))
+        return time.perf_counter() - start
+
+    def _drain(self):
+        """writer 스레드: 종료 신호(None)를 받을 때까지 저장 작업 실행"""
+        while True:
+            job = self._queue.get()
+            if job is None:
+                self._queue.task_done()
+                return
+            subject, output, func, args, kwargs, queued = job
+            # 결과 객체 참조를 바로 놓아 저장이 끝난 피실험자 메모리를 해제
+            del job
+            start = time.perf_counter()
+            error = None
+            try:
+                func(*args, **kwargs)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                print(f"Error writing {output} for {subject}: {error}")
+            del args, kwargs
+            end = time.perf_counter()
+            with self._lock:
+                self.records.append({'subject': subject, 'output': output, 'queued_s': round(start - queued, 6),
+                                     'wall_s': round(end - start, 6), 'error': error})
+            self._queue.task_done()
+
+    def report(self):
+        """지금까지 끝난 저장 작업 표 (REPORT_COLUMNS)"""
+        with self._lock:
+            return pd.DataFrame(list(self.records), columns=REPORT_COLUMNS)
+
+    def close(self):
+        """남은 작업을 모두 저장하고 스레드를 종료, 실패한 작업 표 반환"""
+        if not self._closed:
+            self._closed = True
+            for _ in self._threads:
+                self._queue.put(None)
+            for thread in self._threads:
+                thread.join()
+        report = self.report()
+        return report[report['error'].notna()]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def write_output(writer, subject, output, func, *args, **kwargs):
+    """writer가 있으면 백그라운드 저장, None이면 바로 저장"""
+    if writer is None:
+        return func(*args, **kwargs)
+    return writer.submit(subject, output, func, *args, **kwargs)